@@ -119,10 +119,13 @@ def find_empty_account_slot(sut: SystemUnderTest, session,
         if uri in responses:
             response = responses[uri]
         else:
-            response = session.get(sut.rhost + uri)
-            sut.add_response(uri, response,
-                             resource_type=ResourceType.MANAGER_ACCOUNT,
-                             request_type=request_type)
+            probe_uri, narrowed = utils.select_uri(
+                sut, uri, ['UserName', 'Enabled'])
+            response = session.get(sut.rhost + probe_uri)
+            if not narrowed:
+                sut.add_response(uri, response,
+                                 resource_type=ResourceType.MANAGER_ACCOUNT,
+                                 request_type=request_type)
         if response.status_code == requests.codes.OK:
             data = response.json()
             if data.get('UserName') == '' and not data.get('Enabled', True):
@@ -163,6 +166,11 @@ def add_account_via_patch(sut: SystemUnderTest, session, user, role, password,
     return user, password, uri
 
 
+def _get_new_account(sut: SystemUnderTest, session, acct_uri):
+    response = session.get(sut.rhost + acct_uri)
+    return response.status_code != requests.codes.NOT_FOUND, response
+
+
 def add_account(sut: SystemUnderTest, session,
                 request_type=RequestType.NORMAL):
     if not sut.accounts_uri:
@@ -197,8 +205,13 @@ def add_account(sut: SystemUnderTest, session,
             new_acct_uri = urlparse(location).path
         else:
             new_acct_uri = response.json().get('@odata.id')
-        response = session.get(sut.rhost + new_acct_uri)
-        sut.add_response(new_acct_uri, response,
+        # the new account may not be readable immediately on some services
+        result = utils.poll(
+            lambda: _get_new_account(sut, session, new_acct_uri), timeout=3)
+        logging.debug('New account %s read after %s attempt(s) in %.3f '
+                      'seconds' % (new_acct_uri, result.attempts,
+                                   result.elapsed))
+        sut.add_response(new_acct_uri, result.value,
                          resource_type=ResourceType.MANAGER_ACCOUNT,
                          request_type=request_type)
     elif (response.status_code == requests.codes.METHOD_NOT_ALLOWED
@@ -341,27 +354,27 @@ def password_change_required(sut: SystemUnderTest, session, user, password,
     headers = {
         'OData-Version': '4.0'
     }
-    response = requests.post(sut.rhost + sut.sessions_uri, json=payload,
-                             headers=headers, verify=sut.verify)
+    response = sut.transport.post(sut.rhost + sut.sessions_uri, json=payload,
+                                  headers=headers)
     sut.add_response(sut.sessions_uri, response,
                      request_type=RequestType.PWD_CHANGE_REQUIRED)
     # GET the account
-    response = requests.get(sut.rhost + uri, auth=(user, password),
-                            headers=headers)
+    response = sut.transport.get(sut.rhost + uri, auth=(user, password),
+                                 headers=headers)
     etag = utils.get_response_etag(response)
     sut.add_response(uri, response, resource_type=ResourceType.MANAGER_ACCOUNT,
                      request_type=RequestType.PWD_CHANGE_REQUIRED)
     # try to get protected resource
-    response = requests.get(sut.rhost + sut.sessions_uri,
-                            auth=(user, password), headers=headers)
+    response = sut.transport.get(sut.rhost + sut.sessions_uri,
+                                 auth=(user, password), headers=headers)
     sut.add_response(sut.sessions_uri, response,
                      request_type=RequestType.PWD_CHANGE_REQUIRED)
     # change password
     payload = {'Password': new_password(sut)}
     if etag:
         headers['If-Match'] = etag
-    response = requests.patch(uri, auth=(user, password), json=payload,
-                              headers=headers)
+    response = sut.transport.patch(uri, auth=(user, password), json=payload,
+                                   headers=headers)
     sut.add_response(uri, response,
                      resource_type=ResourceType.MANAGER_ACCOUNT,
                      request_type=RequestType.PWD_CHANGE_REQUIRED)
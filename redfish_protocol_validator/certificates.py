@@ -0,0 +1,169 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import base64
+import binascii
+import hashlib
+import logging
+import re
+import socket
+import ssl
+from urllib.parse import urlparse
+
+from pyasn1.codec.der import decoder
+from pyasn1_modules import rfc5280
+
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+CERT_CATEGORY = 'Certificates'
+
+_pem_cert_re = re.compile(r'-----BEGIN CERTIFICATE-----(.+?)'
+                          r'-----END CERTIFICATE-----', re.DOTALL)
+
+
+def fingerprint(der):
+    """Get the SHA-256 fingerprint of a DER-encoded certificate"""
+    return hashlib.sha256(der).hexdigest()
+
+
+def pem_to_der_list(pem):
+    """Convert the PEM certificates in a string to a list of DER certificates
+
+    Blocks that are not valid base64 are skipped.
+    """
+    certs = []
+    for block in _pem_cert_re.findall(pem):
+        try:
+            certs.append(base64.b64decode(''.join(block.split()),
+                                          validate=True))
+        except (binascii.Error, ValueError):
+            logging.debug('Skipping malformed PEM certificate block')
+    return certs
+
+
+def peer_chain(ssock):
+    """Get the DER-encoded certificate chain presented on an SSL socket
+
+    The full chain is only exposed by newer versions of Python (publicly
+    from 3.13 and on the underlying SSL object from 3.10); otherwise only
+    the leaf certificate is returned.
+    """
+    get_chain = getattr(ssock, 'get_unverified_chain', None)
+    if get_chain is None:
+        sslobj = getattr(ssock, '_sslobj', None)
+        get_chain = getattr(sslobj, 'get_unverified_chain', None)
+    # the private APIs may change or go away; any failure to use them falls
+    # back to the leaf certificate
+    encoding = getattr(getattr(ssl, '_ssl', None), 'ENCODING_DER', None)
+    if callable(get_chain):
+        try:
+            chain = get_chain()
+            if isinstance(chain, list) and chain:
+                if encoding is None and not all(isinstance(c, bytes)
+                                                for c in chain):
+                    raise AttributeError('ENCODING_DER not available')
+                return [c if isinstance(c, bytes) else
+                        c.public_bytes(encoding) for c in chain]
+        except Exception as e:
+            logging.debug('Caught %s reading the presented certificate '
+                          'chain; using the leaf certificate' %
+                          e.__class__.__name__)
+    leaf = ssock.getpeercert(binary_form=True)
+    return [leaf] if leaf else []
+
+
+def fetch_presented_chain(sut: SystemUnderTest):
+    """Get the certificate chain presented by the service
+
+    The chain is fetched with a single handshake and then cached on the
+    SystemUnderTest; the leaf certificate is first.
+    """
+    if sut.server_cert_chain is None:
+        rhost = urlparse(sut.rhost)
+        port = 443 if rhost.port is None else rhost.port
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        conn = context.wrap_socket(socket.socket(socket.AF_INET),
+                                   server_hostname=rhost.hostname)
+        try:
+            conn.connect((rhost.hostname, port))
+            sut.set_server_cert_chain(peer_chain(conn))
+        finally:
+            conn.close()
+    return sut.server_cert_chain
+
+
+def decode_certificate(sut: SystemUnderTest, der):
+    """Decode a DER certificate, caching the result by fingerprint"""
+    fp = fingerprint(der)
+    cert = sut.decoded_certs.get(fp)
+    if cert is None:
+        cert = decoder.decode(der, asn1Spec=rfc5280.Certificate())[0]
+        sut.decoded_certs[fp] = cert
+    return cert
+
+
+def certificate_version(cert):
+    """Get the X.509 version of a decoded certificate"""
+    version = '<not found>'
+    if 'tbsCertificate' in cert:
+        if 'version' in cert['tbsCertificate']:
+            version = str(cert['tbsCertificate']['version'])
+    return version
+
+
+def check_certificate_members(sut: SystemUnderTest):
+    """Cross-check the Redfish Certificate resources against the chain
+
+    Uses the Certificate resources read by `resources.find_certificates` and
+    the chain cached by `fetch_presented_chain`, so no further requests,
+    handshakes or repeat decodes are made. The outcome is recorded as
+    metrics.
+    """
+    if not sut.get_certs():
+        return
+    chain = sut.server_cert_chain or []
+    presented = {}
+    for i, der in enumerate(chain):
+        presented.setdefault(fingerprint(der), i)
+    if chain:
+        sut.add_metric(CERT_CATEGORY, 'Presented chain length', len(chain),
+                       'certificates')
+    read = matched = 0
+    for coll_uri, uris in sut.get_certs().items():
+        for uri in uris:
+            response = sut.get_response('GET', uri)
+            if response is None or not response.ok:
+                continue
+            try:
+                pem = response.json().get('CertificateString')
+            except ValueError:
+                continue
+            ders = pem_to_der_list(pem) if isinstance(pem, str) else []
+            if not ders:
+                continue
+            read += 1
+            position = presented.get(fingerprint(ders[0]))
+            if position is None:
+                value = 'no'
+            else:
+                matched += 1
+                value = 'yes (chain position %s)' % position
+            if chain:
+                sut.add_metric(CERT_CATEGORY, 'Presented by service', value,
+                               '', uri)
+            try:
+                version = certificate_version(
+                    decode_certificate(sut, ders[0]))
+            except Exception as e:
+                version = 'decode failed (%s)' % e.__class__.__name__
+            sut.add_metric(CERT_CATEGORY, 'X.509 version', version, '', uri)
+    sut.add_metric(CERT_CATEGORY, 'Certificate resources read', read,
+                   'certificates')
+    if chain:
+        sut.add_metric(CERT_CATEGORY,
+                       'Certificate resources in presented chain',
+                       '%s of %s' % (matched, read))
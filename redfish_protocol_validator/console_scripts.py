@@ -13,6 +13,9 @@ import requests
 from urllib3.exceptions import InsecureRequestWarning
 from http.client import HTTPConnection
 
+from redfish_protocol_validator import csdl
+from redfish_protocol_validator import openapi
+from redfish_protocol_validator import performance
 from redfish_protocol_validator import protocol_details
 from redfish_protocol_validator import report
 from redfish_protocol_validator import resources
@@ -21,6 +24,8 @@ from redfish_protocol_validator import service_details
 from redfish_protocol_validator import service_requests
 from redfish_protocol_validator import service_responses
 from redfish_protocol_validator import sessions
+from redfish_protocol_validator import snapshot
+from redfish_protocol_validator import templates
 from redfish_protocol_validator import utils
 from redfish_protocol_validator.constants import Result
 from redfish_protocol_validator.system_under_test import SystemUnderTest
@@ -28,13 +33,95 @@ from redfish_protocol_validator.system_under_test import SystemUnderTest
 tool_version = '1.1.2'
 
 
+# test sections in run order, keyed by the prefix of their assertions
+test_sections = [
+    ('PROTO_', protocol_details.test_protocol_details),
+    ('REQ_', service_requests.test_service_requests),
+    ('RESP_', service_responses.test_service_responses),
+    ('SERV_', service_details.test_service_details),
+    ('SEC_', security_details.test_security_details),
+]
+
+# requests whose responses the test sections check, in run order, with a
+# flag for those that also take the unauthenticated session
+read_phases = [
+    (resources.read_uris_no_auth, True),
+    (resources.data_modification_requests, False),
+    (resources.data_modification_requests_no_auth, True),
+    (resources.unsupported_requests, False),
+    (resources.allowed_method_requests, False),
+    (resources.basic_auth_requests, False),
+    (resources.http_requests, False),
+    (resources.bad_auth_requests, False),
+    (sessions.bad_login, False),
+]
+
+
+def budget_exhausted_msg(sut: SystemUnderTest):
+    return ('Not tested; the run time budget of %s seconds was exhausted '
+            'before this section ran' % sut.time_budget)
+
+
+def read_resources(sut: SystemUnderTest):
+    """Read the resources and make the requests used by the tests
+
+    Phases that would start after the run time budget is exhausted are
+    skipped.
+    """
+    resources.read_target_resources(sut, func=resources.get_default_resources)
+    templates.build_index(sut)
+    no_auth_session = sessions.no_auth_session(sut)
+    for phase, no_auth in read_phases:
+        if sut.deadline_passed:
+            logging.warning('Run time budget exhausted; skipping %s' %
+                            phase.__name__)
+        elif no_auth:
+            phase(sut, no_auth_session)
+        else:
+            phase(sut)
+
+
 def perform_tests(sut: SystemUnderTest):
-    """Perform the protocol validation tests on the resources."""
-    protocol_details.test_protocol_details(sut)
-    service_requests.test_service_requests(sut)
-    service_responses.test_service_responses(sut)
-    service_details.test_service_details(sut)
-    security_details.test_security_details(sut)
+    """Perform the protocol validation tests on the resources.
+
+    Sections that would start after the run time budget is exhausted are
+    skipped and their remaining assertions are logged as NOT_TESTED.
+    """
+    for prefix, func in test_sections:
+        if sut.deadline_passed:
+            count = utils.skip_assertions(sut, prefix,
+                                          budget_exhausted_msg(sut))
+            logging.warning('Run time budget exhausted; %s %s assertions '
+                            'not tested' % (count, prefix))
+            continue
+        func(sut)
+
+
+def write_reports(sut: SystemUnderTest, report_dir, report_type):
+    utils.print_summary(sut)
+    current_time = datetime.now()
+    print('Report output:')
+    report.json_results(sut, report_dir, current_time, tool_version)
+    if report_type in ('tsv', 'both'):
+        print(report.tsv_report(sut, report_dir, current_time))
+    if report_type in ('html', 'both'):
+        print(report.html_report(sut, report_dir, current_time, tool_version))
+
+
+def non_negative_int(value):
+    """argparse type for an integer option that may not be negative"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError('%s is negative' % value)
+    return number
+
+
+def positive_int(value):
+    """argparse type for an integer option that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('%s is less than 1' % value)
+    return number
 
 
 def main():
@@ -60,12 +147,95 @@ def main():
     parser.add_argument('--avoid-http-redirect', action='store_true',
                         help='avoid attempts to generate HTTP redirects for '
                              'services that do not support HTTP')
+    parser.add_argument('--ssdp-cache', type=str,
+                        help='file used to share SSDP discovery results '
+                             'between validator runs on the same subnet')
+    parser.add_argument('--sse-timeout', type=float, default=3,
+                        help='the number of seconds to read events from the '
+                             'SSE stream (default: 3)')
+    parser.add_argument('--sse-max-events', type=int,
+                        help='stop reading the SSE stream after this many '
+                             'events')
+    parser.add_argument('--token-samples', type=int, default=0,
+                        help='the number of sessions to create and delete to '
+                             'sample session tokens for randomness analysis '
+                             '(default: 0, no sampling)')
+    parser.add_argument('--probe-budget', type=non_negative_int, default=500,
+                        help='the maximum number of resources to probe for '
+                             'their Allow headers; 0 probes every resource '
+                             '(default: 500)')
+    parser.add_argument('--probe-writes', action='store_true',
+                        help='also send PATCH and POST requests with empty '
+                             'bodies to the probed resources whose Allow '
+                             'headers omit those methods')
+    parser.add_argument('--no-auth-budget', type=non_negative_int,
+                        default=1000,
+                        help='the maximum number of URIs to read without '
+                             'authentication, besides the public URIs and '
+                             'the URIs of the services tested by name; 0 '
+                             'reads every URI (default: 1000)')
+    parser.add_argument('--sample-mode', choices=templates.sample_modes,
+                        default=templates.SAMPLE_EXHAUSTIVE,
+                        help='the resources checked by the per-resource '
+                             'tests: every resource, a stratified sample of '
+                             'each URI template, or one resource per '
+                             'template (default: exhaustive)')
+    parser.add_argument('--sample', action='store_const',
+                        dest='sample_mode', const=templates.SAMPLE_TEMPLATE,
+                        help='same as --sample-mode template')
+    parser.add_argument('--sample-size', type=positive_int, default=3,
+                        help='the number of resources of each URI template '
+                             'checked with --sample-mode stratified '
+                             '(default: 3)')
+    parser.add_argument('--max-rate', type=float,
+                        help='the maximum number of requests per second to '
+                             'send to the service (default: no limit)')
+    parser.add_argument('--max-in-flight', type=int,
+                        help='the maximum number of concurrent requests to '
+                             'send to the service (default: no limit)')
+    parser.add_argument('--max-retries', type=int, default=2,
+                        help='the number of times to retry GET and HEAD '
+                             'requests after a connection error, timeout or '
+                             '429/502/503/504 response (default: 2)')
+    parser.add_argument('--connect-timeout', type=float, default=10,
+                        help='the number of seconds to wait for a connection '
+                             'to the service (default: 10)')
+    parser.add_argument('--read-timeout', type=float, default=60,
+                        help='the number of seconds to wait for the service '
+                             'to send response data (default: 60)')
+    parser.add_argument('--time-budget', type=float,
+                        help='the number of seconds the run may take; test '
+                             'sections not started within the budget are '
+                             'reported as NOT_TESTED (default: no limit)')
+    parser.add_argument('--cache-dir', type=str,
+                        help='directory in which to save a snapshot of the '
+                             'resources read and their results, per host and '
+                             'service UUID, and the parsed CSDL and OpenAPI '
+                             'documents')
+    parser.add_argument('--incremental', action='store_true',
+                        help='revalidate resources against the snapshot in '
+                             '--cache-dir from the previous run and reuse '
+                             'the results for unchanged resources')
+    parser.add_argument('--openapi-seeds', action='store_true',
+                        help='after the crawl, also read the paths of the '
+                             'OpenAPI document that support GET and were not '
+                             'reached')
+    parser.add_argument('--tls-scan', action='store_true',
+                        help='probe every TLS protocol version and cipher '
+                             'suite offered by the local OpenSSL and report '
+                             'the accepted matrix')
+    parser.add_argument('--benchmark', action='append',
+                        choices=['sse', 'collections'],
+                        help='run a performance benchmark after the '
+                             'validation tests; may be repeated')
     cert_g = parser.add_mutually_exclusive_group()
     cert_g.add_argument('--no-cert-check', action='store_true',
                         help='disable verification of host SSL certificates')
     cert_g.add_argument('--ca-bundle', type=str,
                         help='the file or directory containing trusted CAs')
     args = parser.parse_args()
+    if args.incremental and not args.cache_dir:
+        parser.error('--incremental requires --cache-dir')
 
     # set logging level
     log_level = getattr(logging, args.log_level.upper())
@@ -85,27 +255,49 @@ def main():
 
     sut = SystemUnderTest(args.rhost, args.user, args.password, verify=verify)
     sut.set_avoid_http_redirect(args.avoid_http_redirect)
+    sut.set_sse_timeout(args.sse_timeout)
+    sut.set_sse_max_events(args.sse_max_events)
+    sut.set_token_samples(args.token_samples)
+    sut.set_probe_budget(args.probe_budget)
+    sut.set_probe_writes(args.probe_writes)
+    sut.set_openapi_seeds(args.openapi_seeds)
+    sut.set_no_auth_budget(args.no_auth_budget)
+    sut.set_sample_mode(args.sample_mode)
+    sut.set_sample_size(args.sample_size)
+    sut.set_tls_scan(args.tls_scan)
+    sut.set_rate_limits(max_rate=args.max_rate,
+                        max_in_flight=args.max_in_flight)
+    sut.set_max_retries(args.max_retries)
+    sut.set_timeouts(args.connect_timeout, args.read_timeout)
+    sut.set_time_budget(args.time_budget)
+    if args.ssdp_cache:
+        sut.set_ssdp_cache(utils.SSDPCache(args.ssdp_cache))
+    if args.cache_dir:
+        sut.set_snapshot(snapshot.Snapshot(args.cache_dir, args.rhost,
+                                           tool_version,
+                                           incremental=args.incremental))
+        sut.set_csdl_cache(csdl.SchemaCache(Path(args.cache_dir) / 'csdl'))
+        sut.set_openapi_cache(
+            openapi.OpenApiCache(Path(args.cache_dir) / 'openapi'))
     sut.login()
-    resources.read_target_resources(sut, func=resources.get_default_resources)
-    no_auth_session = sessions.no_auth_session(sut)
-    resources.read_uris_no_auth(sut, no_auth_session)
-    resources.data_modification_requests(sut)
-    resources.data_modification_requests_no_auth(sut, no_auth_session)
-    resources.unsupported_requests(sut)
-    resources.basic_auth_requests(sut)
-    resources.http_requests(sut)
-    resources.bad_auth_requests(sut)
-    sessions.bad_login(sut)
-    perform_tests(sut)
-    sut.logout()
-    utils.print_summary(sut)
-    current_time = datetime.now()
-    print('Report output:')
-    report.json_results(sut, report_dir, current_time, tool_version)
-    if args.report_type in ('tsv', 'both'):
-        print(report.tsv_report(sut, report_dir, current_time))
-    if args.report_type in ('html', 'both'):
-        print(report.html_report(sut, report_dir, current_time, tool_version))
+    try:
+        read_resources(sut)
+        perform_tests(sut)
+        if sut.snapshot is not None:
+            sut.snapshot.save(sut, protocol_details.resource_assertions)
+        if sut.deadline_passed:
+            logging.warning('Run time budget exhausted; skipping benchmarks')
+        else:
+            performance.run_benchmarks(sut, args.benchmark)
+    finally:
+        # write the partial results even if the run is interrupted
+        try:
+            sut.logout()
+        finally:
+            sut.transport.add_metrics(sut)
+            if sut.snapshot is not None:
+                sut.snapshot.add_metrics(sut)
+            write_reports(sut, report_dir, args.report_type)
     # exit with status 1 if any assertions failed, 0 otherwise
     sys.exit(int(sut.summary_count(Result.FAIL) > 0))
 
@@ -0,0 +1,300 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import hashlib
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import requests
+
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+CSDL_CATEGORY = 'CSDL Schemas'
+
+# version of the cache file layout
+CACHE_FORMAT = 1
+
+_chunk_size = 65536
+
+# strong ETags shorter than this (without the quotes) are not trusted to
+# identify a document's content, since a counter or short hash may repeat
+MIN_ETAG_LENGTH = 8
+
+# references: list of [Uri, [included namespaces]] from edmx:Reference
+# namespaces: the Namespace of each Schema under edmx:DataServices
+# entity_container: the Name of the EntityContainer in the first Schema
+# ('' if unnamed), or None if there is none
+CsdlDocument = namedtuple('CsdlDocument', ['references', 'namespaces',
+                                           'entity_container'])
+
+
+def parse(chunks, stop_at_container=False):
+    """Parse a CSDL document incrementally
+
+    The document is fed to the parser a chunk at a time and each element is
+    discarded once it has been seen, so the whole tree is never held in
+    memory. Only the references, schema namespaces and entity container are
+    recorded.
+
+    :param chunks: iterable of str or bytes chunks of the document
+    :param stop_at_container: stop as soon as the EntityContainer of the
+        first Schema is found, or the first Schema ends without one (the
+        namespaces are then only those seen so far)
+    :return: CsdlDocument tuple
+    :raises xml.etree.ElementTree.ParseError: if the XML is malformed
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    stack = []
+    references = []
+    namespaces = []
+    container = None
+    done = False
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, el in parser.read_events():
+            _, _, tag = el.tag.rpartition('}')
+            path = [t for t, _ in stack[1:]]
+            if event == 'start':
+                if tag == 'Reference' and len(stack) == 1:
+                    references.append([el.get('Uri'), []])
+                elif (tag == 'Include' and path == ['Reference'] and
+                      el.get('Namespace')):
+                    references[-1][1].append(el.get('Namespace'))
+                elif tag == 'Schema' and path == ['DataServices']:
+                    namespaces.append(el.get('Namespace'))
+                elif (tag == 'EntityContainer' and
+                      path == ['DataServices', 'Schema'] and
+                      len(namespaces) == 1):
+                    container = el.get('Name', '')
+                    done = stop_at_container
+                stack.append((tag, el))
+            else:
+                stack.pop()
+                if stack:
+                    # drop the element from its parent to free it
+                    stack[-1][1].remove(el)
+                if (tag == 'Schema' and path == ['DataServices', 'Schema'] and
+                        len(namespaces) == 1):
+                    done = stop_at_container
+            if done:
+                return CsdlDocument(references, namespaces, container)
+    parser.close()
+    return CsdlDocument(references, namespaces, container)
+
+
+def content_key(content):
+    """Get the cache key for the content of a document"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return 'sha256:%s' % hashlib.sha256(content).hexdigest()
+
+
+def etag_key(sut: SystemUnderTest, etag):
+    """Get the cache key for a document's ETag
+
+    The ETag is only meaningful to the service that issued it, so the key
+    includes the service UUID (or the host, if the UUID is not known).
+
+    :return: the key, or None if the ETag is missing, weak or too short to
+        identify the content
+    """
+    if (not etag or etag.startswith('W/') or
+            len(etag.strip('"')) < MIN_ETAG_LENGTH):
+        return None
+    return 'etag:%s:%s' % (sut.service_uuid or sut.rhost, etag)
+
+
+class SchemaCache(object):
+    """On-disk cache of parsed CSDL documents keyed by URI and ETag
+
+    Entries are keyed by the path of the document and either a strong ETag
+    qualified by the service that issued it, or the SHA-256 digest of the
+    content. Keys by digest do not name the host, so runs against services
+    with identical firmware share those entries. Entries written with a
+    different cache format are ignored.
+    """
+    def __init__(self, cache_dir):
+        """Create the cache
+
+        :param cache_dir: the directory holding the cache files
+        :type cache_dir: str
+        """
+        self.cache_dir = str(cache_dir)
+        self.hits = 0
+        self.parsed = 0
+
+    def _path(self, uri, key):
+        name = hashlib.sha256(('%s\n%s' % (uri, key)).encode('utf-8'))
+        return os.path.join(self.cache_dir, '%s.json' % name.hexdigest())
+
+    def get(self, uri, key):
+        """Get the cached document, or None"""
+        try:
+            with open(self._path(uri, key)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (not isinstance(data, dict) or
+                data.get('format') != CACHE_FORMAT or
+                data.get('uri') != uri or data.get('key') != key):
+            return None
+        try:
+            doc = CsdlDocument(**data['document'])
+        except (KeyError, TypeError):
+            return None
+        self.hits += 1
+        return doc
+
+    def put(self, uri, key, doc):
+        """Save a parsed document"""
+        self.parsed += 1
+        data = {
+            'format': CACHE_FORMAT,
+            'uri': uri,
+            'key': key,
+            'document': doc._asdict()
+        }
+        path = self._path(uri, key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning('Unable to write CSDL cache file %s; error: %s' %
+                            (path, e))
+
+
+def read_metadata(sut: SystemUnderTest, response):
+    """Parse the $metadata document from its GET response
+
+    The body is fed to the parser a chunk at a time, without decoding it to
+    text, and parsing stops at the EntityContainer. The result is taken from
+    the schema cache when the document is unchanged since it was cached.
+
+    :param sut: the SystemUnderTest object
+    :param response: the response to the GET of $metadata
+    :return: CsdlDocument tuple
+    """
+    uri = '/redfish/v1/$metadata'
+    cache = sut.csdl_cache
+    key = None
+    if cache is not None:
+        key = (etag_key(sut, response.headers.get('ETag')) or
+               content_key(response.content))
+        doc = cache.get(uri, key)
+        if doc is not None:
+            return doc
+    doc = parse(response.iter_content(chunk_size=_chunk_size),
+                stop_at_container=True)
+    if cache is not None:
+        cache.put(uri, key, doc)
+    return doc
+
+
+def local_reference(sut: SystemUnderTest, ref_uri):
+    """Get the path of a referenced document hosted by the service, or None"""
+    if not ref_uri:
+        return None
+    ref_uri = ref_uri.partition('#')[0]
+    if ref_uri.startswith(sut.rhost + '/'):
+        return ref_uri[len(sut.rhost):]
+    if ref_uri.startswith('/'):
+        return ref_uri
+    return None
+
+
+def read_document(sut: SystemUnderTest, uri):
+    """Read and parse a CSDL document hosted by the service
+
+    The document is streamed from the service. If its strong ETag names an
+    entry in the schema cache, the body is not read at all. Without such an
+    ETag, the body is read whole and looked up in the cache by its digest.
+
+    :return: tuple of CsdlDocument (or None) and an error message (or None)
+    """
+    cache = sut.csdl_cache
+    try:
+        r = sut.session.get(sut.rhost + uri, stream=True,
+                            headers={'accept': 'application/xml'},
+                            timeout=sut.transport.timeouts())
+    except requests.RequestException as e:
+        return None, 'Caught %s reading %s' % (e.__class__.__name__, uri)
+    try:
+        if not r.ok:
+            return None, 'GET %s returned status %s' % (uri, r.status_code)
+        key = None
+        content = None
+        if cache is not None:
+            key = etag_key(sut, r.headers.get('ETag'))
+            if key is None:
+                content = b''.join(r.iter_content(chunk_size=_chunk_size))
+                key = content_key(content)
+            doc = cache.get(uri, key)
+            if doc is not None:
+                return doc, None
+        if content is not None:
+            chunks = [content]
+        else:
+            chunks = r.iter_content(chunk_size=_chunk_size)
+        try:
+            doc = parse(chunks)
+        except ET.ParseError as e:
+            return None, 'Unable to parse %s; error: "%s"' % (uri, e)
+        if cache is not None:
+            cache.put(uri, key, doc)
+        return doc, None
+    finally:
+        r.close()
+
+
+def check_references(sut: SystemUnderTest, doc):
+    """Follow the references of $metadata to documents hosted by the service
+
+    Each referenced document is read once and its schema namespaces checked
+    against the namespaces included from it. The outcome is recorded as
+    metrics. The documents are only read when the schema cache is in use,
+    so that they are not downloaded again on every run.
+
+    :param sut: the SystemUnderTest object
+    :param doc: the CsdlDocument for $metadata
+    """
+    cache = sut.csdl_cache
+    if cache is None:
+        return
+    documents = {}
+    for ref_uri, includes in doc.references:
+        uri = local_reference(sut, ref_uri)
+        if uri is None:
+            continue
+        if uri not in documents:
+            if sut.deadline_passed:
+                logging.warning('Run time budget exhausted; stopping CSDL '
+                                'reference checks')
+                break
+            documents[uri] = read_document(sut, uri)
+        ref_doc, error = documents[uri]
+        if error:
+            logging.warning(error)
+            continue
+        missing = [ns for ns in includes if ns not in ref_doc.namespaces]
+        if missing:
+            logging.warning('Namespaces %s included from %s are not defined '
+                            'in that document' % (', '.join(missing), uri))
+            sut.add_metric(CSDL_CATEGORY, 'Unresolved includes',
+                           ', '.join(missing), '', uri)
+    if documents:
+        read = sum(1 for d, _ in documents.values() if d is not None)
+        sut.add_metric(CSDL_CATEGORY, 'Service-hosted documents read',
+                       '%s of %s' % (read, len(documents)), 'documents')
+    if cache.hits or cache.parsed:
+        sut.add_metric(CSDL_CATEGORY, 'Documents parsed', cache.parsed,
+                       'documents')
+        sut.add_metric(CSDL_CATEGORY, 'Documents from cache', cache.hits,
+                       'documents')
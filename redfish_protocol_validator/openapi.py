@@ -0,0 +1,249 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+import requests
+
+from redfish_protocol_validator import csdl
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+OPENAPI_CATEGORY = 'OpenAPI Document'
+OPENAPI_URI = '/redfish/v1/openapi.yaml'
+
+# version of the cache file layout
+CACHE_FORMAT = 2
+
+_operations = {'get', 'put', 'post', 'patch', 'delete', 'head', 'options'}
+
+_key_re = re.compile(r'''^( *)(?:'((?:[^']|'')*)'|"([^"]*)"|'''
+                     r'''([^\s'"#][^:#]*?))\s*:(?:\s|$)''')
+_param_re = re.compile(r'\{[^/{}]+\}')
+
+
+def _key(line):
+    """Get the indent and key of a YAML mapping line, or None"""
+    match = _key_re.match(line)
+    if not match:
+        return None
+    indent, single, double, plain = match.groups()
+    if single is not None:
+        key = single.replace("''", "'")
+    elif double is not None:
+        key = double
+    else:
+        key = plain
+    return len(indent), key
+
+
+def index_paths(lines):
+    """Index the paths and operations of an OpenAPI YAML document
+
+    The document is scanned a line at a time without a YAML parser, keeping
+    only the keys of the top-level `paths` mapping and the HTTP operations
+    under each path, so memory use does not grow with the document size.
+    Block-style mappings (as in the Redfish OpenAPI documents) are expected.
+
+    :param lines: iterable of the lines (str or bytes) of the document
+    :return: dict of path template to sorted list of upper-case methods
+    """
+    paths = {}
+    in_paths = False
+    path = None
+    path_indent = op_indent = None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        indent = len(line) - len(line.lstrip(' '))
+        if indent == 0:
+            key = _key(line)
+            in_paths = key is not None and key[1] == 'paths'
+            path = None
+            path_indent = op_indent = None
+            continue
+        if not in_paths:
+            continue
+        if path_indent is None:
+            path_indent = indent
+        if indent < path_indent:
+            continue
+        key = _key(line)
+        if indent == path_indent:
+            path = key[1] if key else None
+            if path is not None:
+                paths.setdefault(path, set())
+            op_indent = None
+        elif path is not None and key is not None:
+            if op_indent is None:
+                op_indent = indent
+            if indent == op_indent and key[1].lower() in _operations:
+                paths[path].add(key[1].upper())
+    return {p: sorted(m) for p, m in paths.items()}
+
+
+class OpenApiIndex(object):
+    """Index of the paths and operations in an OpenAPI document
+
+    Concrete URIs are matched against the path templates with regular
+    expressions that are only compiled when first needed.
+    """
+    def __init__(self, paths):
+        """Create the index
+
+        :param paths: dict of path template to list of upper-case methods
+        """
+        self.paths = paths
+        self._patterns = None
+
+    def _compile(self):
+        patterns = []
+        for template in self.paths:
+            parts = _param_re.split(template.rstrip('/'))
+            pattern = '[^/]+'.join(re.escape(p) for p in parts)
+            # more literal templates are tried first
+            patterns.append((-len(_param_re.sub('', template)),
+                             template, re.compile(pattern + '/?$')))
+        self._patterns = [(t, p) for _, t, p in sorted(patterns)]
+
+    def match(self, uri):
+        """Get the path template matching a URI, or None"""
+        uri = uri.partition('?')[0].partition('#')[0]
+        if uri in self.paths:
+            return uri
+        if self._patterns is None:
+            self._compile()
+        for template, pattern in self._patterns:
+            if pattern.match(uri):
+                return template
+        return None
+
+    def allowed_methods(self, uri):
+        """Get the methods the document defines for a URI, or None"""
+        template = self.match(uri)
+        return set(self.paths[template]) if template is not None else None
+
+    def seed_uris(self):
+        """Get the paths that have no template parameters and support GET"""
+        return sorted(p for p, m in self.paths.items()
+                      if 'GET' in m and not _param_re.search(p))
+
+    @property
+    def operations(self):
+        return sum(len(m) for m in self.paths.values())
+
+
+class OpenApiCache(object):
+    """On-disk cache of OpenAPI path indexes keyed by ETag and length
+
+    The keys are those of `csdl.etag_key`: a strong ETag qualified by the
+    service that issued it.
+    """
+    def __init__(self, cache_dir):
+        """Create the cache
+
+        :param cache_dir: the directory holding the cache files
+        :type cache_dir: str
+        """
+        self.cache_dir = str(cache_dir)
+
+    def _path(self, key, length):
+        name = hashlib.sha256(('%s\n%s' % (key, length)).encode('utf-8'))
+        return os.path.join(self.cache_dir, '%s.json' % name.hexdigest())
+
+    def get(self, key, length):
+        """Get the cached path index, or None"""
+        try:
+            with open(self._path(key, length)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (not isinstance(data, dict) or
+                data.get('format') != CACHE_FORMAT or
+                data.get('key') != key or data.get('length') != length or
+                not isinstance(data.get('paths'), dict)):
+            return None
+        return data['paths']
+
+    def put(self, key, length, paths):
+        """Save a path index"""
+        data = {
+            'format': CACHE_FORMAT,
+            'key': key,
+            'length': length,
+            'paths': paths
+        }
+        path = self._path(key, length)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning('Unable to write OpenAPI cache file %s; error: '
+                            '%s' % (path, e))
+
+
+def fetch_openapi(sut: SystemUnderTest):
+    """GET the OpenAPI document, streaming it into a path index
+
+    The body is read a line at a time and indexed without being kept. When
+    the cache holds an index for the document's ETag and Content-Length,
+    the body is not read at all. Weak and short ETags are not trusted to
+    identify the document, so it is then read and not cached. The index is
+    set on the SystemUnderTest.
+
+    :param sut: the SystemUnderTest object
+    :return: the `requests` response (its body is consumed), or None if the
+        request failed
+    """
+    try:
+        response = sut.session.get(sut.rhost + OPENAPI_URI, stream=True,
+                                   headers={'accept': 'application/yaml'},
+                                   timeout=sut.transport.timeouts())
+    except requests.RequestException as e:
+        logging.warning('GET %s failed with %s; skipping the resource' %
+                        (OPENAPI_URI, e.__class__.__name__))
+        return None
+    try:
+        if not response.ok:
+            return response
+        cache = sut.openapi_cache
+        key = csdl.etag_key(sut, response.headers.get('ETag'))
+        length = response.headers.get('Content-Length')
+        paths = None
+        if cache is not None and key:
+            paths = cache.get(key, length)
+        if paths is not None:
+            sut.add_metric(OPENAPI_CATEGORY, 'Index source', 'cache', '',
+                           OPENAPI_URI)
+        else:
+            try:
+                paths = index_paths(response.iter_lines())
+            except requests.RequestException as e:
+                logging.warning('Caught %s while reading %s' %
+                                (e.__class__.__name__, OPENAPI_URI))
+                return response
+            if cache is not None and key:
+                cache.put(key, length, paths)
+            sut.add_metric(OPENAPI_CATEGORY, 'Index source', 'download', '',
+                           OPENAPI_URI)
+        index = OpenApiIndex(paths)
+        sut.set_openapi(index)
+        sut.add_metric(OPENAPI_CATEGORY, 'Paths indexed', len(index.paths),
+                       'paths', OPENAPI_URI)
+        sut.add_metric(OPENAPI_CATEGORY, 'Operations indexed',
+                       index.operations, 'operations', OPENAPI_URI)
+    finally:
+        response.close()
+    return response
@@ -0,0 +1,422 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import logging
+import re
+import statistics
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from redfish_protocol_validator import utils
+from redfish_protocol_validator.constants import Assertion, Result
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+SSE_CATEGORY = 'SSE Benchmark'
+COLLECTION_CATEGORY = 'Collection Benchmark'
+
+# navigation properties that lead to the collections that grow largest
+_large_collection_props = ['LogServices', 'Entries', 'Sensors']
+
+_skip_re = re.compile(r'([?&]\$skip=)(\d+)')
+
+CollectionRead = namedtuple('CollectionRead', ['mode', 'status', 'count',
+                                               'pages', 'members',
+                                               'page_times', 'elapsed',
+                                               'error'])
+
+
+def get_submit_test_event_uri(sut: SystemUnderTest):
+    """Get the target URI of the SubmitTestEvent action, if available"""
+    if not sut.event_service_uri:
+        return None
+    response = sut.get_response('GET', sut.event_service_uri)
+    if response is None or not response.ok:
+        return None
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    action = data.get('Actions', {}).get('#EventService.SubmitTestEvent', {})
+    return action.get('target')
+
+
+def submit_test_event(sut: SystemUnderTest, uri, marker):
+    """Submit a test event carrying the given marker"""
+    payload = {
+        'EventId': marker,
+        'EventType': 'Alert',
+        'MessageId': 'Base.1.0.Success',
+        'Message': 'Redfish Protocol Validator benchmark event %s' % marker,
+        'Severity': 'OK'
+    }
+    return sut.session.post(sut.rhost + uri, json=payload)
+
+
+def wait_for_markers(reader, markers, timeout):
+    """Wait for events containing each of the markers to arrive
+
+    :returns: PollResult whose value is a dict of marker to arrival time
+    """
+    def all_arrived():
+        arrived = {}
+        for arrival, event in reader.arrivals():
+            for marker in markers:
+                if marker not in arrived and event.data and (
+                        marker in event.data):
+                    arrived[marker] = arrival
+        return len(arrived) == len(markers), arrived
+
+    return utils.poll(all_arrived, timeout=timeout, interval=0.01,
+                      max_interval=0.1)
+
+
+def sse_delivery_latency(sut: SystemUnderTest, reader, uri, samples,
+                         timeout):
+    """Measure the delay from event submission to delivery on the stream"""
+    latencies = []
+    for _ in range(samples):
+        marker = uuid.uuid4().hex
+        sent = time.monotonic()
+        r = submit_test_event(sut, uri, marker)
+        if not r.ok:
+            logging.warning('SubmitTestEvent failed with status %s; stopping '
+                            'SSE latency measurement' % r.status_code)
+            break
+        result = wait_for_markers(reader, [marker], timeout)
+        if result.done:
+            latencies.append(result.value[marker] - sent)
+        else:
+            logging.warning('Test event %s not received on SSE stream within '
+                            '%s seconds' % (marker, timeout))
+    if latencies:
+        sut.add_metric(SSE_CATEGORY, 'Event delivery latency (median)',
+                       statistics.median(latencies) * 1000, 'ms',
+                       sut.server_sent_event_uri)
+        sut.add_metric(SSE_CATEGORY, 'Event delivery latency (max)',
+                       max(latencies) * 1000, 'ms',
+                       sut.server_sent_event_uri)
+    sut.add_metric(SSE_CATEGORY, 'Latency samples delivered',
+                   '%s of %s' % (len(latencies), samples), 'events',
+                   sut.server_sent_event_uri)
+
+
+def sse_event_rate(sut: SystemUnderTest, reader, uri, burst, timeout):
+    """Measure the sustained event delivery rate for a burst of events"""
+    markers = []
+    start = time.monotonic()
+    for _ in range(burst):
+        marker = uuid.uuid4().hex
+        r = submit_test_event(sut, uri, marker)
+        if not r.ok:
+            logging.warning('SubmitTestEvent failed with status %s; stopping '
+                            'SSE event rate measurement' % r.status_code)
+            break
+        markers.append(marker)
+    if not markers:
+        return
+    result = wait_for_markers(reader, markers, timeout)
+    arrived = result.value
+    if arrived:
+        duration = max(arrived.values()) - start
+        if duration > 0:
+            sut.add_metric(SSE_CATEGORY, 'Sustained event rate',
+                           len(arrived) / duration, 'events/sec',
+                           sut.server_sent_event_uri)
+    sut.add_metric(SSE_CATEGORY, 'Burst events delivered',
+                   '%s of %s' % (len(arrived), len(markers)), 'events',
+                   sut.server_sent_event_uri)
+
+
+def open_sse_stream(sut: SystemUnderTest):
+    """Open the SSE stream, timing how long the open takes
+
+    :returns: tuple of response (or None) and elapsed seconds
+    """
+    start = time.monotonic()
+    try:
+        response = sut.session.get(sut.rhost + sut.server_sent_event_uri,
+                                   stream=True)
+    except Exception as e:
+        logging.warning('Caught %s while opening SSE stream' %
+                        e.__class__.__name__)
+        response = None
+    return response, time.monotonic() - start
+
+
+def sse_concurrent_streams(sut: SystemUnderTest, max_streams):
+    """Count the concurrent SSE streams accepted before the service refuses"""
+    streams = []
+    refused = None
+    try:
+        for _ in range(max_streams):
+            response, _ = open_sse_stream(sut)
+            if response is None:
+                refused = 'connection error'
+                break
+            if not response.ok:
+                refused = 'status %s' % response.status_code
+                response.close()
+                break
+            streams.append(response)
+    finally:
+        for response in streams:
+            response.close()
+    sut.add_metric(SSE_CATEGORY, 'Concurrent streams accepted',
+                   len(streams), 'streams', sut.server_sent_event_uri)
+    sut.add_metric(SSE_CATEGORY, 'Additional stream refused with',
+                   refused if refused else 'not refused (limit of %s '
+                                           'tried)' % max_streams,
+                   '', sut.server_sent_event_uri)
+
+
+def sse_benchmark(sut: SystemUnderTest, samples=10, burst=50, max_streams=16,
+                  timeout=10):
+    """Measure the performance of the service's SSE event pipeline
+
+    Measures stream open and reconnect times, event delivery latency and
+    sustained event rate (when SubmitTestEvent is available) and the number
+    of concurrent SSE streams accepted.
+    """
+    if not sut.server_sent_event_uri:
+        logging.warning('No ServerSentEventUri available; skipping SSE '
+                        'benchmark')
+        return
+
+    response, elapsed = open_sse_stream(sut)
+    if response is None or not response.ok:
+        logging.warning('Unable to open SSE stream; skipping SSE benchmark')
+        return
+    sut.add_metric(SSE_CATEGORY, 'Stream open time', elapsed * 1000, 'ms',
+                   sut.server_sent_event_uri)
+
+    reader = utils.SSEReader(response, timeout=3600).start()
+    try:
+        uri = get_submit_test_event_uri(sut)
+        if uri:
+            sse_delivery_latency(sut, reader, uri, samples, timeout)
+            sse_event_rate(sut, reader, uri, burst, timeout)
+        else:
+            logging.warning('SubmitTestEvent action not found; skipping SSE '
+                            'latency and event rate measurements')
+    finally:
+        reader.stop()
+        response.close()
+
+    # time to re-establish the stream after closing it
+    response, elapsed = open_sse_stream(sut)
+    if response is not None:
+        if response.ok:
+            sut.add_metric(SSE_CATEGORY, 'Reconnect time', elapsed * 1000,
+                           'ms', sut.server_sent_event_uri)
+        response.close()
+
+    sse_concurrent_streams(sut, max_streams)
+
+
+def _collection_count(data):
+    """Get the member count of a collection payload, or None"""
+    count = data.get('Members@odata.count')
+    if (isinstance(data.get('Members'), list) and isinstance(count, int) and
+            not isinstance(count, bool)):
+        return count
+    return None
+
+
+def find_large_collections(sut: SystemUnderTest, limit=3, max_requests=50):
+    """Find the largest collections reachable from the crawled resources
+
+    The collections read during the crawl are candidates, along with the
+    log entry and sensor collections linked from the crawled resources
+    (following the LogServices of systems and managers to their Entries).
+    The first page of each linked collection is read to get its count, up
+    to max_requests reads.
+
+    :returns: list of (uri, count) tuples, largest first
+    """
+    counts = {}
+    pending = []
+
+    def visit(uri, data):
+        count = _collection_count(data)
+        if count is not None:
+            counts[uri] = count
+            if uri.rstrip('/').endswith('/LogServices'):
+                for m in data.get('Members'):
+                    if isinstance(m, dict) and m.get('@odata.id'):
+                        pending.append(m['@odata.id'])
+        for prop in _large_collection_props:
+            link = data.get(prop)
+            if isinstance(link, dict) and link.get('@odata.id'):
+                pending.append(link['@odata.id'])
+
+    seen = set()
+    for uri, response in sut.get_responses_by_method('GET').items():
+        if '?' in uri or response is None or not response.ok:
+            continue
+        try:
+            data = response.json()
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            seen.add(uri)
+            visit(uri, data)
+    requests_made = 0
+    while pending and requests_made < max_requests:
+        uri = pending.pop(0)
+        if uri in seen:
+            continue
+        seen.add(uri)
+        requests_made += 1
+        try:
+            response = sut.session.get(sut.rhost + uri)
+        except requests.RequestException as e:
+            logging.warning('Caught %s reading %s while looking for large '
+                            'collections' % (e.__class__.__name__, uri))
+            continue
+        if not response.ok:
+            continue
+        try:
+            data = response.json()
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            visit(uri, data)
+    largest = sorted(counts.items(), key=lambda c: (-c[1], c[0]))
+    return [c for c in largest if c[1] > 0][:limit]
+
+
+def skip_links(next_link, count):
+    """Get the links to the remaining pages of a collection
+
+    If the first page's next link pages with $skip, the links to the
+    remaining pages can be computed from the member count, so the pages
+    can be read concurrently.
+
+    :param next_link: the next link of the first page
+    :param count: the member count of the collection
+    :returns: list of links, or None if they cannot be computed
+    """
+    match = _skip_re.search(next_link) if isinstance(next_link, str) else None
+    if (not match or int(match.group(2)) <= 0 or not isinstance(count, int) or
+            isinstance(count, bool)):
+        return None
+    step = int(match.group(2))
+    return [next_link[:match.start(2)] + str(skip) + next_link[match.end(2):]
+            for skip in range(step, count, step)]
+
+
+def _drain(pages):
+    return sum(1 for _ in pages)
+
+
+def read_all_pages(sut: SystemUnderTest, uri, max_workers=4):
+    """Read every page of a collection, timing each page
+
+    When the pages can be addressed with $skip, they are read concurrently
+    by up to max_workers threads, and any pages beyond the member count are
+    then followed by next link. Otherwise the pages are read in turn, with
+    each next page prefetched.
+
+    :returns: CollectionRead tuple
+    """
+    start = time.monotonic()
+    first = utils.CollectionIterator(sut, uri, max_pages=1)
+    members = _drain(first)
+    page_times = list(first.page_times)
+    pages = first.pages
+    error = first.error
+    mode = 'sequential'
+    tail_link = first.next_link
+    links = skip_links(first.next_link, first.count)
+    if links:
+        mode = 'concurrent ($skip)'
+        readers = [utils.CollectionIterator(sut, uri, max_pages=1,
+                                            start_uri=link)
+                   for link in links]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            counts = list(executor.map(_drain, readers))
+        for reader, n in zip(readers, counts):
+            page_times.extend(reader.page_times)
+            if reader.error:
+                error = reader.error
+                break
+            pages += 1
+            members += n
+            # follow any pages beyond those the member count accounts for
+            tail_link = reader.next_link
+    if tail_link and not error:
+        tail = utils.CollectionIterator(sut, uri, start_uri=tail_link)
+        members += _drain(tail)
+        pages += tail.pages
+        page_times.extend(tail.page_times)
+        error = tail.error
+    return CollectionRead(mode, first.status, first.count, pages, members,
+                          page_times, time.monotonic() - start, error)
+
+
+def collection_benchmark(sut: SystemUnderTest, limit=3, max_workers=4):
+    """Stress the pagination of the largest collections found
+
+    Every page of each collection is read (concurrently where possible) to
+    check Members@odata.count against the actual number of members, and the
+    page fetch latency and member throughput are recorded as metrics. The
+    count checks are logged as results for
+    Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL.
+    """
+    collections = find_large_collections(sut, limit=limit)
+    if not collections:
+        logging.warning('No collections with members found; skipping '
+                        'collection benchmark')
+        return
+    for uri, _ in collections:
+        if sut.deadline_passed:
+            logging.warning('Run time budget exhausted; stopping collection '
+                            'benchmark')
+            break
+        read = read_all_pages(sut, uri, max_workers=max_workers)
+        status = read.status if read.status is not None else ''
+        if read.error:
+            msg = ('Unable to read all pages of collection resource %s; %s' %
+                   (uri, read.error))
+            sut.log(Result.NOT_TESTED, 'GET', status, uri,
+                    Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL, msg)
+        elif read.members == read.count:
+            sut.log(Result.PASS, 'GET', status, uri,
+                    Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL,
+                    'Test passed')
+        else:
+            msg = ('The count property (%s) of collection resource %s was '
+                   'not equal to the number of members (%s) found in its '
+                   '%s pages' % (read.count, uri, read.members, read.pages))
+            sut.log(Result.FAIL, 'GET', status, uri,
+                    Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL, msg)
+        sut.add_metric(COLLECTION_CATEGORY, 'Pagination', read.mode, '', uri)
+        sut.add_metric(COLLECTION_CATEGORY, 'Pages read', read.pages,
+                       'pages', uri)
+        sut.add_metric(COLLECTION_CATEGORY, 'Members found',
+                       '%s (count %s)' % (read.members, read.count), '', uri)
+        if read.page_times:
+            sut.add_metric(COLLECTION_CATEGORY,
+                           'Page fetch latency (median)',
+                           statistics.median(read.page_times) * 1000, 'ms',
+                           uri)
+            sut.add_metric(COLLECTION_CATEGORY, 'Page fetch latency (max)',
+                           max(read.page_times) * 1000, 'ms', uri)
+        if read.elapsed > 0 and read.members:
+            sut.add_metric(COLLECTION_CATEGORY, 'Member throughput',
+                           read.members / read.elapsed, 'members/sec', uri)
+
+
+def run_benchmarks(sut: SystemUnderTest, benchmarks):
+    """Run the requested benchmark modes"""
+    for benchmark in benchmarks or []:
+        if benchmark == 'sse':
+            sse_benchmark(sut)
+        elif benchmark == 'collections':
+            collection_benchmark(sut)
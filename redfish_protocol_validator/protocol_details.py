@@ -3,14 +3,17 @@
 # License: BSD 3-Clause License. For full text see link:
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
+import logging
 import re
 import xml.etree.ElementTree as ET
 from urllib.parse import urlparse
 
 import requests
 
+from redfish_protocol_validator import templates
 from redfish_protocol_validator import utils
-from redfish_protocol_validator.constants import Assertion, ResourceType, Result
+from redfish_protocol_validator.constants import (Assertion, RequestType,
+                                                  ResourceType, Result)
 from redfish_protocol_validator.system_under_test import SystemUnderTest
 
 safe_chars_regex = re.compile(
@@ -21,6 +24,27 @@ encoded_char_regex = re.compile(r"%[A-Fa-f0-9]{2}")
 #   of the opaque-tag can be 0x21, 0x23-0x7F, 0x80-0xFF
 etag_regex = re.compile(r'^(W/)?"[\x21\x23-\xFF]*"$')
 
+# responses synthesized from an expanded collection carry the collection's
+# headers and a re-serialized payload, not the member's own
+expanded_msg = ('The response was synthesized from an expanded collection; '
+                'the resource was not read with its own GET')
+
+# assertions tested from a single response alone, whose results for an
+# unchanged resource can be reused from the previous run's snapshot
+resource_assertions = [
+    Assertion.PROTO_URI_SAFE_CHARS,
+    Assertion.PROTO_URI_NO_ENCODED_CHARS,
+    Assertion.PROTO_URI_RELATIVE_REFS,
+    Assertion.PROTO_JSON_ALL_RESOURCES,
+    Assertion.PROTO_JSON_RFC,
+    Assertion.PROTO_JSON_ACCEPTED,
+    Assertion.PROTO_ETAG_RFC7232,
+    Assertion.PROTO_STD_URI_SERVICE_ROOT,
+    Assertion.PROTO_STD_URI_VERSION,
+    Assertion.PROTO_STD_URIS_SUPPORTED,
+    Assertion.PROTO_STD_URI_SERVICE_ROOT_REDIRECT,
+]
+
 
 def split_path(uri):
     """
@@ -219,9 +243,34 @@ def test_http_unsupported_methods(sut: SystemUnderTest):
                 'DELETE method returned status %s; expected status %s' %
                 (response.status_code, requests.codes.METHOD_NOT_ALLOWED))
 
+    # methods omitted from the Allow header of the probed resources
+    for uri, response in sut.get_all_responses(
+            request_type=RequestType.METHOD_PROBE):
+        method = response.request.method
+        if method == 'HEAD':
+            continue
+        if response.status_code in [requests.codes.METHOD_NOT_ALLOWED,
+                                    requests.codes.NOT_IMPLEMENTED]:
+            sut.log(Result.PASS, method, response.status_code, uri,
+                    Assertion.PROTO_HTTP_UNSUPPORTED_METHODS, 'Test passed')
+        else:
+            sut.log(Result.FAIL, method, response.status_code, uri,
+                    Assertion.PROTO_HTTP_UNSUPPORTED_METHODS,
+                    '%s method omitted from the Allow header returned status '
+                    '%s; expected status %s or %s' % (
+                        method, response.status_code,
+                        requests.codes.METHOD_NOT_ALLOWED,
+                        requests.codes.NOT_IMPLEMENTED))
+
 
 def test_media_types(sut: SystemUnderTest, uri, response):
     """Perform tests of the supported media types."""
+    if getattr(response, 'expanded', False):
+        for assertion in [Assertion.PROTO_JSON_ALL_RESOURCES,
+                          Assertion.PROTO_JSON_RFC]:
+            sut.log(Result.NOT_TESTED, response.request.method,
+                    response.status_code, uri, assertion, expanded_msg)
+        return
     if (uri != '/redfish/v1/$metadata' and response.request.method != 'HEAD'
             and response.status_code in [requests.codes.OK,
                                          requests.codes.CREATED]):
@@ -260,6 +309,11 @@ def test_media_types(sut: SystemUnderTest, uri, response):
 def test_valid_etag(sut: SystemUnderTest, uri, response):
     """Perform tests for RFC7232 ETag support."""
     # Test Assertion.PROTO_ETAG_RFC7232
+    if getattr(response, 'expanded', False):
+        sut.log(Result.NOT_TESTED, response.request.method,
+                response.status_code, uri, Assertion.PROTO_ETAG_RFC7232,
+                expanded_msg)
+        return
     if (response.request.method != 'HEAD' and response.status_code
             in [requests.codes.OK, requests.codes.CREATED]):
         etag = response.headers.get('ETag')
@@ -289,7 +343,9 @@ def test_account_etags(sut: SystemUnderTest):
     # Test Assertion.PROTO_ETAG_ON_GET_ACCOUNT
     responses = sut.get_responses_by_method(
         'GET', resource_type=ResourceType.MANAGER_ACCOUNT)
-    for uri, response in responses.items():
+    for uri, response in list(responses.items()):
+        response = utils.genuine_response(
+            sut, uri, response, resource_type=ResourceType.MANAGER_ACCOUNT)
         if response.status_code == requests.codes.OK:
             result, msg = check_etag_present(uri, response)
             sut.log(result, response.request.method, response.status_code, uri,
@@ -331,11 +387,27 @@ def test_standard_uris(sut: SystemUnderTest, uri, response):
 
 def test_protocol_details(sut: SystemUnderTest):
     """Perform tests from the 'Protocol details' section of the spec."""
+    # the per-resource checks of GET responses run on the URIs selected in
+    # the run's sample mode
+    get_uris = sut.get_responses_by_method('GET')
+    selected = set(templates.select_uris(sut, get_uris))
     for uri, response in sut.get_all_responses():
-        test_uri(sut, uri, response)
-        test_media_types(sut, uri, response)
-        test_valid_etag(sut, uri, response)
+        if sut.deadline_passed:
+            logging.warning('Run time budget exhausted; stopping the '
+                            'per-resource protocol details checks')
+            break
+        if sut.snapshot is not None and sut.snapshot.replay(sut, uri,
+                                                            response):
+            continue
+        if response.request.method != 'GET' or uri in selected:
+            test_uri(sut, uri, response)
+            test_media_types(sut, uri, response)
+            test_valid_etag(sut, uri, response)
         test_standard_uris(sut, uri, response)
+    if len(selected) < len(get_uris):
+        sut.add_metric(templates.TEMPLATE_CATEGORY,
+                       'Resources checked for URI, media type and ETag',
+                       '%s of %s' % (len(selected), len(get_uris)))
     test_http_supported_methods(sut)
     test_http_unsupported_methods(sut)
     test_account_etags(sut)
@@ -96,6 +96,34 @@ sections = [
 ]
 
 
+def format_metric_value(value):
+    if isinstance(value, float):
+        return '%.3f' % value
+    return html_mod.escape(str(value))
+
+
+def metrics_html(sut: SystemUnderTest):
+    html = ''
+    if not sut.metrics:
+        return html
+    html += section_header_html.format('Performance Metrics')
+    for category, metrics in sorted(sut.metrics.items()):
+        html += '<table>'
+        html += ('<th colspan="4" class="headingrow">{}</th>'
+                 .format(html_mod.escape(category)))
+        html += ('<tr><td><b>{}</b></td><td><b>{}</b></td>'
+                 '<td><b>{}</b></td><td><b>{}</b></td></tr>'
+                 .format('Metric', 'Value', 'Unit', 'URI'))
+        for m in metrics:
+            html += ('<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>'
+                     .format(html_mod.escape(m['name']),
+                             format_metric_value(m['value']),
+                             html_mod.escape(m['unit']),
+                             html_mod.escape(m['uri'])))
+        html += '</table>'
+    return html
+
+
 def report_name(time, ext):
     prefix = 'RedfishProtocolValidationReport'
     name = prefix + datetime.strftime(time, '_%m_%d_%Y_%H%M%S.' + ext)
@@ -152,6 +180,7 @@ def html_report(sut: SystemUnderTest, report_dir, time, tool_version):
                                  r['status'], r['uri'],
                                  html_mod.escape(r['msg'])))
             html += '</table>'
+    html += metrics_html(sut)
     with open(str(file), 'w', encoding='utf-8') as fd:
         fd.write(html_template.format(redfish_logo.logo, tool_version,
                                       time.strftime('%c'), sut.rhost,
@@ -190,5 +219,7 @@ def json_results(sut: SystemUnderTest, report_dir, time, tool_version):
             'ErrorMessages': []
         }
     }
+    if sut.metrics:
+        results['Metrics'] = sut.metrics
     with open(str(file), 'w', encoding='utf-8') as fd:
         json.dump(results, fd, indent=4)
@@ -5,15 +5,31 @@
 
 import logging
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
 from redfish_protocol_validator import accounts as acct
+from redfish_protocol_validator import openapi
 from redfish_protocol_validator import sessions
+from redfish_protocol_validator import templates
 from redfish_protocol_validator import utils
 from redfish_protocol_validator.constants import RequestType, ResourceType
 from redfish_protocol_validator.system_under_test import SystemUnderTest
 
+PROBE_CATEGORY = 'Allowed Method Probes'
+NO_AUTH_CATEGORY = 'Unauthenticated Reads'
+
+# URIs readable without authentication
+public_uris = ['/redfish', '/redfish/v1', '/redfish/v1/', '/redfish/v1/odata',
+               '/redfish/v1/$metadata']
+
+# methods tried on resources whose Allow header omits them; PUT and DELETE
+# are never probed, since a service that ignores its own Allow header would
+# replace or delete the resource
+probe_methods = ['PATCH', 'POST']
+
 
 def set_mfr_model_fw(sut: SystemUnderTest, data):
     sep_uuid = data.get('ServiceEntryPointUUID', '').lower()
@@ -32,26 +48,130 @@ def set_mgr_net_proto_uri(sut: SystemUnderTest, data):
             data.get('NetworkProtocol', {}).get('@odata.id', ''))
 
 
+def get_resource(sut: SystemUnderTest, uri, **kwargs):
+    """GET a resource, revalidating it against the previous run if enabled
+
+    :param sut: SystemUnderTest object
+    :param uri: the URI of the resource
+    :param kwargs: additional keyword args passed to the session's get()
+    :return: the `requests` response, or None if the request failed
+    """
+    try:
+        if sut.snapshot is not None and sut.snapshot.incremental:
+            return sut.snapshot.get(sut, uri, **kwargs)
+        return sut.session.get(sut.rhost + uri, **kwargs)
+    except requests.RequestException as e:
+        logging.warning('GET %s failed with %s; skipping the resource' %
+                        (uri, e.__class__.__name__))
+        return None
+
+
+def send_request(sut: SystemUnderTest, method, uri, **kwargs):
+    """Send a request directly on the session, without revalidation
+
+    :param sut: SystemUnderTest object
+    :param method: the HTTP method
+    :param uri: the URI of the resource
+    :param kwargs: additional keyword args passed to the session method
+    :return: the `requests` response, or None if the request failed
+    """
+    try:
+        send = getattr(sut.session, method.lower())
+        return send(sut.rhost + uri, **kwargs)
+    except requests.RequestException as e:
+        logging.warning('%s %s failed with %s; skipping the resource' %
+                        (method, uri, e.__class__.__name__))
+        return None
+
+
+def response_ok(response):
+    """Check that a request was sent and its response is successful"""
+    return response is not None and response.ok
+
+
 def find_certificates(sut: SystemUnderTest, data):
     if 'NetworkProtocol' in data:
         uri = data['NetworkProtocol']['@odata.id']
-        r = sut.session.get(sut.rhost + uri)
+        r = get_resource(sut, uri)
         yield {'uri': uri, 'response': r}
-        if r.ok:
+        if response_ok(r):
             d = r.json()
             if 'HTTPS' in d and 'Certificates' in d['HTTPS']:
                 coll_uri = d['HTTPS']['Certificates']['@odata.id']
-                r = sut.session.get(sut.rhost + coll_uri)
+                r = get_resource(sut, coll_uri)
                 yield {'uri': coll_uri, 'response': r}
-                if r.ok:
+                if response_ok(r):
                     d = r.json()
                     if 'Members' in d and len(d['Members']):
-                        for m in d['Members']:
-                            uri = m['@odata.id']
-                            # uncomment next 2 lines if we need to read certs
-                            # r = session.get(sut.rhost + uri)
-                            # yield {'uri': uri, 'response': r}
+                        uris = [m['@odata.id'] for m in d['Members']]
+                        # read the certificates concurrently
+                        with ThreadPoolExecutor(
+                                max_workers=min(len(uris), 8)) as executor:
+                            responses = list(executor.map(
+                                lambda u: get_resource(sut, u),
+                                uris))
+                        for uri, r in zip(uris, responses):
                             sut.add_cert(coll_uri, uri)
+                            yield {'uri': uri, 'response': r}
+
+
+def expand_supported(sut: SystemUnderTest):
+    """Check whether the service supports `$expand=.($levels=1)`"""
+    expand = sut.supported_query_params.get('ExpandQuery')
+    return (isinstance(expand, dict) and bool(expand.get('NoLinks')) and
+            bool(expand.get('Levels')))
+
+
+def collection_members(sut: SystemUnderTest, uri, response):
+    """Generator function yielding the members of a collection
+
+    All pages of the collection are read by following next links. Members
+    that were expanded in the collection response are yielded with a
+    response synthesized from the expanded payload; other members are read
+    with their own GET as the generator is consumed.
+
+    :return: tuples of member URI and `requests` response
+    """
+    pages = utils.CollectionIterator(sut, uri, response=response)
+    for m in pages:
+        member_uri = m.get('@odata.id') if isinstance(m, dict) else None
+        if not member_uri:
+            continue
+        if set(m) - {'@odata.id'}:
+            yield member_uri, utils.expanded_member_response(
+                response, sut.rhost + member_uri, m)
+        else:
+            yield member_uri, get_resource(sut, member_uri)
+    if pages.error and pages.pages:
+        # the first page was read, but a later page could not be
+        logging.warning(pages.error)
+
+
+def read_collection(sut: SystemUnderTest, uri):
+    """Read a collection, expanding its members when supported
+
+    The collection is read with a plain GET, and that is the response
+    stored for it. When the service advertises `ExpandQuery` support, the
+    collection is read again with `$expand=.($levels=1)` so that its
+    members arrive in one response. If that request fails, the members are
+    read individually.
+
+    :return: tuple of the collection response (None if the request failed)
+        and a `collection_members` generator for its members
+    """
+    r = get_resource(sut, uri)
+    if r is None:
+        return r, iter([])
+    pages = r
+    if r.ok and expand_supported(sut):
+        expanded = get_resource(sut, uri + '?$expand=.($levels=1)')
+        if expanded is not None and expanded.ok:
+            pages = expanded
+        elif expanded is not None:
+            logging.info('GET %s with $expand failed with status %s; '
+                         'reading the members individually' %
+                         (uri, expanded.status_code))
+    return r, collection_members(sut, uri, pages)
 
 
 def get_all_resources(sut: SystemUnderTest, uri='/redfish/v1/',
@@ -77,71 +197,68 @@ def get_default_resources(sut: SystemUnderTest, uri='/redfish/v1/',
     :return: dict elements containing the URI and `requests` response
     """
     # do GETs on spec-defined URIs
-    yield {'uri': '/redfish', 'response': sut.session.get(
-        sut.rhost + '/redfish')}
+    yield {'uri': '/redfish', 'response': send_request(
+        sut, 'GET', '/redfish')}
     yield {'uri': '/redfish/v1/odata', 'response':
-           sut.session.get(sut.rhost + '/redfish/v1/odata')}
+           send_request(sut, 'GET', '/redfish/v1/odata')}
     yield {'uri': '/redfish/v1', 'response':
-           sut.session.get(sut.rhost + '/redfish/v1')}
+           send_request(sut, 'GET', '/redfish/v1')}
     yield {'uri': '/redfish/v1/$metadata', 'response':
-           sut.session.get(sut.rhost + '/redfish/v1/$metadata',
-                           headers={'accept': 'application/xml'})}
-    yield {'uri': '/redfish/v1/openapi.yaml',
+           send_request(sut, 'GET', '/redfish/v1/$metadata',
+                        headers={'accept': 'application/xml'})}
+    yield {'uri': openapi.OPENAPI_URI,
            'request_type': RequestType.YAML,
-           'response': sut.session.get(sut.rhost + '/redfish/v1/openapi.yaml',
-                                       headers={'accept': 'application/yaml'})}
+           'response': openapi.fetch_openapi(sut)}
 
     # do HEAD on the service root
-    r = sut.session.head(sut.rhost + uri)
+    r = send_request(sut, 'HEAD', uri)
     yield {'uri': uri, 'response': r}
     # do GET on the service root
-    r = sut.session.get(sut.rhost + uri)
+    r = get_resource(sut, uri)
     yield {'uri': uri, 'response': r}
-    root = r.json() if r.status_code == requests.codes.OK else {}
+    root = (r.json() if r is not None and
+            r.status_code == requests.codes.OK else {})
 
     sut.set_version(root.get('RedfishVersion', '1.0.0'))
     sut.set_product(root.get('Product', 'N/A'))
     sut.set_service_uuid(root.get('UUID'))
     sut.set_supported_query_params(root.get('ProtocolFeaturesSupported', {}))
+    if sut.snapshot is not None:
+        sut.snapshot.bind(sut.service_uuid)
 
     for prop in ['Systems', 'Chassis']:
         if prop in root:
             uri = root[prop]['@odata.id']
             sut.set_nav_prop_uri(prop, uri)
-            r = sut.session.get(sut.rhost + uri)
+            r = get_resource(sut, uri)
             yield {'uri': uri, 'response': r}
-            if r.ok:
+            if response_ok(r):
                 data = r.json()
                 if 'Members' in data and len(data['Members']):
                     uri = data['Members'][0]['@odata.id']
-                    r = sut.session.get(sut.rhost + uri)
+                    r = get_resource(sut, uri)
                     yield {'uri': uri, 'response': r}
 
     if 'Managers' in root:
         uri = root['Managers']['@odata.id']
         sut.set_nav_prop_uri('Managers', uri)
-        r = sut.session.get(sut.rhost + uri)
+        r, members = read_collection(sut, uri)
         yield {'uri': uri, 'response': r}
-        if r.ok:
-            data = r.json()
-            if 'Members' in data and len(data['Members']):
-                for m in data['Members']:
-                    uri = m['@odata.id']
-                    r = sut.session.get(sut.rhost + uri)
-                    yield {'uri': uri, 'response': r}
-                    if r.ok:
-                        d = r.json()
-                        set_mfr_model_fw(sut, d)
-                        set_mgr_net_proto_uri(sut, d)
-                        for c in find_certificates(sut, d):
-                            yield c
+        for uri, r in members:
+            yield {'uri': uri, 'response': r}
+            if response_ok(r):
+                d = r.json()
+                set_mfr_model_fw(sut, d)
+                set_mgr_net_proto_uri(sut, d)
+                for c in find_certificates(sut, d):
+                    yield c
 
     if 'AccountService' in root:
         uri = root['AccountService']['@odata.id']
         sut.set_nav_prop_uri('AccountService', uri)
-        r = sut.session.get(sut.rhost + uri)
+        r = get_resource(sut, uri)
         yield {'uri': uri, 'response': r}
-        if r.ok:
+        if response_ok(r):
             data = r.json()
             if 'PrivilegeMap' in data:
                 uri = data['PrivilegeMap']['@odata.id']
@@ -149,60 +266,51 @@ def get_default_resources(sut: SystemUnderTest, uri='/redfish/v1/',
             for prop in ['Accounts', 'Roles']:
                 if prop in data:
                     uri = data[prop]['@odata.id']
-                    r = sut.session.get(sut.rhost + uri)
+                    r, members = read_collection(sut, uri)
                     yield {'uri': uri, 'response': r}
                     sut.set_nav_prop_uri(prop, uri)
-                    if r.ok:
-                        d = r.json()
-                        if 'Members' in d and len(d['Members']):
-                            if prop == 'Accounts':
-                                resource_type = ResourceType.MANAGER_ACCOUNT
-                                # get accounts up to sut.username
-                                for m in d['Members']:
-                                    uri = m['@odata.id']
-                                    r = sut.session.get(sut.rhost + uri)
-                                    yield {'uri': uri, 'response': r,
-                                           'resource_type': resource_type}
-                                    if r.ok:
-                                        sut.add_user(r.json())
-                                        if (r.json().get('UserName')
-                                                == sut.username):
-                                            break
-
-                            else:
-                                resource_type = ResourceType.ROLE
-                                # get all the roles
-                                for m in d['Members']:
-                                    uri = m['@odata.id']
-                                    r = sut.session.get(sut.rhost + uri)
-                                    yield {'uri': uri, 'response': r,
-                                           'resource_type': resource_type}
-                                    if r.ok:
-                                        sut.add_role(r.json())
+                    if prop == 'Accounts':
+                        resource_type = ResourceType.MANAGER_ACCOUNT
+                        # get accounts up to sut.username
+                        for uri, r in members:
+                            yield {'uri': uri, 'response': r,
+                                   'resource_type': resource_type}
+                            if response_ok(r):
+                                sut.add_user(r.json())
+                                if r.json().get('UserName') == sut.username:
+                                    break
+                    else:
+                        resource_type = ResourceType.ROLE
+                        # get all the roles
+                        for uri, r in members:
+                            yield {'uri': uri, 'response': r,
+                                   'resource_type': resource_type}
+                            if response_ok(r):
+                                sut.add_role(r.json())
 
     if 'SessionService' in root:
         uri = root['SessionService']['@odata.id']
-        r = sut.session.get(sut.rhost + uri)
+        r = get_resource(sut, uri)
         yield {'uri': uri, 'response': r}
-        if r.ok:
+        if response_ok(r):
             data = r.json()
             if 'Sessions' in data:
                 uri = data['Sessions']['@odata.id']
-                r = sut.session.get(sut.rhost + uri)
+                r = get_resource(sut, uri)
                 yield {'uri': uri, 'response': r}
-                if r.ok:
+                if response_ok(r):
                     data = r.json()
                     if 'Members' in data and len(data['Members']):
                         uri = data['Members'][0]['@odata.id']
-                        r = sut.session.get(sut.rhost + uri)
+                        r = get_resource(sut, uri)
                         yield {'uri': uri, 'response': r}
 
     if 'EventService' in root:
         uri = root['EventService']['@odata.id']
         sut.set_nav_prop_uri('EventService', uri)
-        r = sut.session.get(sut.rhost + uri)
+        r = get_resource(sut, uri)
         yield {'uri': uri, 'response': r}
-        if r.ok:
+        if response_ok(r):
             data = r.json()
             if 'Subscriptions' in data:
                 sut.set_nav_prop_uri(
@@ -220,9 +328,48 @@ def get_default_resources(sut: SystemUnderTest, uri='/redfish/v1/',
     if 'CertificateService' in root:
         uri = root['CertificateService']['@odata.id']
         sut.set_nav_prop_uri('CertificateService', uri)
-        r = sut.session.get(sut.rhost + uri)
+        r = get_resource(sut, uri)
         yield {'uri': uri, 'response': r}
 
+    if sut.openapi_seeds:
+        for r in read_openapi_seeds(sut):
+            yield r
+
+
+def read_openapi_seeds(sut: SystemUnderTest, max_workers=8):
+    """Generator function reading the OpenAPI paths the crawl did not reach
+
+    The template-free paths of the OpenAPI document that support GET are
+    read concurrently, except those already read and the SSE stream. Only
+    the resources read successfully are yielded; the others are not
+    implemented by the service.
+
+    :param sut: SystemUnderTest object
+    :return: dict elements containing the URI and `requests` response
+    """
+    if sut.openapi is None:
+        return
+    read = {u.rstrip('/') for u in sut.get_responses_by_method('GET')}
+    if sut.server_sent_event_uri:
+        read.add(sut.server_sent_event_uri.rstrip('/'))
+    seeds = [u for u in sut.openapi.seed_uris()
+             if u.rstrip('/') not in read]
+    if not seeds:
+        return
+    with ThreadPoolExecutor(max_workers=min(len(seeds),
+                                            max_workers)) as executor:
+        responses = list(executor.map(lambda u: get_resource(sut, u), seeds))
+    found = 0
+    for uri, r in zip(seeds, responses):
+        if response_ok(r):
+            found += 1
+            yield {'uri': uri, 'response': r}
+        elif r is not None:
+            logging.debug('GET %s from the OpenAPI document returned status '
+                          '%s' % (uri, r.status_code))
+    sut.add_metric(openapi.OPENAPI_CATEGORY, 'Seed URIs read',
+                   '%s of %s' % (found, len(seeds)))
+
 
 def read_target_resources(sut: SystemUnderTest, uri='/redfish/v1/',
                           uris=None, func=get_default_resources):
@@ -236,7 +383,14 @@ def read_target_resources(sut: SystemUnderTest, uri='/redfish/v1/',
         `get_all_resources`, or `get_select_resources`)
     """
     for r in func(sut, uri=uri, uris=uris):
+        if sut.deadline_passed:
+            logging.warning('Run time budget exhausted; stopping the read '
+                            'of the target resources')
+            break
         response = r['response']
+        if response is None:
+            # the request failed and was logged; go on to the next resource
+            continue
         uri = r['uri']
         resource_type = r.get('resource_type')
         request_type = r.get('request_type', RequestType.NORMAL)
@@ -266,9 +420,8 @@ def patch_other_account(sut: SystemUnderTest, session, user, password):
         new_user, new_password, new_acct_uri = create_account(
             sut, session, request_type=RequestType.NORMAL)
         if new_acct_uri:
-            new_session = requests.Session()
+            new_session = sut.transport.session()
             new_session.auth = (user, password)
-            new_session.verify = sut.verify
             pwd = patch_account(sut, new_session, new_acct_uri,
                                 request_type=RequestType.MODIFY_OTHER)
             if pwd:
@@ -375,15 +528,93 @@ def unsupported_requests(sut: SystemUnderTest):
     sut.add_response(uri, response)
 
 
+def probe_request(sut: SystemUnderTest, method, uri):
+    """Make a probe request, returning None if it fails in transit or the
+    run time budget is exhausted"""
+    if sut.deadline_passed:
+        return None
+    kwargs = {'json': {}} if method in probe_methods else {}
+    kwargs['allow_redirects'] = False
+    try:
+        return sut.session.request(method, sut.rhost + uri, **kwargs)
+    except requests.RequestException as e:
+        logging.warning('Caught %s during %s probe of %s' %
+                        (e.__class__.__name__, method, uri))
+        return None
+
+
+def allowed_method_requests(sut: SystemUnderTest, max_workers=8):
+    """Probe each resource with the methods its Allow header omits
+
+    A HEAD request is made for each resource read successfully that is
+    selected in the run's sample mode (or for an evenly spread sample of
+    `sut.probe_budget` of those). The resource is read again with GET in
+    the same round as its HEAD, so that the two can be compared like for
+    like. If `sut.probe_writes` is set, each of `probe_methods` missing from
+    the Allow header of the HEAD response is then sent with an empty JSON
+    body. Both rounds of requests are made concurrently, and redirects are
+    not followed. The responses are stored with RequestType.METHOD_PROBE.
+    """
+    uris = [u for u, r in sut.get_responses_by_method('GET').items()
+            if r.ok and '?' not in u]
+    sample = utils.sample_uris(templates.select_uris(sut, uris),
+                               sut.probe_budget)
+    if not sample:
+        return
+    start = time.monotonic()
+    probes = []
+    differ = compared = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        reads = [(m, u) for u in sample for m in ['HEAD', 'GET']]
+        responses = list(executor.map(lambda p: probe_request(sut, *p),
+                                      reads))
+        for (method, uri), r in zip(reads, responses):
+            if r is None:
+                continue
+            sut.add_response(uri, r, request_type=RequestType.METHOD_PROBE)
+            if method != 'HEAD':
+                continue
+            allow = utils.get_allowed_methods(r) if r.ok else None
+            if allow is None:
+                continue
+            if sut.probe_writes:
+                probes.extend((m, uri) for m in probe_methods
+                              if m not in allow)
+            expected = (sut.openapi.allowed_methods(uri)
+                        if sut.openapi is not None else None)
+            if expected is not None:
+                compared += 1
+                writes = {'PATCH', 'POST', 'PUT', 'DELETE'}
+                if (allow & writes) != (expected & writes):
+                    differ += 1
+        responses = list(executor.map(lambda p: probe_request(sut, *p),
+                                      probes))
+    for (method, uri), r in zip(probes, responses):
+        if r is not None:
+            sut.add_response(uri, r, request_type=RequestType.METHOD_PROBE)
+    if sut.deadline_passed:
+        logging.warning('Run time budget exhausted; allowed method probes '
+                        'stopped early')
+    sut.add_metric(PROBE_CATEGORY, 'Resources probed',
+                   '%s of %s' % (len(sample), len(uris)))
+    sut.add_metric(PROBE_CATEGORY, 'Omitted methods probed', len(probes),
+                   'requests')
+    sut.add_metric(PROBE_CATEGORY, 'Probe time',
+                   time.monotonic() - start, 'sec')
+    if compared:
+        sut.add_metric(PROBE_CATEGORY,
+                       'Allow headers differing from OpenAPI write methods',
+                       '%s of %s' % (differ, compared))
+
+
 def basic_auth_requests(sut: SystemUnderTest):
     headers = {
         'OData-Version': '4.0'
     }
     uri = sut.sessions_uri
     # good request
-    r = requests.get(sut.rhost + uri, headers=headers,
-                     auth=(sut.username, sut.password),
-                     verify=sut.verify)
+    r = sut.transport.get(sut.rhost + uri, headers=headers,
+                          auth=(sut.username, sut.password))
     sut.add_response(uri, r, request_type=RequestType.BASIC_AUTH)
 
 
@@ -414,8 +645,7 @@ def http_requests(sut: SystemUnderTest):
     elif not sut.avoid_http_redirect:
         # request using HTTP and no auth (should fail or redirect to HTTPS)
         try:
-            r = requests.get(http_rhost + uri, headers=headers,
-                             verify=sut.verify)
+            r = sut.transport.get(http_rhost + uri, headers=headers)
             sut.add_response(uri, r, request_type=RequestType.HTTP_NO_AUTH)
         except Exception as e:
             logging.warning(redirect_msg % e.__class__.__name__)
@@ -434,17 +664,15 @@ def http_requests(sut: SystemUnderTest):
     elif not sut.avoid_http_redirect:
         # request using HTTP and basic auth (should fail or redirect to HTTPS)
         try:
-            r = requests.get(http_rhost + uri, headers=headers,
-                             auth=(sut.username, sut.password),
-                             verify=sut.verify)
+            r = sut.transport.get(http_rhost + uri, headers=headers,
+                                  auth=(sut.username, sut.password))
             sut.add_response(uri, r, request_type=RequestType.HTTP_BASIC_AUTH)
         except Exception as e:
             logging.warning(redirect_msg % e.__class__.__name__)
             sut.set_avoid_http_redirect(True)
         # request using HTTP and no auth (should fail or redirect to HTTPS)
         try:
-            r = requests.get(http_rhost + uri, headers=headers,
-                             verify=sut.verify)
+            r = sut.transport.get(http_rhost + uri, headers=headers)
             sut.add_response(uri, r, request_type=RequestType.HTTP_NO_AUTH)
         except Exception as e:
             logging.warning(redirect_msg % e.__class__.__name__)
@@ -462,9 +690,9 @@ def bad_auth_requests(sut: SystemUnderTest):
     #       IP will be blocked for 600 seconds."
     uri = sut.sessions_uri
     h = headers.copy()
-    r = requests.get(sut.rhost + uri, headers=h,
-                     auth=(acct.new_username(set()), acct.new_password(sut)),
-                     verify=sut.verify)
+    r = sut.transport.get(sut.rhost + uri, headers=h,
+                          auth=(acct.new_username(set()),
+                                acct.new_password(sut)), auth_failure=True)
     sut.add_response(uri, r, request_type=RequestType.BAD_AUTH)
     # request with bad auth token
     token = 'rfpv%012x' % random.randrange(2 ** 48)  # ex: 'rfpv9e40b1f54c8a'
@@ -472,11 +700,55 @@ def bad_auth_requests(sut: SystemUnderTest):
     uri = '/redfish/v1/RPVfoobar'
     h = headers.copy()
     h.update({'X-Auth-Token': token})
-    r = requests.get(sut.rhost + uri, headers=h, verify=sut.verify)
+    r = sut.transport.get(sut.rhost + uri, headers=h, auth_failure=True)
     sut.add_response(uri, r, request_type=RequestType.BAD_AUTH)
 
 
-def read_uris_no_auth(sut: SystemUnderTest, session):
-    for uri in sut.get_all_uris():
-        response = session.get(sut.rhost + uri)
-        sut.add_response(uri, response, request_type=RequestType.NO_AUTH)
+def no_auth_request(sut: SystemUnderTest, session, uri):
+    """GET a URI without authentication, returning None if it fails in
+    transit or the run time budget is exhausted"""
+    if sut.deadline_passed:
+        return None
+    try:
+        return session.get(sut.rhost + uri)
+    except requests.RequestException as e:
+        logging.warning('Caught %s during unauthenticated GET of %s' %
+                        (e.__class__.__name__, uri))
+        return None
+
+
+def read_uris_no_auth(sut: SystemUnderTest, session, max_workers=8):
+    """Read the resources without authentication
+
+    The public URIs and the URIs the tests look up by name are always read.
+    The other URIs are selected in the run's sample mode, and at most
+    `sut.no_auth_budget` of those are read, spread evenly over the sorted
+    URIs. The requests are made concurrently and the responses stored with
+    RequestType.NO_AUTH.
+    """
+    uris = sut.get_all_uris()
+    named = [sut.sessions_uri, sut.mgr_net_proto_uri, sut.systems_uri,
+             sut.accounts_uri, sut.account_service_uri,
+             sut.privilege_registry_uri]
+    required = sorted(u for u in uris if u in public_uris or u in named)
+    others = templates.select_uris(sut, uris.difference(required))
+    sample = required + utils.sample_uris(others, sut.no_auth_budget)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(
+            lambda u: no_auth_request(sut, session, u), sample))
+    for uri, r in zip(sample, responses):
+        if r is not None:
+            sut.add_response(uri, r, request_type=RequestType.NO_AUTH)
+    if sut.deadline_passed:
+        logging.warning('Run time budget exhausted; unauthenticated reads '
+                        'stopped early')
+    sut.add_metric(NO_AUTH_CATEGORY, 'URIs read without authentication',
+                   '%s of %s' % (len(sample), len(uris)))
+    index = sut.uri_templates
+    if index is not None and sut.sample_mode != templates.SAMPLE_EXHAUSTIVE:
+        sut.add_metric(NO_AUTH_CATEGORY, 'Resource groups covered',
+                       '%s of %s' % (len({index.group(u) for u in sample}),
+                                     len({index.group(u) for u in uris})))
+    sut.add_metric(NO_AUTH_CATEGORY, 'Sweep time',
+                   time.monotonic() - start, 'sec')
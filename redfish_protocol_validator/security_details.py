@@ -4,17 +4,16 @@
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
 from base64 import b64decode
-import socket
 import ssl
 from urllib.parse import urlparse
 
 import requests
-from pyasn1.codec.der import decoder
-from pyasn1_modules import rfc5280
 from requests.adapters import HTTPAdapter
 from urllib3.poolmanager import PoolManager
 
+from redfish_protocol_validator import certificates
 from redfish_protocol_validator import sessions
+from redfish_protocol_validator import tls_scanner
 from redfish_protocol_validator import utils
 from redfish_protocol_validator.constants import Assertion, RequestType, ResourceType, Result
 from redfish_protocol_validator.system_under_test import SystemUnderTest
@@ -115,15 +114,11 @@ def test_certs_conform_to_x509v3(sut: SystemUnderTest):
     rhost = urlparse(sut.rhost)
     if rhost.scheme == 'https':
         try:
-            context = ssl.create_default_context()
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            conn = context.wrap_socket(socket.socket(socket.AF_INET),
-                                       server_hostname=rhost.hostname)
-            port = 443 if rhost.port is None else rhost.port
-            conn.connect((rhost.hostname, port))
-            bin_cert = conn.getpeercert(binary_form=True)
-            cert = decoder.decode(bin_cert, asn1Spec=rfc5280.Certificate())[0]
+            chain = certificates.fetch_presented_chain(sut)
+            if not chain:
+                raise ValueError('no certificate was presented')
+            version = certificates.certificate_version(
+                certificates.decode_certificate(sut, chain[0]))
         except Exception as e:
             msg = ('Exception caught while trying to retrieve and decode '
                    'certificate for %s; exception: %s'
@@ -131,10 +126,6 @@ def test_certs_conform_to_x509v3(sut: SystemUnderTest):
             sut.log(Result.FAIL, '', '', '',
                     Assertion.SEC_CERTS_CONFORM_X509V3, msg)
         else:
-            version = '<not found>'
-            if 'tbsCertificate' in cert:
-                if 'version' in cert['tbsCertificate']:
-                    version = str(cert['tbsCertificate']['version'])
             if version == 'v3':
                 sut.log(Result.PASS, '', '', '',
                         Assertion.SEC_CERTS_CONFORM_X509V3, 'Test passed')
@@ -143,6 +134,19 @@ def test_certs_conform_to_x509v3(sut: SystemUnderTest):
                        'retrieved is %s' % (sut.rhost, version))
                 sut.log(Result.FAIL, '', '', '',
                         Assertion.SEC_CERTS_CONFORM_X509V3, msg)
+            # the issuers in the chain (a legacy v1 root, for instance) are
+            # only reported
+            if len(chain) > 1:
+                versions = [version]
+                for der in chain[1:]:
+                    try:
+                        versions.append(certificates.certificate_version(
+                            certificates.decode_certificate(sut, der)))
+                    except Exception:
+                        versions.append('<undecodable>')
+                sut.add_metric(certificates.CERT_CATEGORY,
+                               'Presented chain X.509 versions',
+                               ', '.join(versions))
     else:
         msg = ('The scheme for the service at %s is not HTTPS'
                % sut.rhost)
@@ -338,7 +342,9 @@ def test_headers_auth_before_etag(sut: SystemUnderTest):
     responses = sut.get_responses_by_method(
         'GET', resource_type=ResourceType.MANAGER_ACCOUNT)
     etag_found = False
-    for uri, response in responses.items():
+    for uri, response in list(responses.items()):
+        response = utils.genuine_response(
+            sut, uri, response, resource_type=ResourceType.MANAGER_ACCOUNT)
         if response.ok:
             etag = response.headers.get('ETag')
             if etag:
@@ -346,8 +352,7 @@ def test_headers_auth_before_etag(sut: SystemUnderTest):
                 # make request w/ no auth and If-None-Match header
                 h = headers.copy()
                 h.update({'If-None-Match': etag})
-                r = requests.get(sut.rhost + uri, headers=h,
-                                 verify=sut.verify)
+                r = sut.transport.get(sut.rhost + uri, headers=h)
                 if r.status_code == requests.codes.UNAUTHORIZED:
                     sut.log(Result.PASS, 'GET', r.status_code, uri,
                             Assertion.SEC_HEADERS_FIRST, 'Test passed')
@@ -578,9 +583,8 @@ def test_session_create_https_only(sut: SystemUnderTest):
         }
         http_rhost = 'http' + sut.rhost[5:]
         try:
-            response = requests.post(
-                http_rhost + sut.sessions_uri, json=payload, headers=headers,
-                verify=sut.verify)
+            response = sut.transport.post(
+                http_rhost + sut.sessions_uri, json=payload, headers=headers)
         except Exception as e:
             sut.set_avoid_http_redirect(True)
             msg = ('Caught %s; unable to test this assertion' %
@@ -633,9 +637,8 @@ def test_session_termination_side_effects(sut: SystemUnderTest):
     # create a session
     new_session_uri, token = sessions.create_session(sut)
     if new_session_uri and token:
-        session = requests.Session()
+        session = sut.transport.session()
         session.headers.update({'X-Auth-Token': token})
-        session.verify = sut.verify
         # open the SSE stream
         response = None
         exc_name = ''
@@ -1128,9 +1131,12 @@ def test_authentication(sut: SystemUnderTest):
 
 def test_protocols(sut: SystemUnderTest):
     """Perform security protocol tests"""
+    if sut.tls_scan:
+        tls_scanner.scan_tls(sut)
     test_tls_1_1(sut)
     test_default_cert_replacement(sut)
     test_certs_conform_to_x509v3(sut)
+    certificates.check_certificate_members(sut)
 
 
 def test_security_details(sut: SystemUnderTest):
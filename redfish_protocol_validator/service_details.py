@@ -214,19 +214,26 @@ def test_event_oem_no_changed_registry_values(sut: SystemUnderTest):
 
 def pre_ssdp(sut: SystemUnderTest):
     """Perform prerequisite SSDP steps"""
+    # use the shared discovery index if one is configured
+    discover = utils.discover_ssdp
+    if sut.ssdp_cache:
+        discover = sut.ssdp_cache.get_services
+
     # discover using the redfish search target
-    services = utils.discover_ssdp(search_target=SSDP_REDFISH)
+    services = discover(search_target=SSDP_REDFISH)
     sut.add_ssdp_services(SSDP_REDFISH, services)
 
     # discover using the ssdp:all search target
-    services = utils.discover_ssdp(search_target=SSDP_ALL)
+    services = discover(search_target=SSDP_ALL)
     sut.add_ssdp_services(SSDP_ALL, services)
 
     # determine SSDP enabled/disabled state
     if sut.mgr_net_proto_uri:
-        r = sut.session.get(sut.rhost + sut.mgr_net_proto_uri)
+        uri, narrowed = utils.select_uri(sut, sut.mgr_net_proto_uri, ['SSDP'])
+        r = sut.session.get(sut.rhost + uri)
         if r.ok:
-            sut.add_response(sut.mgr_net_proto_uri, r)
+            if not narrowed:
+                sut.add_response(sut.mgr_net_proto_uri, r)
             d = r.json()
             if 'SSDP' in d and 'ProtocolEnabled' in d['SSDP']:
                 enabled = d['SSDP']['ProtocolEnabled']
@@ -259,8 +266,13 @@ def test_ssdp_can_be_disabled(sut: SystemUnderTest):
     if r and sut.ssdp_enabled:
         # Attempt to disable SSDP
         payload = {'SSDP': {'ProtocolEnabled': False}}
-        etag = r.headers.get('ETag')
-        headers = {'If-Match': etag} if etag else {}
+        if sut.supported_query_params.get('SelectQuery'):
+            # pre_ssdp() read a narrowed response; get the current ETag
+            headers = utils.get_etag_header(sut, sut.session,
+                                            sut.mgr_net_proto_uri)
+        else:
+            etag = r.headers.get('ETag')
+            headers = {'If-Match': etag} if etag else {}
         r = sut.session.patch(sut.rhost + sut.mgr_net_proto_uri,
                               json=payload, headers=headers)
         if r.ok:
@@ -694,14 +706,18 @@ def test_sse_unsuccessful_response(sut: SystemUnderTest):
                     Assertion.SERV_SSE_UNSUCCESSFUL_RESPONSE, 'Test passed')
 
 
-def read_sse_events(sse_response):
+def read_sse_events(sse_response, timeout=3, max_events=None):
     if sse_response is None:
         return None
-    client = utils.SSEClientTimeout(sse_response, timeout=3)
-    events = []
-    for event in client.events():
-        events.append(event)
-    return events
+    return utils.SSEReader(sse_response, timeout=timeout,
+                           max_events=max_events).wait()
+
+
+def start_sse_reader(sut: SystemUnderTest):
+    """Open the SSE stream and start reading events in the background"""
+    response = test_sse_successful_response(sut)
+    return utils.SSEReader(response, timeout=sut.sse_timeout,
+                           max_events=sut.sse_max_events).start()
 
 
 def test_sse_blank_lines_between_events(sut: SystemUnderTest, events):
@@ -731,7 +747,8 @@ def test_sse_blank_lines_between_events(sut: SystemUnderTest, events):
                 'Test passed')
 
 
-def test_sse_connection_open_until_closed(sut: SystemUnderTest, sse_response):
+def test_sse_connection_open_until_closed(sut: SystemUnderTest, sse_response,
+                                          ended=False):
     """Perform tests for Assertion.SERV_SSE_CONNECTION_OPEN_UNTIL_CLOSED."""
     if sse_response is None:
         msg = 'No ServerSentEvent stream opened; unable to test this assertion'
@@ -739,6 +756,12 @@ def test_sse_connection_open_until_closed(sut: SystemUnderTest, sse_response):
                 Assertion.SERV_SSE_CONNECTION_OPEN_UNTIL_CLOSED, msg)
         return
 
+    if ended:
+        msg = 'The service closed the SSE stream before the client closed it'
+        sut.log(Result.FAIL, '', '', '',
+                Assertion.SERV_SSE_CONNECTION_OPEN_UNTIL_CLOSED, msg)
+        return
+
     sse_response.close()
     for _ in sse_response:
         msg = 'After closing SSE stream, connection appears to still be open'
@@ -767,30 +790,29 @@ def test_sse_event_dest_deleted_on_close(sut: SystemUnderTest, response):
     # response closed above in assertion test_sse_connection_open_until_closed
 
     # wait for up to 3 seconds for EventDestination resource to be deleted
-    status = requests.codes.OK
-    for i in range(3):
+    def event_dest_gone():
         r = sut.session.get(sut.rhost + sut.event_dest_uri)
-        if r.ok:
-            # resource still present
-            status = r.status_code
-        elif r.status_code == requests.codes.NOT_FOUND:
-            sut.log(Result.PASS, 'GET', r.status_code, sut.event_dest_uri,
-                    Assertion.SERV_SSE_EVENT_DEST_DELETED_ON_CLOSE,
-                    'Test passed')
-            return
-        else:
-            msg = ('Unexpected status on GET to EventDestination resource; '
-                   'unable to test this assertion')
-            sut.log(Result.NOT_TESTED, 'GET', r.status_code,
-                    sut.event_dest_uri,
-                    Assertion.SERV_SSE_EVENT_DEST_DELETED_ON_CLOSE, msg)
-            return
-        time.sleep(1)
-
-    # if we didn't return in the above loop, resource was still present
-    msg = 'EventDestination resource not deleted when SSE stream closed'
-    sut.log(Result.FAIL, 'GET', status, sut.event_dest_uri,
-            Assertion.SERV_SSE_EVENT_DEST_DELETED_ON_CLOSE, msg)
+        # done unless the resource is still present
+        return not r.ok, r
+
+    result = utils.poll(event_dest_gone, timeout=3)
+    r = result.value
+    if r.status_code == requests.codes.NOT_FOUND:
+        sut.log(Result.PASS, 'GET', r.status_code, sut.event_dest_uri,
+                Assertion.SERV_SSE_EVENT_DEST_DELETED_ON_CLOSE,
+                'Test passed; resource deleted after %.3f seconds' %
+                result.elapsed)
+    elif not r.ok:
+        msg = ('Unexpected status on GET to EventDestination resource; '
+               'unable to test this assertion')
+        sut.log(Result.NOT_TESTED, 'GET', r.status_code,
+                sut.event_dest_uri,
+                Assertion.SERV_SSE_EVENT_DEST_DELETED_ON_CLOSE, msg)
+    else:
+        msg = ('EventDestination resource not deleted when SSE stream closed '
+               '(waited %.3f seconds)' % result.elapsed)
+        sut.log(Result.FAIL, 'GET', r.status_code, sut.event_dest_uri,
+                Assertion.SERV_SSE_EVENT_DEST_DELETED_ON_CLOSE, msg)
 
 
 def test_sse_events_sent_via_open_connection(sut: SystemUnderTest, events):
@@ -879,7 +901,7 @@ def test_sse_event_dest_context_opaque_str(sut: SystemUnderTest, event_dest):
 
 
 def test_sse_close_connection_if_event_dest_deleted(
-        sut: SystemUnderTest, sse_response, event_dest_uri):
+        sut: SystemUnderTest, sse_response, event_dest_uri, timeout=5):
     """Perform tests for
     Assertion.SERV_SSE_CLOSE_CONNECTION_IF_EVENT_DEST_DELETED."""
     if sse_response is None:
@@ -897,23 +919,26 @@ def test_sse_close_connection_if_event_dest_deleted(
 
     r = sut.session.delete(sut.rhost + event_dest_uri)
     if r.ok:
-        # give the service up to 5 seconds to close the stream
-        for _ in range(5):
-            time.sleep(1)
-            for _ in sse_response:
-                break
-            else:
-                sut.log(
-                    Result.PASS, 'DELETE', r.status_code, event_dest_uri,
-                    Assertion.SERV_SSE_CLOSE_CONNECTION_IF_EVENT_DEST_DELETED,
-                    'Test passed')
-                return
-        # if we didn't return in the loop above, the connection wasn't closed
-        msg = ('After deleting the EventDestination resource, the '
-               'connection appears to still be open')
-        sut.log(Result.FAIL, 'DELETE', r.status_code, event_dest_uri,
+        # the stream has no read timeout, so it is read in the background
+        # and closed by the reader if the service has not closed it within
+        # the timeout
+        start = time.monotonic()
+        reader = utils.SSEReader(sse_response, timeout=timeout)
+        reader.wait()
+        elapsed = time.monotonic() - start
+        if reader.ended:
+            sut.log(
+                Result.PASS, 'DELETE', r.status_code, event_dest_uri,
                 Assertion.SERV_SSE_CLOSE_CONNECTION_IF_EVENT_DEST_DELETED,
-                msg)
+                'Test passed; connection closed after %.3f seconds' %
+                elapsed)
+        else:
+            msg = ('After deleting the EventDestination resource, the '
+                   'connection appears to still be open (waited %.3f '
+                   'seconds)' % elapsed)
+            sut.log(Result.FAIL, 'DELETE', r.status_code, event_dest_uri,
+                    Assertion.SERV_SSE_CLOSE_CONNECTION_IF_EVENT_DEST_DELETED,
+                    msg)
     else:
         msg = 'Delete of EventDestination resource %s failed' % event_dest_uri
         sut.log(Result.FAIL, 'DELETE', r.status_code, event_dest_uri,
@@ -1094,13 +1119,16 @@ def test_discovery(sut: SystemUnderTest):
     test_ssdp_disable_additional_upnp_messages(sut)
 
 
-def test_server_sent_events(sut: SystemUnderTest):
+def test_server_sent_events(sut: SystemUnderTest, reader=None):
     """Perform server sent event tests"""
-    response = test_sse_successful_response(sut)
+    if reader is None:
+        reader = start_sse_reader(sut)
     test_sse_unsuccessful_response(sut)
-    events = read_sse_events(response)
+    # the reader is stopped before the tests below use the stream
+    events = reader.wait()
+    response = reader.event_source
     test_sse_blank_lines_between_events(sut, events)
-    test_sse_connection_open_until_closed(sut, response)
+    test_sse_connection_open_until_closed(sut, response, ended=reader.ended)
     test_sse_event_dest_deleted_on_close(sut, response)
     test_sse_events_sent_via_open_connection(sut, events)
     response, event_dest = test_sse_open_creates_event_dest(sut)
@@ -1120,8 +1148,12 @@ def test_update_service(sut: SystemUnderTest):
 
 def test_service_details(sut: SystemUnderTest):
     """Perform tests from the 'Service details' section of the spec."""
+    # open the SSE stream first so that events arriving during the eventing
+    # and discovery tests are kept; the read window starts when the events
+    # are consumed
+    reader = start_sse_reader(sut)
     test_eventing(sut)
     test_asynchronous_ops(sut)
     test_discovery(sut)
-    test_server_sent_events(sut)
+    test_server_sent_events(sut, reader=reader)
     test_update_service(sut)
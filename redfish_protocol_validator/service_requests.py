@@ -4,6 +4,7 @@
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
 import logging
+from datetime import timedelta
 from urllib.parse import urlparse
 
 import requests
@@ -12,6 +13,8 @@ from redfish_protocol_validator import utils
 from redfish_protocol_validator.constants import Assertion, RequestType, Result
 from redfish_protocol_validator.system_under_test import SystemUnderTest
 
+HEAD_CATEGORY = 'HEAD Consistency'
+
 
 def test_header(sut: SystemUnderTest, header, header_values, uri, assertion,
                 stream=False):
@@ -376,11 +379,29 @@ def test_get_collection_count_prop_total(sut: SystemUnderTest):
     count = data.get('Members@odata.count')
     members = len(data.get('Members'))
     if data.get('Members@odata.nextLink'):
-        # TODO(bdodd): Loop through all next links and count the actual members
         if count > members:
-            sut.log(Result.PASS, 'GET', response.status_code, uri,
-                    Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL,
-                    'Test passed')
+            # stream through the pages to count the actual members; sessions
+            # are created and deleted after the crawl, so the first page is
+            # read again and its count used
+            pages = utils.CollectionIterator(sut, uri)
+            total = sum(1 for _ in pages)
+            status = (pages.status if pages.status is not None
+                      else response.status_code)
+            if pages.error:
+                msg = ('Unable to read all pages of collection resource %s; '
+                       '%s' % (uri, pages.error))
+                sut.log(Result.NOT_TESTED, 'GET', status, uri,
+                        Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL, msg)
+            elif total == pages.count:
+                sut.log(Result.PASS, 'GET', status, uri,
+                        Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL,
+                        'Test passed')
+            else:
+                msg = ('The count property (%s) of collection resource %s was '
+                       'not equal to the number of members (%s) found in its '
+                       '%s pages' % (pages.count, uri, total, pages.pages))
+                sut.log(Result.FAIL, 'GET', status, uri,
+                        Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL, msg)
         else:
             msg = ('Collection resource %s contained a next link property but '
                    'the count property (%s) was less than or equal to the '
@@ -633,6 +654,105 @@ def test_head_differ_from_get(sut: SystemUnderTest):
                 Assertion.REQ_HEAD_DIFFERS_FROM_GET, msg)
 
 
+def _elapsed_ms(response):
+    """Get the time taken by a request in ms, or None if unknown"""
+    elapsed = getattr(response, 'elapsed', None)
+    if isinstance(elapsed, timedelta):
+        return elapsed.total_seconds() * 1000
+    return None
+
+
+def head_get_differences(head, get):
+    """Compare the headers of a HEAD response with those of the GET
+
+    Content-Length is only compared when both responses have it and use
+    the same Content-Encoding.
+
+    :return: list of messages describing the header values that differ
+    """
+    diffs = []
+    head_type = utils.get_response_media_type(head)
+    get_type = utils.get_response_media_type(get)
+    if head_type != get_type:
+        diffs.append('Content-Type %s (GET: %s)' % (
+            head_type or '<missing>', get_type or '<missing>'))
+    get_etag = get.headers.get('ETag')
+    if get_etag and head.headers.get('ETag') != get_etag:
+        diffs.append('ETag %s (GET: %s)' % (
+            head.headers.get('ETag', '<missing>'), get_etag))
+    head_len = head.headers.get('Content-Length')
+    get_len = get.headers.get('Content-Length')
+    if (head_len is not None and get_len is not None and
+            head.headers.get('Content-Encoding') ==
+            get.headers.get('Content-Encoding') and
+            str(head_len) != str(get_len)):
+        diffs.append('Content-Length %s (GET: %s)' % (head_len, get_len))
+    return diffs
+
+
+def test_head_consistent_with_get(sut: SystemUnderTest):
+    """Perform tests for Assertion.REQ_HEAD_DIFFERS_FROM_GET on each resource
+
+    The HEAD and GET responses come from the allowed method probes, which
+    read each resource (or a sample of them) with HEAD and GET in the same
+    concurrent round. A HEAD rejected with 405 or 501 is a warning. Other
+    statuses must match the GET; differing Content-Type, ETag or
+    Content-Length headers are warnings. HEAD and GET latency is recorded
+    per resource.
+    """
+    heads = sut.get_responses_by_method(
+        'HEAD', request_type=RequestType.METHOD_PROBE)
+    head_times = []
+    get_times = []
+    slower = 0
+    for uri, head in sorted(heads.items()):
+        get = sut.get_response('GET', uri,
+                               request_type=RequestType.METHOD_PROBE)
+        # the service root is covered by test_head_differ_from_get
+        if uri == '/redfish/v1/' or get is None:
+            continue
+        if (head.status_code in [requests.codes.METHOD_NOT_ALLOWED,
+                                 requests.codes.NOT_IMPLEMENTED] and
+                get.ok):
+            msg = ('HEAD request to uri %s returned status %s; the GET '
+                   'request succeeded' % (uri, head.status_code))
+            sut.log(Result.WARN, 'HEAD', head.status_code, uri,
+                    Assertion.REQ_HEAD_DIFFERS_FROM_GET, msg)
+            continue
+        if head.status_code != get.status_code:
+            msg = ('HEAD request to uri %s returned status %s; the GET '
+                   'request returned status %s' %
+                   (uri, head.status_code, get.status_code))
+            sut.log(Result.FAIL, 'HEAD', head.status_code, uri,
+                    Assertion.REQ_HEAD_DIFFERS_FROM_GET, msg)
+            continue
+        diffs = head_get_differences(head, get)
+        if diffs:
+            msg = ('HEAD request to uri %s returned headers that differ from '
+                   'the GET request: %s' % (uri, '; '.join(diffs)))
+            sut.log(Result.WARN, 'HEAD', head.status_code, uri,
+                    Assertion.REQ_HEAD_DIFFERS_FROM_GET, msg)
+        else:
+            sut.log(Result.PASS, 'HEAD', head.status_code, uri,
+                    Assertion.REQ_HEAD_DIFFERS_FROM_GET, 'Test passed')
+        head_ms = _elapsed_ms(head)
+        get_ms = _elapsed_ms(get)
+        if head_ms is not None and get_ms is not None:
+            sut.add_metric(HEAD_CATEGORY, 'HEAD vs GET latency',
+                           '%.1f / %.1f' % (head_ms, get_ms), 'ms', uri)
+            head_times.append(head_ms)
+            get_times.append(get_ms)
+            if head_ms > get_ms:
+                slower += 1
+    if head_times:
+        sut.add_metric(HEAD_CATEGORY, 'Mean HEAD latency',
+                       sum(head_times) / len(head_times), 'ms')
+        sut.add_metric(HEAD_CATEGORY, 'Mean GET latency',
+                       sum(get_times) / len(get_times), 'ms')
+        sut.add_metric(HEAD_CATEGORY, 'Resources where HEAD was slower',
+                       '%s of %s' % (slower, len(head_times)))
+
+
 def test_data_mod_errors(sut: SystemUnderTest):
     """Perform tests for Assertion.REQ_DATA_MOD_ERRORS."""
     found_error = False
@@ -1113,8 +1233,8 @@ def test_post_create_to_members_prop(sut: SystemUnderTest):
         'OData-Version': '4.0',
         'Content-Type': 'application/json;charset=utf-8'
     }
-    response = requests.post(sut.rhost + uri, json=payload, headers=headers,
-                             verify=sut.verify)
+    response = sut.transport.post(sut.rhost + uri, json=payload,
+                                  headers=headers)
     if response.ok:
         sut.log(Result.PASS, 'POST', response.status_code, uri,
                 Assertion.REQ_POST_CREATE_TO_MEMBERS_PROP,
@@ -1171,15 +1291,13 @@ def test_post_create_not_idempotent(sut: SystemUnderTest):
         'OData-Version': '4.0',
         'Content-Type': 'application/json;charset=utf-8'
     }
-    r1 = requests.post(sut.rhost + uri, json=payload, headers=headers,
-                       verify=sut.verify)
+    r1 = sut.transport.post(sut.rhost + uri, json=payload, headers=headers)
     if r1.ok:
         loc1 = r1.headers.get('Location')
         session_uri1 = ''
         if loc1 and isinstance(loc1, str):
             session_uri1 = urlparse(loc1).path
-        r2 = requests.post(sut.rhost + uri, json=payload, headers=headers,
-                           verify=sut.verify)
+        r2 = sut.transport.post(sut.rhost + uri, json=payload, headers=headers)
         if r2.ok:
             loc2 = r2.headers.get('Location')
             session_uri2 = ''
@@ -1316,6 +1434,7 @@ def test_query_params(sut: SystemUnderTest):
 def test_head(sut: SystemUnderTest):
     """Perform tests from the 'HEAD' sub-section of the spec."""
     test_head_differ_from_get(sut)
+    test_head_consistent_with_get(sut)
 
 
 def test_data_modification(sut: SystemUnderTest):
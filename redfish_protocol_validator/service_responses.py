@@ -3,11 +3,12 @@
 # License: BSD 3-Clause License. For full text see link:
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
-import io
-import xml.etree.ElementTree as ET
+import statistics
 
 import requests
 
+from redfish_protocol_validator import csdl
+from redfish_protocol_validator import sessions
 from redfish_protocol_validator import utils
 from redfish_protocol_validator.constants import Assertion, RequestType, ResourceType, Result
 from redfish_protocol_validator.system_under_test import SystemUnderTest
@@ -83,7 +84,8 @@ def test_allow_header_method_not_allowed(sut: SystemUnderTest):
     """Perform tests for Assertion.RESP_HEADERS_ALLOW_METHOD_NOT_ALLOWED."""
     found_method_not_allowed = False
     for req_type in [RequestType.NORMAL, RequestType.PATCH_COLLECTION,
-                     RequestType.PATCH_RO_RESOURCE]:
+                     RequestType.PATCH_RO_RESOURCE,
+                     RequestType.METHOD_PROBE]:
         for uri, response in sut.get_all_responses(request_type=req_type):
             if response.status_code == requests.codes.METHOD_NOT_ALLOWED:
                 found_method_not_allowed = True
@@ -125,6 +127,12 @@ def test_allow_header_get_or_head(sut: SystemUnderTest):
         else:
             test_header_present(sut, 'Allow', uri, method, response,
                                 Assertion.RESP_HEADERS_ALLOW_GET_OR_HEAD)
+    # HEAD requests from the allowed method probes
+    for uri, response in sut.get_responses_by_method(
+            'HEAD', request_type=RequestType.METHOD_PROBE).items():
+        if uri != '/redfish/v1/' and response.ok:
+            test_header_present(sut, 'Allow', uri, 'HEAD', response,
+                                Assertion.RESP_HEADERS_ALLOW_GET_OR_HEAD)
 
 
 def test_cache_control_header(sut: SystemUnderTest):
@@ -171,8 +179,10 @@ def test_etag_header(sut: SystemUnderTest):
     """Perform tests for Assertion.RESP_HEADERS_ETAG."""
     method = 'GET'
     found_response = False
-    for uri, response in sut.get_responses_by_method(
-            method, resource_type=ResourceType.MANAGER_ACCOUNT).items():
+    for uri, response in list(sut.get_responses_by_method(
+            method, resource_type=ResourceType.MANAGER_ACCOUNT).items()):
+        response = utils.genuine_response(
+            sut, uri, response, resource_type=ResourceType.MANAGER_ACCOUNT)
         if response.ok:
             found_response = True
             test_header_present(sut, 'ETag', uri, method, response,
@@ -243,7 +253,8 @@ def test_link_header(sut: SystemUnderTest):
             response = sut.get_response(method, uri)
             if response is None:
                 continue
-            elif not response.ok:
+            response = utils.genuine_response(sut, uri, response)
+            if not response.ok:
                 msg = ('No successful response found for %s request to %s; '
                        'unable to test this assertion' % (method, uri))
                 sut.log(Result.NOT_TESTED, method, response.status_code, uri,
@@ -362,6 +373,54 @@ def test_x_auth_token_header(sut: SystemUnderTest):
                 uri, Assertion.RESP_HEADERS_X_AUTH_TOKEN, msg)
 
 
+def test_x_auth_token_sample(sut: SystemUnderTest):
+    """Perform tests for Assertion.RESP_HEADERS_X_AUTH_TOKEN over a sample of
+    session tokens."""
+    if not sut.token_samples or not sut.sessions_uri:
+        # sampling is opt-in; test_x_auth_token_header reports a missing
+        # Sessions URI
+        return
+
+    sample = sessions.sample_session_tokens(sut, sut.token_samples)
+    analysis = utils.random_token_batch(sample.tokens)
+    timing = ''
+    if sample.create_times:
+        timing = '; median session create time %.1f ms' % (
+            statistics.median(sample.create_times) * 1000)
+        sut.add_metric('Session Token Sampling', 'Session create time '
+                       '(median)', statistics.median(sample.create_times) *
+                       1000, 'ms', sut.sessions_uri)
+    sut.add_metric('Session Token Sampling', 'Tokens sampled',
+                   len(sample.tokens), 'tokens', sut.sessions_uri)
+    sut.add_metric('Session Token Sampling', 'Sampling time',
+                   sample.elapsed, 's', sut.sessions_uri)
+    summary = ('%s of %s sessions created, %s hex tokens (%s bits) sampled '
+               'in %.1f seconds%s' % (
+                len(sample.tokens), sample.requested, analysis.tokens,
+                analysis.bits, sample.elapsed, timing))
+
+    if not analysis.tokens:
+        msg = ('No hexadecimal security tokens were sampled (%s); unable to '
+               'test this assertion' % summary)
+        sut.log(Result.NOT_TESTED, 'POST', '', sut.sessions_uri,
+                Assertion.RESP_HEADERS_X_AUTH_TOKEN, msg)
+        return
+
+    failed = sorted(name for name, p in analysis.p_values.items()
+                    if p is not None and p < 0.01)
+    if failed or analysis.token_failures:
+        msg = ('The sampled security tokens may not be sufficiently random; '
+               'failed stream tests: %s; tokens failing per-token tests: '
+               '%s (%s)' % (', '.join(failed) if failed else 'none',
+                            analysis.token_failures, summary))
+        sut.log(Result.WARN, 'POST', '', sut.sessions_uri,
+                Assertion.RESP_HEADERS_X_AUTH_TOKEN, msg)
+    else:
+        sut.log(Result.PASS, 'POST', '', sut.sessions_uri,
+                Assertion.RESP_HEADERS_X_AUTH_TOKEN,
+                'Test passed (%s)' % summary)
+
+
 def test_extended_error(sut: SystemUnderTest, status_code,
                         req_types, assertion):
     """Test that response is an extended error."""
@@ -460,32 +519,24 @@ def test_odata_metadata_entity_container(sut: SystemUnderTest):
                 Assertion.RESP_ODATA_METADATA_ENTITY_CONTAINER, msg)
     else:
         try:
-            tree = ET.iterparse(io.StringIO(response.text))
-            # strip the namespace
-            for _, el in tree:
-                _, _, el.tag = el.tag.rpartition('}')
-            root = tree.root
-            ec = None
-            ds = root.find('DataServices')
-            if ds is not None:
-                schema = ds.find('Schema')
-                if schema is not None:
-                    ec = schema.find('EntityContainer')
-            if ec is not None:
-                sut.log(Result.PASS, 'GET', response.status_code, uri,
-                        Assertion.RESP_ODATA_METADATA_ENTITY_CONTAINER,
-                        'Test passed')
-            else:
-                msg = ('EntityContainer element not found in OData metadata '
-                       'document')
-                sut.log(Result.FAIL, 'GET', response.status_code, uri,
-                        Assertion.RESP_ODATA_METADATA_ENTITY_CONTAINER, msg)
+            doc = csdl.read_metadata(sut, response)
         except Exception as e:
             msg = ('%s received while trying to read EntityContainer '
                    'element from the OData metadata document; error: "%s"' %
                    (e.__class__.__name__, e))
             sut.log(Result.FAIL, 'GET', response.status_code, uri,
                     Assertion.RESP_ODATA_METADATA_ENTITY_CONTAINER, msg)
+            return
+        if doc.entity_container is not None:
+            sut.log(Result.PASS, 'GET', response.status_code, uri,
+                    Assertion.RESP_ODATA_METADATA_ENTITY_CONTAINER,
+                    'Test passed')
+        else:
+            msg = ('EntityContainer element not found in OData metadata '
+                   'document')
+            sut.log(Result.FAIL, 'GET', response.status_code, uri,
+                    Assertion.RESP_ODATA_METADATA_ENTITY_CONTAINER, msg)
+        csdl.check_references(sut, doc)
 
 
 def test_odata_service_mime_type(sut: SystemUnderTest):
@@ -590,6 +641,7 @@ def test_response_headers(sut: SystemUnderTest):
     test_odata_version_header(sut)
     test_www_authenticate_header(sut)
     test_x_auth_token_header(sut)
+    test_x_auth_token_sample(sut)
 
 
 def test_response_status_codes(sut: SystemUnderTest):
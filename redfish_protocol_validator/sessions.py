@@ -4,10 +4,11 @@
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
 import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
-import requests
-
 from redfish_protocol_validator import accounts
 from redfish_protocol_validator.constants import RequestType
 from redfish_protocol_validator.system_under_test import SystemUnderTest
@@ -26,8 +27,8 @@ def bad_login(sut: SystemUnderTest):
     headers = {
         'OData-Version': '4.0'
     }
-    response = requests.post(sut.rhost + sut.sessions_uri, json=payload,
-                             headers=headers, verify=sut.verify)
+    response = sut.transport.post(sut.rhost + sut.sessions_uri, json=payload,
+                                  headers=headers, auth_failure=True)
     sut.add_response(sut.sessions_uri, response,
                      request_type=RequestType.BAD_AUTH)
 
@@ -41,8 +42,8 @@ def create_session(sut: SystemUnderTest):
         'OData-Version': '4.0',
         'Content-Type': 'application/json;charset=utf-8'
     }
-    response = requests.post(sut.rhost + sut.sessions_uri, json=payload,
-                             headers=headers, verify=sut.verify)
+    response = sut.transport.post(sut.rhost + sut.sessions_uri, json=payload,
+                                  headers=headers)
     if not response.ok:
         logging.warning('session POST status: %s, response: %s' % (
             response.status_code, response.text))
@@ -69,6 +70,103 @@ def delete_session(sut: SystemUnderTest, session, session_uri,
 
 
 def no_auth_session(sut: SystemUnderTest):
-    session = requests.Session()
-    session.verify = sut.verify
-    return session
+    return sut.transport.session()
+
+
+TokenSample = namedtuple('TokenSample', ['tokens', 'requested', 'errors',
+                                         'elapsed', 'create_times'])
+
+
+def _create_and_delete_session(sut: SystemUnderTest, session):
+    """Create a session and delete it again using its own token
+
+    Runs on a worker thread, so it only issues the HTTP requests.
+    :return: tuple of status code (or None), token and creation time
+    """
+    payload = {
+        'UserName': sut.username,
+        'Password': sut.password
+    }
+    headers = {
+        'OData-Version': '4.0',
+        'Content-Type': 'application/json;charset=utf-8'
+    }
+    start = time.monotonic()
+    try:
+        response = session.post(sut.rhost + sut.sessions_uri, json=payload,
+                                headers=headers)
+    except Exception as e:
+        logging.debug('Caught %s while creating session' %
+                      e.__class__.__name__)
+        return None, None, time.monotonic() - start
+    create_time = time.monotonic() - start
+    token = None
+    if response.ok:
+        token = response.headers.get('X-Auth-Token')
+        location = response.headers.get('Location')
+        if not location:
+            # fall back to the session's own URI so it is not leaked
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+            if isinstance(data, dict):
+                location = data.get('@odata.id')
+        if location and token:
+            try:
+                r = session.delete(sut.rhost + urlparse(location).path,
+                                   headers={'X-Auth-Token': token})
+            except Exception as e:
+                logging.warning('Caught %s while deleting sampled session %s'
+                                % (e.__class__.__name__, location))
+            else:
+                if not r.ok:
+                    logging.warning('DELETE of sampled session %s returned '
+                                    'status %s' % (location, r.status_code))
+    return response.status_code, token, create_time
+
+
+def sample_session_tokens(sut: SystemUnderTest, count, batch_size=4,
+                          rate=4.0):
+    """Collect session tokens by creating and deleting sessions
+
+    Sessions are created in concurrent batches of batch_size over a pooled
+    connection, with the start of each batch delayed so that no more than
+    rate sessions per second are created.
+
+    :param count: the number of sessions to create
+    :param batch_size: the number of concurrent session create requests
+    :param rate: the maximum number of sessions created per second
+    :return: a TokenSample
+    """
+    tokens = []
+    create_times = []
+    errors = 0
+    batch_size = max(1, min(batch_size, count))
+    session = sut.transport.session()
+    interval = batch_size / rate if rate else 0
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=batch_size) as executor:
+            for first in range(0, count, batch_size):
+                batch_start = time.monotonic()
+                size = min(batch_size, count - first)
+                futures = [executor.submit(_create_and_delete_session, sut,
+                                           session) for _ in range(size)]
+                for future in futures:
+                    status, token, create_time = future.result()
+                    if token:
+                        tokens.append(token)
+                        create_times.append(create_time)
+                    else:
+                        errors += 1
+                        if status is not None:
+                            logging.debug('Session create for token sampling '
+                                          'returned status %s' % status)
+                delay = interval - (time.monotonic() - batch_start)
+                if delay > 0 and first + batch_size < count:
+                    time.sleep(delay)
+    finally:
+        session.close()
+    return TokenSample(tokens, count, errors, time.monotonic() - start,
+                       create_times)
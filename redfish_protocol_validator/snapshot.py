@@ -0,0 +1,227 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import json
+import logging
+import os
+import re
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+from redfish_protocol_validator import utils
+from redfish_protocol_validator.constants import Assertion, Result
+
+SNAPSHOT_CATEGORY = 'Incremental Validation'
+
+# version of the snapshot file layout
+SNAPSHOT_FORMAT = 2
+
+
+def _safe_name(name):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', name)
+
+
+class Snapshot(object):
+    """Persisted snapshot of a service's resources and per-resource results
+
+    The snapshot holds the ETags of the successful GET responses that have
+    one (in the header or the @odata.etag property), along with the results
+    of the assertions computed from each response alone. It is written to
+    `<cache_dir>/<host>/<service UUID>.json` at the end of a run.
+
+    In incremental mode the previous run's snapshot is loaded, resources
+    are read with If-None-Match, and resources found unchanged reuse the
+    previous results instead of being analyzed again. Snapshots written by
+    a different version of the validator are ignored.
+    """
+    def __init__(self, cache_dir, rhost, tool_version, incremental=False):
+        """Create the snapshot
+
+        :param cache_dir: the directory holding the snapshot files
+        :type cache_dir: str
+        :param rhost: the address of the Redfish service (with scheme)
+        :type rhost: str
+        :param tool_version: the version of the validator
+        :type tool_version: str
+        :param incremental: True to revalidate against the previous run
+        :type incremental: bool
+        """
+        self.cache_dir = str(cache_dir)
+        self.host = _safe_name(urlparse(rhost).netloc)
+        self.tool_version = tool_version
+        self.incremental = incremental
+        self.path = None
+        self._previous = {}
+        self._lock = threading.Lock()
+        self.revalidated = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.reused = 0
+
+    def bind(self, service_uuid):
+        """Select the snapshot file for the service and load the previous run
+
+        :param service_uuid: the UUID from the Service Root
+        """
+        if not service_uuid:
+            logging.warning('Service UUID not found in Service Root; '
+                            'resource snapshots disabled')
+            return
+        self.path = os.path.join(self.cache_dir, self.host,
+                                 '%s.json' % _safe_name(service_uuid.lower()))
+        if self.incremental:
+            self._previous = self._load()
+
+    @property
+    def bound(self):
+        return self.path is not None
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (not isinstance(data, dict) or
+                data.get('format') != SNAPSHOT_FORMAT or
+                data.get('tool_version') != self.tool_version):
+            logging.info('Ignoring resource snapshot %s written by another '
+                         'version of the validator' % self.path)
+            return {}
+        resources = data.get('resources')
+        return resources if isinstance(resources, dict) else {}
+
+    def get(self, sut, uri, **kwargs):
+        """GET a resource, revalidating it against the previous snapshot
+
+        If the previous run saw the resource, the request carries its ETag
+        in an If-None-Match header. A 304 (Not Modified) response only tells
+        that the previous results can be replayed; the resource is then read
+        again without the header, so that the other tests check the
+        service's current response. The returned response has an
+        `unchanged` attribute set to True when it has the same ETag as the
+        previous run.
+
+        :param sut: the SystemUnderTest object
+        :param uri: the URI of the resource
+        :param kwargs: additional keyword args passed to the session's get()
+        :return: the `requests` response
+        """
+        entry = self._previous.get(uri)
+        etag = entry.get('etag') if isinstance(entry, dict) else None
+        if not etag:
+            return sut.session.get(sut.rhost + uri, **kwargs)
+        headers = dict(kwargs.get('headers') or {})
+        headers['If-None-Match'] = etag
+        r = sut.session.get(sut.rhost + uri,
+                            **dict(kwargs, headers=headers))
+        not_modified = r.status_code == requests.codes.NOT_MODIFIED
+        if not_modified:
+            logging.debug('GET %s with If-None-Match %s returned 304; '
+                          'reading the current response' % (uri, etag))
+            r.close()
+            r = sut.session.get(sut.rhost + uri, **kwargs)
+        try:
+            r.unchanged = r.ok and utils.get_response_etag(r) == etag
+        except ValueError:
+            r.unchanged = False
+        with self._lock:
+            self.revalidated += 1
+            if not_modified:
+                self.not_modified += 1
+            if r.unchanged:
+                self.unchanged += 1
+        return r
+
+    def replay(self, sut, uri, response):
+        """Log the previous run's results for an unchanged resource
+
+        :param sut: the SystemUnderTest object
+        :param uri: the URI of the resource
+        :param response: the response to the GET of the resource
+        :return: True if results were logged, False if the response needs
+            to be analyzed
+        """
+        if (not getattr(response, 'unchanged', False) or
+                response.request.method != 'GET'):
+            return False
+        entry = self._previous.get(uri)
+        results = entry.get('results') if isinstance(entry, dict) else None
+        if not results:
+            return False
+        try:
+            replayed = [(Result[r['result']], r['status'],
+                         Assertion[r['assertion']], r['msg'])
+                        for r in results]
+        except (KeyError, TypeError):
+            return False
+        for result, status, assertion, msg in replayed:
+            sut.log(result, 'GET', status, uri, assertion, msg)
+        self.reused += len(replayed)
+        return True
+
+    def save(self, sut, assertions):
+        """Write the snapshot of this run's resources
+
+        :param sut: the SystemUnderTest object
+        :param assertions: the assertions computed from a single GET
+            response whose results are saved with each resource
+        """
+        if not self.bound:
+            return
+        results = {}
+        for assertion in assertions:
+            for entry in sut.results.get(assertion, []):
+                if entry['method'] == 'GET':
+                    results.setdefault(entry['uri'], []).append({
+                        'assertion': assertion.name,
+                        'result': entry['result'].name,
+                        'status': entry['status'],
+                        'msg': entry['msg']
+                    })
+        resources = {}
+        for uri, response in sut.get_responses_by_method('GET').items():
+            # members synthesized from an expanded collection have no
+            # headers of their own to save
+            if (response.status_code != requests.codes.OK or
+                    getattr(response, 'expanded', False)):
+                continue
+            try:
+                etag = utils.get_response_etag(response)
+            except ValueError:
+                etag = None
+            if not etag:
+                continue
+            resources[uri] = {
+                'etag': etag,
+                'status': response.status_code,
+                'results': results.get(uri, [])
+            }
+        data = {
+            'format': SNAPSHOT_FORMAT,
+            'tool_version': self.tool_version,
+            'rhost': sut.rhost,
+            'resources': resources
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def add_metrics(self, sut):
+        """Record the revalidation counts as metrics"""
+        if not self.revalidated:
+            return
+        sut.add_metric(SNAPSHOT_CATEGORY, 'Resources revalidated',
+                       self.revalidated, 'resources')
+        sut.add_metric(SNAPSHOT_CATEGORY, 'Resources not modified (304)',
+                       self.not_modified, 'resources')
+        sut.add_metric(SNAPSHOT_CATEGORY, 'Resources unchanged',
+                       self.unchanged, 'resources')
+        sut.add_metric(SNAPSHOT_CATEGORY, 'Results reused', self.reused,
+                       'results')
@@ -4,10 +4,12 @@
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
 import logging
+import time
 from urllib.parse import urlparse
 
 import requests
 
+from redfish_protocol_validator.transport import Transport
 from redfish_protocol_validator.utils import redfish_version_to_tuple
 from redfish_protocol_validator.constants import RequestType, Result
 
@@ -43,10 +45,19 @@ class SystemUnderTest(object):
         self._mgr_net_proto_uri = None
         self._ssdp_enabled = False
         self._ssdp_services = {}
+        self._ssdp_cache = None
+        self._snapshot = None
+        self._csdl_cache = None
+        self._openapi = None
+        self._openapi_cache = None
         self._results = {}
+        self._metrics = {}
         self._responses = {}
         self._typed_responses = {}
         self._verify = verify
+        self._transport = None
+        self._time_budget = None
+        self._deadline = None
         self._priv_info = set()
         self._priv_info.add(password)
         self._users = {}
@@ -54,6 +65,19 @@ class SystemUnderTest(object):
         self._cert_coll = {}
         self._supported_query_params = {}
         self._avoid_http_redirect = False
+        self._sse_timeout = 3
+        self._sse_max_events = None
+        self._token_samples = 0
+        self._probe_budget = None
+        self._probe_writes = False
+        self._openapi_seeds = False
+        self._no_auth_budget = None
+        self._sample_mode = 'exhaustive'
+        self._sample_size = 3
+        self._uri_templates = None
+        self._tls_scan = False
+        self._server_cert_chain = None
+        self._decoded_certs = {}
         self._summary = {
             Result.PASS: 0,
             Result.WARN: 0,
@@ -101,6 +125,39 @@ class SystemUnderTest(object):
     def verify(self):
         return self._verify
 
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = Transport(verify=self.verify)
+        return self._transport
+
+    def set_timeouts(self, connect_timeout, read_timeout):
+        self.transport.connect_timeout = connect_timeout
+        self.transport.read_timeout = read_timeout
+
+    def set_time_budget(self, seconds):
+        """Set the run time budget in seconds, starting now (None for none)"""
+        self._time_budget = seconds
+        self._deadline = None
+        if seconds is not None:
+            self._deadline = time.monotonic() + seconds
+
+    @property
+    def time_budget(self):
+        return self._time_budget
+
+    @property
+    def deadline_passed(self):
+        return (self._deadline is not None and
+                time.monotonic() >= self._deadline)
+
+    def set_max_retries(self, max_retries):
+        self.transport.set_max_retries(max_retries)
+
+    def set_rate_limits(self, max_rate=None, max_in_flight=None):
+        self.transport.set_limits(max_rate=max_rate,
+                                  max_in_flight=max_in_flight)
+
     def set_product(self, product):
         self._product = product
 
@@ -199,6 +256,41 @@ class SystemUnderTest(object):
         services = self._ssdp_services.get(search_target, {})
         return services.get(uuid)
 
+    def set_ssdp_cache(self, cache):
+        self._ssdp_cache = cache
+
+    @property
+    def ssdp_cache(self):
+        return self._ssdp_cache
+
+    def set_snapshot(self, snapshot):
+        self._snapshot = snapshot
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def set_csdl_cache(self, cache):
+        self._csdl_cache = cache
+
+    @property
+    def csdl_cache(self):
+        return self._csdl_cache
+
+    def set_openapi(self, index):
+        self._openapi = index
+
+    @property
+    def openapi(self):
+        return self._openapi
+
+    def set_openapi_cache(self, cache):
+        self._openapi_cache = cache
+
+    @property
+    def openapi_cache(self):
+        return self._openapi_cache
+
     def set_ssdp_enabled(self, enabled):
         self._ssdp_enabled = enabled
 
@@ -213,6 +305,100 @@ class SystemUnderTest(object):
     def avoid_http_redirect(self):
         return self._avoid_http_redirect
 
+    def set_sse_timeout(self, timeout):
+        self._sse_timeout = timeout
+
+    @property
+    def sse_timeout(self):
+        return self._sse_timeout
+
+    def set_sse_max_events(self, max_events):
+        self._sse_max_events = max_events
+
+    @property
+    def sse_max_events(self):
+        return self._sse_max_events
+
+    def set_token_samples(self, count):
+        self._token_samples = count
+
+    @property
+    def token_samples(self):
+        return self._token_samples
+
+    def set_probe_budget(self, count):
+        self._probe_budget = count
+
+    @property
+    def probe_budget(self):
+        return self._probe_budget
+
+    def set_probe_writes(self, probe_writes):
+        self._probe_writes = probe_writes
+
+    @property
+    def probe_writes(self):
+        return self._probe_writes
+
+    def set_openapi_seeds(self, openapi_seeds):
+        self._openapi_seeds = openapi_seeds
+
+    @property
+    def openapi_seeds(self):
+        return self._openapi_seeds
+
+    def set_no_auth_budget(self, count):
+        self._no_auth_budget = count
+
+    @property
+    def no_auth_budget(self):
+        return self._no_auth_budget
+
+    def set_sample_mode(self, mode):
+        self._sample_mode = mode
+
+    @property
+    def sample_mode(self):
+        return self._sample_mode
+
+    def set_sample_size(self, count):
+        self._sample_size = count
+
+    @property
+    def sample_size(self):
+        return self._sample_size
+
+    def set_uri_templates(self, index):
+        self._uri_templates = index
+
+    @property
+    def uri_templates(self):
+        return self._uri_templates
+
+    def set_tls_scan(self, val: bool):
+        self._tls_scan = val
+
+    @property
+    def tls_scan(self):
+        return self._tls_scan
+
+    def set_server_cert_chain(self, chain):
+        self._server_cert_chain = chain
+
+    @property
+    def server_cert_chain(self):
+        return self._server_cert_chain
+
+    @property
+    def server_cert(self):
+        if self._server_cert_chain:
+            return self._server_cert_chain[0]
+        return None
+
+    @property
+    def decoded_certs(self):
+        return self._decoded_certs
+
     def set_nav_prop_uri(self, prop, uri):
         if prop == 'Systems':
             self._systems_uri = uri
@@ -345,9 +531,10 @@ class SystemUnderTest(object):
             self._typed_responses[request_type][resource_type][method][uri] = (
                 response)
         logging.debug('response status = %s, method = %s, uri = %s, '
-                      'resource_type = %s, request_type = %s' % (
+                      'resource_type = %s, request_type = %s, '
+                      'attempts = %s' % (
                        response.status_code, method, uri, resource_type,
-                       request_type))
+                       request_type, getattr(response, 'attempts', 1)))
 
     def get_all_responses(self, resource_type=None,
                           request_type=RequestType.NORMAL):
@@ -407,6 +594,22 @@ class SystemUnderTest(object):
             self._results[assertion] = [entry]
         self._summary[result] += 1
 
+    @property
+    def metrics(self):
+        return self._metrics
+
+    def add_metric(self, category, name, value, unit='', uri=''):
+        entry = {
+            'name': name,
+            'value': value,
+            'unit': unit,
+            'uri': uri
+        }
+        if category in self._metrics:
+            self._metrics[category].append(entry)
+        else:
+            self._metrics[category] = [entry]
+
     def add_priv_info(self, priv_info):
         if priv_info:
             self._priv_info.add(priv_info)
@@ -425,17 +628,15 @@ class SystemUnderTest(object):
         :param headers: HTTP headers to pass to the GET requests
         :return: the Sessions URI
         """
-        r = requests.get(self.rhost + '/redfish/v1/', headers=headers,
-                         verify=self.verify)
+        r = self.transport.get(self.rhost + '/redfish/v1/', headers=headers)
         if r.status_code == requests.codes.OK:
             data = r.json()
             if 'Links' in data and 'Sessions' in data['Links']:
                 return data['Links']['Sessions']['@odata.id']
             elif 'SessionService' in data:
                 uri = data['SessionService']['@odata.id']
-                r = requests.get(self.rhost + uri, headers=headers,
-                                 auth=(self.username, self.password),
-                                 verify=self.verify)
+                r = self.transport.get(self.rhost + uri, headers=headers,
+                                       auth=(self.username, self.password))
                 if r.status_code == requests.codes.OK:
                     data = r.json()
                     if 'Sessions' in data:
@@ -457,9 +658,9 @@ class SystemUnderTest(object):
         }
         sessions_uri = self._get_sessions_uri(headers)
         self.set_sessions_uri(sessions_uri)
-        session = requests.Session()
-        response = requests.post(self.rhost + sessions_uri, json=payload,
-                                 headers=headers, verify=self.verify)
+        session = self.transport.session()
+        response = self.transport.post(self.rhost + sessions_uri, json=payload,
+                                       headers=headers)
         if response.ok:
             # Redfish Session created; use it
             location = response.headers.get('Location')
@@ -484,7 +685,6 @@ class SystemUnderTest(object):
         session.headers.update({'Accept-Encoding': 'identity'})
         # TODO(bdodd): any other default headers to set?
         # session.headers.update({'Accept': 'application/json'})
-        session.verify = self.verify
         self._set_session(session)
         return session
 
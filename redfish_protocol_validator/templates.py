@@ -0,0 +1,194 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+from redfish_protocol_validator import utils
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+TEMPLATE_CATEGORY = 'URI Templates'
+
+# ways of selecting the resources for the per-resource checks
+SAMPLE_EXHAUSTIVE = 'exhaustive'
+SAMPLE_STRATIFIED = 'stratified'
+SAMPLE_TEMPLATE = 'template'
+sample_modes = [SAMPLE_EXHAUSTIVE, SAMPLE_STRATIFIED, SAMPLE_TEMPLATE]
+
+# the template segment standing for a member identifier
+VARIABLE = '{id}'
+
+
+def _path(uri):
+    """Get the path of a URI without its query or trailing slash"""
+    path = uri.partition('?')[0].partition('#')[0]
+    return path.rstrip('/') or '/'
+
+
+def _parent(path):
+    return path.rpartition('/')[0] or '/'
+
+
+def _unversioned(odata_type):
+    """Get the namespace and type name of an @odata.type, without version"""
+    name = odata_type.lstrip('#')
+    namespace, _, rest = name.partition('.')
+    return '%s.%s' % (namespace, rest.rpartition('.')[2])
+
+
+def _resource_data(response):
+    if (response is None or not response.ok or
+            utils.get_response_media_type(response) != 'application/json'):
+        return None
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class TemplateIndex(object):
+    """Clusters resource URIs into URI templates
+
+    A path segment becomes a variable in the template when its resource is
+    a member of a collection that was read, or when it has siblings of the
+    same resource type (for instance the members of a collection that was
+    not read). When the OpenAPI document was indexed, its path templates
+    are used for the URIs it matches. URIs are grouped by template and
+    @odata.type, so a group holds structurally identical resources.
+    """
+    def __init__(self, types, members, openapi=None):
+        """Create the index
+
+        :param types: dict of URI to the @odata.type of its resource
+        :param members: set of the paths of collection members
+        :param openapi: the OpenApiIndex, or None
+        """
+        self.types = types
+        self._members = members
+        self._openapi = openapi
+        self._variable = set()
+        self._templates = {}
+        by_depth = {}
+        for uri, odata_type in types.items():
+            path = _path(uri)
+            if path != '/':
+                by_depth.setdefault(path.count('/'), {}).setdefault(
+                    (_parent(path), _unversioned(odata_type)), set()).add(path)
+        # the templates of the parents are final once the shallower levels
+        # are resolved, so siblings are grouped a level at a time
+        for depth in sorted(by_depth):
+            siblings = {}
+            for (parent, odata_type), paths in by_depth[depth].items():
+                key = (self._path_template(parent), odata_type)
+                siblings.setdefault(key, set()).update(paths)
+            for paths in siblings.values():
+                if len({p.rpartition('/')[2] for p in paths}) > 1:
+                    self._variable.update(paths)
+        self.groups = {}
+        for uri in sorted(types):
+            self.groups.setdefault(self.group(uri), []).append(uri)
+
+    def _path_template(self, path):
+        if path == '/':
+            return ''
+        template = self._templates.get(path)
+        if template is None:
+            parent, _, segment = path.rpartition('/')
+            if path in self._members or path in self._variable:
+                segment = VARIABLE
+            template = '%s/%s' % (self._path_template(parent or '/'),
+                                  segment)
+            self._templates[path] = template
+        return template
+
+    def template(self, uri):
+        """Get the URI template of a URI
+
+        A trailing slash and the query of the URI are kept.
+        """
+        if self._openapi is not None:
+            template = self._openapi.match(uri)
+            if template is not None:
+                return template
+        path, sep, query = uri.partition('?')
+        template = self._path_template(_path(path)) or '/'
+        if path.endswith('/') and template != '/':
+            template += '/'
+        return template + sep + query
+
+    def group(self, uri):
+        """Get the key of the group of structurally identical resources
+
+        A URI without a known resource type is a group of its own.
+        """
+        if uri not in self.types:
+            return uri, None
+        return self.template(uri), self.types[uri]
+
+    def sample(self, uris, mode, size=1):
+        """Select the URIs to check in a sample mode
+
+        :param uris: the URIs to select from
+        :param mode: one of `sample_modes`; exhaustive selects every URI,
+            stratified up to `size` URIs of each group spread evenly over
+            the group, and template the first URI of each group
+        :param size: the number of URIs per group in stratified mode
+        :return: sorted list of the selected URIs
+        """
+        if mode == SAMPLE_EXHAUSTIVE:
+            return sorted(uris)
+        groups = {}
+        for uri in sorted(uris):
+            groups.setdefault(self.group(uri), []).append(uri)
+        per_group = size if mode == SAMPLE_STRATIFIED else 1
+        return sorted(u for g in groups.values()
+                      for u in utils.sample_uris(g, per_group))
+
+
+def build_index(sut: SystemUnderTest):
+    """Build the template index of the resources read with GET
+
+    The index is set on the SystemUnderTest. When the run samples the
+    resources, the index size is recorded as metrics.
+
+    :param sut: the SystemUnderTest object
+    :return: the TemplateIndex
+    """
+    types = {}
+    members = set()
+    for uri, response in sut.get_responses_by_method('GET').items():
+        data = _resource_data(response)
+        if data is None:
+            continue
+        odata_type = data.get('@odata.type')
+        if isinstance(odata_type, str) and odata_type:
+            types[uri] = odata_type
+        if isinstance(data.get('Members'), list):
+            for m in data['Members']:
+                if isinstance(m, dict) and isinstance(m.get('@odata.id'), str):
+                    members.add(_path(m['@odata.id']))
+    index = TemplateIndex(types, members, openapi=sut.openapi)
+    sut.set_uri_templates(index)
+    if sut.sample_mode != SAMPLE_EXHAUSTIVE:
+        sut.add_metric(TEMPLATE_CATEGORY, 'Resources indexed', len(types),
+                       'resources')
+        sut.add_metric(TEMPLATE_CATEGORY, 'Resource groups',
+                       len(index.groups), 'groups')
+        sut.add_metric(TEMPLATE_CATEGORY, 'Sample mode', sut.sample_mode)
+    return index
+
+
+def select_uris(sut: SystemUnderTest, uris):
+    """Select the URIs for a per-resource check in the run's sample mode
+
+    URIs outside the index each form a group of their own, so they are
+    always selected.
+
+    :param sut: the SystemUnderTest object
+    :param uris: the URIs to select from
+    :return: sorted list of the selected URIs
+    """
+    index = sut.uri_templates
+    if index is None:
+        return sorted(uris)
+    return index.sample(uris, sut.sample_mode, sut.sample_size)
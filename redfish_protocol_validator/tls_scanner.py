@@ -0,0 +1,225 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import logging
+import socket
+import ssl
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from redfish_protocol_validator import certificates
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+TLS_CATEGORY = 'TLS Scan'
+
+TlsProbe = namedtuple('TlsProbe', ['protocol', 'cipher', 'accepted',
+                                   'negotiated_cipher', 'handshake_time',
+                                   'chain', 'error'])
+
+# (name, ssl.HAS_* flag, ssl.TLSVersion member) in ascending order
+_protocols = [
+    ('TLSv1', 'HAS_TLSv1', 'TLSv1'),
+    ('TLSv1.1', 'HAS_TLSv1_1', 'TLSv1_1'),
+    ('TLSv1.2', 'HAS_TLSv1_2', 'TLSv1_2'),
+    ('TLSv1.3', 'HAS_TLSv1_3', 'TLSv1_3'),
+]
+
+
+def host_and_port(sut: SystemUnderTest):
+    rhost = urlparse(sut.rhost)
+    port = 443 if rhost.port is None else rhost.port
+    return rhost.hostname, port
+
+
+class TlsScanner(object):
+    """Probe the TLS protocol versions and cipher suites a service accepts
+
+    Each protocol version and cipher suite offered by the local OpenSSL is
+    tried in its own handshake, with the handshakes spread over a bounded
+    pool of worker threads. If a transport Governor is given, each
+    connection takes a request token from it, so the scan keeps to the
+    run's rate and concurrency limits.
+    """
+    def __init__(self, hostname, port, max_workers=8, timeout=5,
+                 governor=None):
+        self.hostname = hostname
+        self.port = port
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.governor = governor
+
+    @staticmethod
+    def local_protocols():
+        """Get the protocol versions supported by the local OpenSSL"""
+        if not hasattr(ssl, 'TLSVersion'):
+            return []
+        return [(name, getattr(ssl.TLSVersion, member))
+                for name, flag, member in _protocols
+                if getattr(ssl, flag, False)]
+
+    @staticmethod
+    def _context(version, cipher=None):
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        ctx.minimum_version = version
+        ctx.maximum_version = version
+        # security level 0 so legacy protocols and ciphers can be offered
+        ctx.set_ciphers('%s:@SECLEVEL=0' % (cipher if cipher else 'ALL'))
+        return ctx
+
+    @classmethod
+    def local_ciphers(cls, name, version):
+        """Get the (TLS 1.2 and earlier) cipher suites offered locally"""
+        if name == 'TLSv1.3':
+            # TLS 1.3 suites cannot be selected individually
+            return [None]
+        try:
+            ciphers = cls._context(version).get_ciphers()
+        except ssl.SSLError:
+            return []
+        return [c['name'] for c in ciphers
+                if c.get('protocol') != 'TLSv1.3' and
+                (name == 'TLSv1.2' or c.get('protocol') != 'TLSv1.2')]
+
+    def handshake(self, context, session=None):
+        """Connect and complete a TLS handshake
+
+        :returns: tuple of the SSL socket and the handshake time in seconds
+        """
+        if self.governor is not None:
+            self.governor.acquire()
+        try:
+            sock = socket.create_connection((self.hostname, self.port),
+                                            timeout=self.timeout)
+            start = time.monotonic()
+            try:
+                ssock = context.wrap_socket(sock,
+                                            server_hostname=self.hostname,
+                                            session=session)
+            except Exception:
+                sock.close()
+                raise
+            return ssock, time.monotonic() - start
+        finally:
+            if self.governor is not None:
+                self.governor.release()
+
+    def probe(self, name, version, cipher=None):
+        """Try a single protocol version and cipher suite"""
+        try:
+            context = self._context(version, cipher)
+        except ssl.SSLError as e:
+            return TlsProbe(name, cipher, False, None, None, None, str(e))
+        try:
+            ssock, elapsed = self.handshake(context)
+        except Exception as e:
+            return TlsProbe(name, cipher, False, None, None, None,
+                            '%s: %s' % (e.__class__.__name__, e))
+        try:
+            negotiated = ssock.cipher()
+            return TlsProbe(name, cipher, True,
+                            negotiated[0] if negotiated else None, elapsed,
+                            certificates.peer_chain(ssock), None)
+        finally:
+            ssock.close()
+
+    def scan(self):
+        """Probe every local protocol version and cipher suite
+
+        :returns: list of TlsProbe results
+        """
+        configs = [(name, version, cipher)
+                   for name, version in self.local_protocols()
+                   for cipher in self.local_ciphers(name, version)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.probe, *c) for c in configs]
+            return [f.result() for f in futures]
+
+    def resumption(self, name, version):
+        """Check whether the service resumes a TLS session
+
+        :returns: tuple of resumed flag, full handshake time and resumed
+            handshake time (or None if not resumed)
+        """
+        context = self._context(version)
+        ssock, full_time = self.handshake(context)
+        try:
+            # TLS 1.3 session tickets arrive after the handshake, so make a
+            # minimal request and read the reply before saving the session
+            ssock.sendall(('HEAD /redfish/v1/ HTTP/1.1\r\nHost: %s\r\n'
+                           'Connection: close\r\n\r\n' %
+                           self.hostname).encode('utf-8'))
+            ssock.recv(1)
+            session = ssock.session
+        finally:
+            ssock.close()
+        if session is None:
+            return False, full_time, None
+        ssock, resumed_time = self.handshake(context, session=session)
+        try:
+            if ssock.session_reused:
+                return True, full_time, resumed_time
+            return False, full_time, None
+        finally:
+            ssock.close()
+
+
+def scan_tls(sut: SystemUnderTest):
+    """Scan the accepted TLS configurations and record them as metrics"""
+    if sut.scheme != 'https':
+        logging.warning('The scheme for the service at %s is not HTTPS; '
+                        'skipping TLS scan' % sut.rhost)
+        return
+    if not TlsScanner.local_protocols():
+        logging.warning('TLS scan requires Python 3.7 or later; skipping')
+        return
+    hostname, port = host_and_port(sut)
+    scanner = TlsScanner(hostname, port, governor=sut.transport.governor)
+    probes = scanner.scan()
+    accepted = [p for p in probes if p.accepted]
+    if sut.server_cert_chain is None:
+        # share the chain presented during the scan with the cert checks
+        for p in accepted:
+            if p.chain:
+                sut.set_server_cert_chain(p.chain)
+                break
+    for p in accepted:
+        if p.cipher:
+            name = '%s %s' % (p.protocol, p.cipher)
+        else:
+            name = '%s (negotiated %s)' % (p.protocol, p.negotiated_cipher)
+        sut.add_metric(TLS_CATEGORY, 'Handshake time: %s' % name,
+                       p.handshake_time * 1000, 'ms')
+    sut.add_metric(TLS_CATEGORY, 'Configurations accepted',
+                   '%s of %s' % (len(accepted), len(probes)))
+    versions = []
+    for name, _ in TlsScanner.local_protocols():
+        if any(p.protocol == name for p in accepted):
+            versions.append(name)
+    sut.add_metric(TLS_CATEGORY, 'Protocol versions accepted',
+                   ', '.join(versions) if versions else 'none')
+
+    # check session resumption using the highest accepted protocol version
+    for name, version in reversed(TlsScanner.local_protocols()):
+        if name in versions:
+            try:
+                resumed, full_time, resumed_time = scanner.resumption(
+                    name, version)
+            except Exception as e:
+                logging.warning('Caught %s while checking TLS session '
+                                'resumption' % e.__class__.__name__)
+                break
+            sut.add_metric(TLS_CATEGORY, 'Session resumption (%s)' % name,
+                           'supported' if resumed else 'not supported')
+            sut.add_metric(TLS_CATEGORY, 'Full handshake time (%s)' % name,
+                           full_time * 1000, 'ms')
+            if resumed:
+                sut.add_metric(TLS_CATEGORY,
+                               'Resumed handshake time (%s)' % name,
+                               resumed_time * 1000, 'ms')
+            break
@@ -0,0 +1,685 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import logging
+import os
+import random
+import ssl
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+TRANSPORT_CATEGORY = 'TLS Connections'
+THROTTLE_CATEGORY = 'Request Throttling'
+RETRY_CATEGORY = 'Request Retries'
+CACHE_CATEGORY = 'Response Cache'
+
+# statuses a service uses to ask the client to slow down
+THROTTLE_STATUSES = (429, 503)
+
+# methods that modify the resource at the request URI
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# resuming TLS sessions needs SSLContext.sslsocket_class (Python 3.7+)
+TLS_RESUMPTION = hasattr(ssl.SSLContext, 'sslsocket_class')
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header value (delay-seconds or HTTP-date)
+
+    :returns: the delay in seconds, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket(object):
+    """Token bucket allowing rate requests per second with bursts of burst
+
+    Tokens are reserved when taken, so concurrent callers are spaced out in
+    the order they arrive instead of all waking at once.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take a token, waiting until one is available
+
+        :returns: the number of seconds waited
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class Governor(object):
+    """Rate limiter and concurrency governor for requests to one service
+
+    Requests take a token from the rate bucket (when max_rate is set) and a
+    slot from the in-flight limit (when max_in_flight is set). Requests that
+    are expected to fail authentication also draw on a separate, much
+    smaller budget, since services may lock out clients after a number of
+    failed attempts. When the service answers 429 or 503, all requests are
+    paused for the Retry-After delay and the rate is halved, recovering
+    gradually on success. Without a Retry-After, requests are paused with
+    an exponential backoff only when a limit is set.
+    """
+    def __init__(self, max_rate=None, max_in_flight=None,
+                 auth_failure_rate=0.5, auth_failure_burst=3,
+                 max_backoff=30):
+        self.max_rate = max_rate
+        self.max_in_flight = max_in_flight
+        self.max_backoff = max_backoff
+        self._bucket = None
+        if max_rate:
+            self._bucket = TokenBucket(max_rate,
+                                       burst=max(1, max_in_flight or 1))
+        self._auth_bucket = TokenBucket(auth_failure_rate,
+                                        burst=auth_failure_burst)
+        self._slots = None
+        if max_in_flight:
+            self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._resume_at = 0
+        self._backoff = 0
+        self.requests = 0
+        self.auth_failure_requests = 0
+        self.wait_time = 0.0
+        self.throttled = 0
+        self.paused = 0
+        self.retry_after = 0
+
+    @property
+    def limited(self):
+        return bool(self.max_rate or self.max_in_flight)
+
+    def acquire(self, auth_failure=False):
+        """Wait until a request may be sent"""
+        start = time.monotonic()
+        if auth_failure:
+            self._auth_bucket.take()
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                break
+            time.sleep(delay)
+        if self._bucket:
+            self._bucket.take()
+        if self._slots:
+            self._slots.acquire()
+        with self._lock:
+            self.requests += 1
+            if auth_failure:
+                self.auth_failure_requests += 1
+            self.wait_time += time.monotonic() - start
+
+    def release(self, response=None):
+        """Release the request's slot and adapt to the response status"""
+        if self._slots:
+            self._slots.release()
+        if response is None:
+            return
+        with self._lock:
+            if response.status_code in THROTTLE_STATUSES:
+                self.throttled += 1
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                if delay is not None:
+                    self.retry_after += 1
+                    delay = min(delay, self.max_backoff)
+                elif self.limited:
+                    self._backoff = min(self.max_backoff,
+                                        self._backoff * 2 or 1)
+                    delay = self._backoff
+                else:
+                    # without limits or a Retry-After the status may be a
+                    # tested response, so requests are not paused
+                    return
+                if not self.paused:
+                    logging.warning('Service responded with status %s; '
+                                    'backing off for %.1f seconds' %
+                                    (response.status_code, delay))
+                self.paused += 1
+                self._resume_at = max(self._resume_at,
+                                      time.monotonic() + delay)
+                if self._bucket:
+                    self._bucket.rate = max(self.max_rate / 16,
+                                            self._bucket.rate / 2)
+            else:
+                self._backoff = 0
+                if self._bucket and self._bucket.rate < self.max_rate:
+                    self._bucket.rate = min(self.max_rate,
+                                            self._bucket.rate +
+                                            self.max_rate / 16)
+
+
+class ResumableSSLSocket(ssl.SSLSocket):
+    """SSLSocket that hands its TLS session back to its context on close"""
+    def _real_close(self):
+        save = getattr(self.context, 'save_session', None)
+        if save is not None:
+            save(self)
+        super(ResumableSSLSocket, self)._real_close()
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """SSL context that resumes TLS sessions per server hostname
+
+    The session of the most recent connection to each host is offered on the
+    next handshake to that host. With TLS 1.3 the session ticket only
+    arrives after the handshake, so the session is taken from the last
+    socket when it is closed, or when the next connection is made while it
+    is still open.
+    """
+    def __init__(self, *args, **kwargs):
+        super(ResumingSSLContext, self).__init__()
+        self.sslsocket_class = ResumableSSLSocket
+        self._session_lock = threading.Lock()
+        self._sessions = {}
+        self._last_sockets = {}
+        self.full_handshakes = 0
+        self.resumed_handshakes = 0
+
+    def _session_for(self, hostname):
+        with self._session_lock:
+            ref = self._last_sockets.get(hostname)
+            sock = ref() if ref is not None else None
+            if sock is not None:
+                try:
+                    session = sock.session
+                except (ValueError, OSError):
+                    session = None
+                if session is not None:
+                    self._sessions[hostname] = session
+            return self._sessions.get(hostname)
+
+    def save_session(self, sock):
+        """Save the session of a socket that is about to be closed"""
+        try:
+            session = sock.session
+        except (ValueError, OSError):
+            session = None
+        if session is not None and sock.server_hostname:
+            with self._session_lock:
+                self._sessions[sock.server_hostname] = session
+
+    def _handshake_done(self, hostname, sock):
+        with self._session_lock:
+            if sock.session_reused:
+                self.resumed_handshakes += 1
+            else:
+                self.full_handshakes += 1
+            self._last_sockets[hostname] = weakref.ref(sock)
+            if sock.session is not None:
+                self._sessions[hostname] = sock.session
+
+    def wrap_socket(self, sock, server_side=False,
+                    do_handshake_on_connect=True,
+                    suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self._session_for(server_hostname)
+        ssock = super(ResumingSSLContext, self).wrap_socket(
+            sock, server_side=server_side,
+            do_handshake_on_connect=do_handshake_on_connect,
+            suppress_ragged_eofs=suppress_ragged_eofs,
+            server_hostname=server_hostname, session=session)
+        if not server_side and do_handshake_on_connect:
+            self._handshake_done(server_hostname, ssock)
+        return ssock
+
+
+class RetryPolicy(object):
+    """Retry policy for idempotent requests
+
+    GET and HEAD requests are retried up to retries times after a transient
+    failure: a connection error, a timeout, or a 429, 502, 503 or 504
+    response. Between attempts it waits with a bounded exponential backoff
+    with jitter. Any other response, including other error statuses, is a
+    protocol result and is returned as is.
+    """
+    methods = ('GET', 'HEAD')
+    statuses = (429, 502, 503, 504)
+
+    def __init__(self, retries=2, backoff=0.5, max_backoff=8, jitter=0.2):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self.retried_requests = 0
+        self.retry_attempts = 0
+        self.recovered = 0
+
+    def should_retry(self, request, attempt):
+        return request.method in self.methods and attempt <= self.retries
+
+    def delay(self, attempt):
+        """Get the backoff delay in seconds before the next attempt"""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def record(self, attempts, ok):
+        """Record the outcome of a request that took the given attempts"""
+        if attempts <= 1:
+            return
+        with self._lock:
+            self.retried_requests += 1
+            self.retry_attempts += attempts - 1
+            if ok:
+                self.recovered += 1
+
+
+class ResponseCache(object):
+    """Cache of GET responses revalidated with If-None-Match
+
+    Entries are kept per URL and authentication context (session token or
+    basic auth user) and hold the ETag and the last full GET response. A
+    cached response is only returned after the service has confirmed it
+    with a 304 (Not Modified) response; it is never served without asking.
+
+    Writes through a transport session keep the entries current: a
+    successful PATCH or PUT that returns an ETag replaces the entry's ETag,
+    any other write drops the entries for the URL (and, for POST and
+    DELETE, for its parent collection).
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.revalidated = 0
+        self.full_responses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def auth_context(session):
+        token = session.headers.get('X-Auth-Token')
+        if token:
+            return 'token', token
+        if isinstance(session.auth, tuple) and session.auth:
+            return 'basic', session.auth[0]
+        return None
+
+    @staticmethod
+    def _parent(url):
+        return url.rstrip('/').rsplit('/', 1)[0]
+
+    def get(self, session, url, etag_only=False):
+        """GET the URL, revalidating any cached response for it
+
+        :param session: the session to send the request with
+        :param url: the URL to read
+        :param etag_only: True if only the current ETag is needed, so an
+            entry with no stored response can still be revalidated
+        :return: the service's response, or the cached response if the
+            service returned 304 (Not Modified)
+        """
+        key = (self.auth_context(session), url)
+        with self._lock:
+            etag, cached = self._entries.get(key, (None, None))
+        headers = {}
+        if etag and (cached is not None or etag_only):
+            headers['If-None-Match'] = etag
+        response = session.get(url, headers=headers)
+        if (response.status_code == requests.codes.NOT_MODIFIED and
+                'If-None-Match' in headers):
+            response.close()
+            with self._lock:
+                self.revalidated += 1
+            if cached is None:
+                # only the ETag was known; it has just been confirmed
+                response.headers['ETag'] = etag
+                return response
+            return cached
+        with self._lock:
+            self.full_responses += 1
+            new_etag = response.headers.get('ETag') if response.ok else None
+            if new_etag:
+                self._entries[key] = (new_etag, response)
+            else:
+                self._entries.pop(key, None)
+        return response
+
+    def written(self, method, url, response):
+        """Update or drop the entries for a URL after a write request"""
+        new_etag = None
+        if (method in ('PATCH', 'PUT') and response is not None and
+                response.ok):
+            new_etag = response.headers.get('ETag')
+        urls = {url}
+        if method in ('POST', 'DELETE'):
+            urls.add(self._parent(url))
+        with self._lock:
+            for key in list(self._entries):
+                if key[1] not in urls:
+                    continue
+                if new_etag and key[1] == url:
+                    # the stored body is stale, but the ETag is current
+                    self._entries[key] = (new_etag, None)
+                else:
+                    del self._entries[key]
+                self.invalidations += 1
+
+
+class TransportAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools share a resuming SSL context
+
+    The CA certificates are loaded into the shared context once, rather
+    than by urllib3 for every new connection. Without a shared context
+    (ssl_context is None) urllib3 creates the contexts as usual.
+    """
+    def __init__(self, ssl_context, ca_location=None, governor=None,
+                 auth_failure=False, retry_policy=None, **kwargs):
+        self.ssl_context = ssl_context
+        self.ca_location = ca_location
+        self.governor = governor
+        self.auth_failure = auth_failure
+        self.retry_policy = retry_policy
+        super(TransportAdapter, self).__init__(**kwargs)
+
+    def _send_once(self, request, **kwargs):
+        if self.governor is None:
+            return super(TransportAdapter, self).send(request, **kwargs)
+        self.governor.acquire(auth_failure=self.auth_failure)
+        response = None
+        try:
+            response = super(TransportAdapter, self).send(request, **kwargs)
+        finally:
+            self.governor.release(response)
+        return response
+
+    def send(self, request, **kwargs):
+        """Send the request, retrying transient failures per the policy
+
+        The returned response records the number of attempts and the total
+        elapsed time (including backoff) in its attempts and total_elapsed
+        attributes.
+        """
+        policy = self.retry_policy
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            retry = policy is not None and policy.should_retry(request,
+                                                               attempt)
+            try:
+                response = self._send_once(request, **kwargs)
+            except requests.exceptions.SSLError:
+                # certificate and protocol errors are not transient
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not retry:
+                    if policy is not None:
+                        policy.record(attempt, False)
+                    raise
+                logging.info('Retrying %s %s after %s (attempt %s)' % (
+                    request.method, request.url, e.__class__.__name__,
+                    attempt))
+                time.sleep(policy.delay(attempt))
+                continue
+            if retry and response.status_code in policy.statuses:
+                logging.info('Retrying %s %s after status %s (attempt %s)' % (
+                    request.method, request.url, response.status_code,
+                    attempt))
+                response.close()
+                # the governor already pauses for 429 and 503
+                if response.status_code not in THROTTLE_STATUSES or (
+                        self.governor is None):
+                    time.sleep(policy.delay(attempt))
+                continue
+            if policy is not None:
+                policy.record(attempt, response.status_code not in
+                              policy.statuses)
+            response.attempts = attempt
+            response.total_elapsed = time.monotonic() - start
+            return response
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.ssl_context is not None:
+            kwargs['ssl_context'] = self.ssl_context
+        return super(TransportAdapter, self).init_poolmanager(*args, **kwargs)
+
+    def cert_verify(self, conn, url, verify, cert):
+        super(TransportAdapter, self).cert_verify(conn, url, verify, cert)
+        if self.ca_location and (conn.ca_certs == self.ca_location or
+                                 conn.ca_cert_dir == self.ca_location):
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+
+class TransportSession(requests.Session):
+    """requests Session that sends through a shared transport adapter
+
+    Sessions for requests that are expected to fail authentication use the
+    transport's auth-failure adapter so they draw on that budget.
+    """
+    def __init__(self, transport, auth_failure=False):
+        super(TransportSession, self).__init__()
+        self.transport = transport
+        self.verify = transport.verify
+        adapter = (transport.auth_failure_adapter if auth_failure
+                   else transport.adapter)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        # apply the transport's timeouts unless the caller gave one; streams
+        # (such as SSE) may legitimately go quiet, so have no read timeout
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.transport.timeouts(kwargs.get('stream'))
+        response = None
+        try:
+            response = super(TransportSession, self).request(method, url,
+                                                             **kwargs)
+        finally:
+            if method.upper() in WRITE_METHODS:
+                # a write that failed in transit may still have been applied
+                self.transport.cache.written(method.upper(), url, response)
+        return response
+
+    def conditional_get(self, url, etag_only=False):
+        """GET the URL through the transport's revalidating response cache"""
+        return self.transport.cache.get(self, url, etag_only=etag_only)
+
+    def merge_environment_settings(self, url, proxies, stream, verify, cert):
+        # an explicit verify setting on the session is not overridden by the
+        # REQUESTS_CA_BUNDLE or CURL_CA_BUNDLE environment variables
+        if verify is None:
+            verify = self.verify
+        return super(TransportSession, self).merge_environment_settings(
+            url, proxies, stream, verify, cert)
+
+    def close(self):
+        # the shared adapter (and its pooled connections) outlives the session
+        shared = (self.transport.adapter, self.transport.auth_failure_adapter)
+        for adapter in self.adapters.values():
+            if adapter not in shared:
+                adapter.close()
+
+
+class Transport(object):
+    """Shared HTTP(S) transport for all requests made to the service
+
+    All sessions created from the transport share one connection pool and
+    one SSL context, so TLS sessions are resumed across connections instead
+    of doing a full handshake for each one. On Python versions that cannot
+    resume sessions (before 3.7), urllib3 creates a context per connection.
+    """
+    def __init__(self, verify=True, pool_maxsize=10, max_rate=None,
+                 max_in_flight=None, max_retries=2, connect_timeout=10,
+                 read_timeout=60):
+        self.verify = verify
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        context = None
+        ca_location = None
+        if TLS_RESUMPTION:
+            context, ca_location = self._ssl_context(verify)
+        else:
+            logging.debug('TLS session resumption is not supported by this '
+                          'Python version; using per-connection contexts')
+        self.ssl_context = context
+        self.cache = ResponseCache()
+        self.governor = Governor(max_rate=max_rate,
+                                 max_in_flight=max_in_flight)
+        self.retry_policy = RetryPolicy(retries=max_retries)
+        self.adapter = TransportAdapter(context, ca_location=ca_location,
+                                        governor=self.governor,
+                                        retry_policy=self.retry_policy,
+                                        pool_maxsize=pool_maxsize)
+        self.auth_failure_adapter = TransportAdapter(
+            context, ca_location=ca_location, governor=self.governor,
+            auth_failure=True, pool_connections=1, pool_maxsize=1)
+
+    @staticmethod
+    def _ssl_context(verify):
+        """Create the shared SSL context and load the trusted CAs into it
+
+        :return: the context and the CA file or directory that was loaded
+        """
+        context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        # urllib3 matches the hostname itself and sets the verify mode per
+        # connection from the verify setting
+        context.check_hostname = False
+        ca_location = None
+        if verify:
+            if isinstance(verify, str):
+                ca_location = verify
+            else:
+                # the bundle requests would use for verify=True
+                ca_location = (os.environ.get('REQUESTS_CA_BUNDLE') or
+                               os.environ.get('CURL_CA_BUNDLE') or
+                               DEFAULT_CA_BUNDLE_PATH)
+            if ca_location and os.path.isdir(ca_location):
+                context.load_verify_locations(capath=ca_location)
+            elif ca_location and os.path.exists(ca_location):
+                context.load_verify_locations(cafile=ca_location)
+            else:
+                ca_location = None
+        return context, ca_location
+
+    def set_limits(self, max_rate=None, max_in_flight=None):
+        """Replace the governor with one using the given limits"""
+        self.governor = Governor(max_rate=max_rate,
+                                 max_in_flight=max_in_flight)
+        self.adapter.governor = self.governor
+        self.auth_failure_adapter.governor = self.governor
+
+    @property
+    def full_handshakes(self):
+        if self.ssl_context is None:
+            return 0
+        return self.ssl_context.full_handshakes
+
+    @property
+    def resumed_handshakes(self):
+        if self.ssl_context is None:
+            return 0
+        return self.ssl_context.resumed_handshakes
+
+    def timeouts(self, stream=False):
+        """Get the (connect, read) timeout tuple for a request"""
+        return self.connect_timeout, None if stream else self.read_timeout
+
+    def set_max_retries(self, max_retries):
+        """Set the number of retries for transient GET and HEAD failures"""
+        self.retry_policy.retries = max_retries
+
+    def session(self, auth_failure=False):
+        """Create a new session that uses the shared transport
+
+        :param auth_failure: True if the session's requests are expected to
+            fail authentication
+        """
+        return TransportSession(self, auth_failure=auth_failure)
+
+    def request(self, method, url, auth_failure=False, **kwargs):
+        """Send a request outside of any session, like `requests.request`"""
+        with self.session(auth_failure=auth_failure) as session:
+            return session.request(method=method, url=url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def add_metrics(self, sut):
+        """Record the TLS handshake counts and any throttling as metrics"""
+        governor = self.governor
+        if governor.limited or governor.throttled:
+            sut.add_metric(THROTTLE_CATEGORY, 'Requests sent',
+                           governor.requests, 'requests')
+            sut.add_metric(THROTTLE_CATEGORY, 'Auth-failure requests sent',
+                           governor.auth_failure_requests, 'requests')
+            sut.add_metric(THROTTLE_CATEGORY, 'Time waiting to send',
+                           governor.wait_time, 'seconds')
+            sut.add_metric(THROTTLE_CATEGORY, 'Throttled responses (429/503)',
+                           governor.throttled, 'responses')
+            sut.add_metric(THROTTLE_CATEGORY, 'Retry-After delays honored',
+                           governor.retry_after, 'responses')
+        policy = self.retry_policy
+        if policy.retried_requests:
+            sut.add_metric(RETRY_CATEGORY, 'Requests retried',
+                           policy.retried_requests, 'requests')
+            sut.add_metric(RETRY_CATEGORY, 'Retry attempts',
+                           policy.retry_attempts, 'attempts')
+            sut.add_metric(RETRY_CATEGORY, 'Requests recovered by retry',
+                           policy.recovered, 'requests')
+        cache = self.cache
+        if cache.revalidated or cache.full_responses:
+            sut.add_metric(CACHE_CATEGORY, 'Revalidated (304 Not Modified)',
+                           cache.revalidated, 'requests')
+            sut.add_metric(CACHE_CATEGORY, 'Full responses',
+                           cache.full_responses, 'requests')
+            sut.add_metric(CACHE_CATEGORY, 'Entries updated or dropped '
+                           'by writes', cache.invalidations, 'entries')
+        total = self.full_handshakes + self.resumed_handshakes
+        if not total:
+            return
+        sut.add_metric(TRANSPORT_CATEGORY, 'Full handshakes',
+                       self.full_handshakes, 'handshakes')
+        sut.add_metric(TRANSPORT_CATEGORY, 'Resumed handshakes',
+                       self.resumed_handshakes, 'handshakes')
+        sut.add_metric(TRANSPORT_CATEGORY, 'Resumption rate',
+                       100.0 * self.resumed_handshakes / total, '%')
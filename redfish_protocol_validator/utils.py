@@ -5,18 +5,26 @@
 
 import http.client
 import io
+import json
 import logging
 import math
+import os
+import random
 import re
+import select
 import socket
+import threading
 import time
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 import colorama
 import requests
 import sseclient
 
-from redfish_protocol_validator.constants import Result, SSDP_REDFISH
+from redfish_protocol_validator import transport
+from redfish_protocol_validator.constants import (
+    Assertion, Result, SSDP_REDFISH)
 
 _color_map = {
         Result.PASS: (colorama.Fore.GREEN, colorama.Style.RESET_ALL),
@@ -38,13 +46,117 @@ def get_response_media_type_charset(response):
 
 
 def get_etag_header(sut, session, uri):
-    response = session.get(sut.rhost + uri)
+    if isinstance(session, transport.TransportSession):
+        # revalidate the ETag instead of downloading the resource again
+        response = session.conditional_get(sut.rhost + uri, etag_only=True)
+    else:
+        response = session.get(sut.rhost + uri)
     etag = None
     if response.ok:
         etag = response.headers.get('ETag')
     return {'If-Match': etag} if etag else {}
 
 
+# headers that describe a whole collection response rather than its members
+_collection_only_headers = {'allow', 'content-encoding', 'content-length',
+                            'etag', 'last-modified', 'link',
+                            'transfer-encoding'}
+
+
+def build_response(url, status_code, headers, content, reason=None):
+    """Build a `requests` response to a GET that was not sent as such
+
+    :param url: the URL of the resource
+    :param status_code: the HTTP status code
+    :param headers: dict of response headers
+    :param content: the response body as bytes
+    :param reason: the HTTP reason phrase
+    :return: the `requests.Response` object
+    """
+    r = requests.Response()
+    r.status_code = status_code
+    r.reason = reason
+    r.headers = requests.structures.CaseInsensitiveDict(headers)
+    r._content = content
+    r._content_consumed = True
+    r.encoding = 'utf-8'
+    r.url = url
+    request = requests.PreparedRequest()
+    request.prepare_method('GET')
+    request.url = url
+    request.prepare_headers(None)
+    r.request = request
+    return r
+
+
+def expanded_member_response(response: requests.Response, url, member):
+    """Build a response for a member of a collection read with $expand
+
+    The member payload comes from the expanded collection; the status and
+    the headers that apply to the members (such as Content-Type and
+    OData-Version) come from the collection response. The result is marked
+    with an `expanded` attribute so that `genuine_response` can replace it
+    when the member's own headers are needed.
+    """
+    headers = {k: v for k, v in response.headers.items()
+               if k.lower() not in _collection_only_headers}
+    r = build_response(url, response.status_code, headers,
+                       json.dumps(member).encode('utf-8'),
+                       reason=getattr(response, 'reason', None))
+    r.expanded = True
+    return r
+
+
+def genuine_response(sut, uri, response, resource_type=None):
+    """Get the service's own GET response for a resource
+
+    If the stored response was synthesized from an expanded collection, the
+    resource is read and the new response replaces the stored one;
+    otherwise the response is returned unchanged.
+    """
+    if not getattr(response, 'expanded', False):
+        return response
+    r = sut.session.get(sut.rhost + uri)
+    sut.add_response(uri, r, resource_type=resource_type)
+    return r
+
+
+def select_uri(sut, uri, props):
+    """Get a URI that reads only the named properties of a resource
+
+    `$select` is added when the service advertises SelectQuery support in
+    ProtocolFeaturesSupported. Responses to a narrowed URI hold only part of
+    the resource, so they should not be stored as the resource's response.
+
+    :return: tuple of the URI and True if it was narrowed, False otherwise
+    """
+    if sut.supported_query_params.get('SelectQuery'):
+        sep = '&' if '?' in uri else '?'
+        return uri + sep + '$select=' + ','.join(props), True
+    return uri, False
+
+
+def get_allowed_methods(response: requests.Response):
+    """Get the set of methods in the Allow header, or None if absent"""
+    allow = response.headers.get('Allow')
+    if allow is None:
+        return None
+    return {m.strip().upper() for m in allow.split(',') if m.strip()}
+
+
+def sample_uris(uris, budget):
+    """Select up to budget URIs spread evenly over the sorted URIs
+
+    :param uris: the URIs to sample from
+    :param budget: the maximum number of URIs (None or 0 for all of them)
+    :return: sorted list of the selected URIs
+    """
+    uris = sorted(uris)
+    if not budget or len(uris) <= budget:
+        return uris
+    return [uris[i * len(uris) // budget] for i in range(budget)]
+
+
 def get_response_etag(response: requests.Response):
     etag = None
     if response.ok:
@@ -110,7 +222,8 @@ def get_sse_stream(sut):
     try:
         # get the "before" set of EventDestination URIs
         if sut.subscriptions_uri:
-            r = sut.session.get(sut.rhost + sut.subscriptions_uri)
+            subs_uri, _ = select_uri(sut, sut.subscriptions_uri, ['Members'])
+            r = sut.session.get(sut.rhost + subs_uri)
             if r.status_code == requests.codes.OK:
                 data = r.json()
                 subs = set([m.get('@odata.id') for m in data.get('Members', [])
@@ -121,7 +234,7 @@ def get_sse_stream(sut):
                                        stream=True)
         if response is not None and response.ok and sut.subscriptions_uri:
             # get the "after" set of EventDestination URIs
-            r = sut.session.get(sut.rhost + sut.subscriptions_uri)
+            r = sut.session.get(sut.rhost + subs_uri)
             if r.status_code == requests.codes.OK:
                 data = r.json()
                 new_subs = set([m.get('@odata.id') for m in
@@ -142,6 +255,119 @@ def get_sse_stream(sut):
     return response, event_dest_uri
 
 
+class CollectionIterator(object):
+    """Iterate over the members of a collection, following next links
+
+    Members are yielded lazily, page by page. While the members of one page
+    are being consumed, the page named by its Members@odata.nextLink is
+    fetched in a background thread, so no more than two pages are held at
+    once however large the collection is.
+
+    After (or during) iteration, the attributes hold what was seen so far:
+    `status` (the status code of the first page), `count` (the
+    Members@odata.count of the first page), `pages`, `members`,
+    `page_times` (seconds to fetch each page read here), `next_link` (the
+    next link of the last page read, if iteration stopped at max_pages) and
+    `error` (a message if a page could not be read, otherwise None).
+    """
+    def __init__(self, sut, uri, response=None, session=None,
+                 max_pages=None, start_uri=None):
+        """Create the iterator
+
+        :param sut: the SystemUnderTest object
+        :param uri: the URI of the collection
+        :param response: the response already read for the first page, if
+            any
+        :param session: the session to read pages with (default is the
+            SystemUnderTest session)
+        :param max_pages: stop after this many pages (None for no limit)
+        :param start_uri: the URI of the first page to read, if not the
+            collection URI (ignored if response is given)
+        """
+        self.sut = sut
+        self.uri = uri
+        self.response = response
+        self.session = session if session is not None else sut.session
+        self.max_pages = max_pages
+        self.start_uri = start_uri if start_uri else uri
+        self.status = None
+        self.count = None
+        self.pages = 0
+        self.members = 0
+        self.page_times = []
+        self.next_link = None
+        self.error = None
+
+    def fetch(self, uri):
+        """Read one page, returning the URI, response and elapsed seconds"""
+        url = uri if uri.startswith(('http:', 'https:')) else (
+            self.sut.rhost + uri)
+        start = time.monotonic()
+        response = self.session.get(url)
+        return uri, response, time.monotonic() - start
+
+    def _wait(self, future):
+        try:
+            return future.result()
+        except requests.RequestException as e:
+            self.error = ('Caught %s reading a page of collection %s' %
+                          (e.__class__.__name__, self.uri))
+            return None
+
+    def _page_data(self, uri, response):
+        if not response.ok:
+            self.error = ('GET request to page %s of collection %s returned '
+                          'status %s' % (uri, self.uri, response.status_code))
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            self.error = ('Page %s of collection %s was not a JSON object' %
+                          (uri, self.uri))
+            return None
+        return data
+
+    def __iter__(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            if self.response is not None:
+                page = (self.uri, self.response, None)
+            else:
+                page = self._wait(executor.submit(self.fetch,
+                                                  self.start_uri))
+            seen = {page[0] if page else self.start_uri}
+            while page is not None:
+                uri, response, elapsed = page
+                if elapsed is not None:
+                    self.page_times.append(elapsed)
+                if self.pages == 0:
+                    self.status = response.status_code
+                data = self._page_data(uri, response)
+                if data is None:
+                    return
+                self.pages += 1
+                if self.pages == 1:
+                    self.count = data.get('Members@odata.count')
+                next_link = data.get('Members@odata.nextLink')
+                future = None
+                if next_link and (self.max_pages is not None and
+                                  self.pages >= self.max_pages):
+                    self.next_link = next_link
+                elif next_link:
+                    if next_link in seen:
+                        self.error = ('Next link %s of collection %s repeats '
+                                      'an earlier page' % (next_link,
+                                                           self.uri))
+                    else:
+                        seen.add(next_link)
+                        future = executor.submit(self.fetch, next_link)
+                for member in data.get('Members', []):
+                    self.members += 1
+                    yield member
+                page = self._wait(future) if future is not None else None
+
+
 def _summary_format(sut, result):
     count = sut.summary_count(result)
     start, end = ('', '')
@@ -150,6 +376,20 @@ def _summary_format(sut, result):
     return start, count, end
 
 
+def skip_assertions(sut, prefix, reason):
+    """Log NOT_TESTED for the assertions with a prefix that have no results
+
+    :returns: the number of assertions marked NOT_TESTED
+    """
+    count = 0
+    for assertion in Assertion:
+        if (assertion.name.startswith(prefix) and
+                assertion not in sut.results):
+            sut.log(Result.NOT_TESTED, '', '', '', assertion, reason)
+            count += 1
+    return count
+
+
 def print_summary(sut):
     colorama.init()
     pass_start, passed, pass_end = _summary_format(sut, Result.PASS)
@@ -166,23 +406,154 @@ def print_summary(sut):
     colorama.deinit()
 
 
-class SSEClientTimeout(sseclient.SSEClient):
-    """Extend SSEClient to provide an optional timeout parameter so we don't
-    read the SSE stream forever.
+class SSEReader(object):
+    """Read events from an SSE stream in a background thread
+
+    Events are parsed incrementally as they arrive. Reading stops when the
+    stream ends, when max_events events have been read or when the wall-clock
+    deadline passes, whichever comes first. The deadline is timeout seconds
+    after wait() is called, so a reader started early keeps the events that
+    arrive meanwhile and still gets the full window when they are consumed.
+    A quiet stream is abandoned at the deadline instead of blocking the
+    caller until the next event arrives.
     """
-    def __init__(self, event_source, char_enc='utf-8', timeout=None):
-        super(SSEClientTimeout, self).__init__(event_source, char_enc=char_enc)
-        self._timeout_secs = timeout
-        self._timeout_at = None
+    def __init__(self, event_source, timeout=3, max_events=None,
+                 char_enc='utf-8'):
+        """Create the reader
+
+        :param event_source: the streaming response (or iterable of bytes)
+        :param timeout: the number of seconds to read the stream
+        :type timeout: float
+        :param max_events: stop after this many events (None for no limit)
+        :type max_events: int
+        :param char_enc: the character encoding of the stream
+        :type char_enc: str
+        """
+        self.event_source = event_source
+        self.timeout = timeout
+        self.max_events = max_events
+        self._char_enc = char_enc
+        self._events = []
+        self._arrivals = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.ended = False
+
+    def start(self):
+        """Start reading the stream; returns self"""
+        if self._thread is None and self.event_source is not None:
+            self._thread = threading.Thread(target=self._run,
+                                            name='sse-reader', daemon=True)
+            self._thread.start()
+        return self
 
-    def _read(self):
-        if self._timeout_secs and self._timeout_at is None:
-            self._timeout_at = time.time() + self._timeout_secs
-        for data in super(SSEClientTimeout, self)._read():
-            if self._timeout_secs and time.time() >= self._timeout_at:
-                # stop generator if timeout reached
-                return
-            yield data
+    def _run(self):
+        client = sseclient.SSEClient(self.event_source,
+                                     char_enc=self._char_enc)
+        try:
+            for event in client.events():
+                if self._stop.is_set():
+                    break
+                with self._lock:
+                    self._events.append(event)
+                    self._arrivals.append(time.monotonic())
+                    if (self.max_events and
+                            len(self._events) >= self.max_events):
+                        break
+            else:
+                # the service ended the stream
+                self.ended = not self._stop.is_set()
+        except Exception as e:
+            if not self._stop.is_set():
+                # the connection was lost or reset
+                self.ended = True
+                logging.debug('Caught %s while reading SSE stream' %
+                              e.__class__.__name__)
+
+    def wait(self):
+        """Wait up to timeout seconds for reading to finish
+
+        If the reader is still running at the deadline, the stream is closed
+        and the reader thread joined, so the caller may then use the stream.
+
+        :returns: the list of events read or None if no stream was opened
+        """
+        if self.event_source is None:
+            return None
+        self.start()
+        self._thread.join(self.timeout)
+        if self._thread.is_alive():
+            # deadline reached; closing the stream unblocks the reader
+            self.stop()
+        with self._lock:
+            return list(self._events)
+
+    def stop(self):
+        """Stop reading by closing the stream"""
+        self._stop.set()
+        close = getattr(self.event_source, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(1)
+
+    def arrivals(self):
+        """Get the events read so far
+
+        :returns: list of (monotonic arrival time, event) tuples
+        """
+        with self._lock:
+            return list(zip(self._arrivals, self._events))
+
+
+PollResult = namedtuple('PollResult', ['done', 'value', 'elapsed',
+                                       'attempts'])
+
+
+def poll(func, timeout=5, initial_delay=0, interval=0.05, max_interval=1,
+         backoff=2, jitter=0.2):
+    """Call func until it reports completion or the deadline passes
+
+    The delay between attempts starts at interval and grows exponentially
+    by the backoff factor up to max_interval, with random jitter applied.
+    A fast service therefore completes within milliseconds while a slow one
+    is still covered until the deadline.
+
+    :param func: callable taking no args and returning a (done, value) tuple
+    :param timeout: the overall number of seconds to poll
+    :type timeout: float
+    :param initial_delay: the number of seconds to wait before the 1st attempt
+    :type initial_delay: float
+    :param interval: the delay in seconds after the first attempt
+    :type interval: float
+    :param max_interval: the maximum delay in seconds between attempts
+    :type max_interval: float
+    :param backoff: the factor by which the delay grows after each attempt
+    :type backoff: float
+    :param jitter: the fraction of the delay to randomly add or subtract
+    :type jitter: float
+
+    :returns: PollResult of done flag, last value, elapsed time and attempts
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    if initial_delay:
+        time.sleep(initial_delay)
+    delay = interval
+    attempts = 0
+    while True:
+        attempts += 1
+        done, value = func()
+        now = time.monotonic()
+        if done or now >= deadline:
+            return PollResult(done, value, now - start, attempts)
+        pause = delay * random.uniform(1 - jitter, 1 + jitter)
+        time.sleep(max(0, min(pause, max_interval, deadline - now)))
+        delay = min(delay * backoff, max_interval)
 
 
 def redfish_version_to_tuple(version: str):
@@ -235,7 +606,10 @@ def uuid_from_usn(usn, pattern):
 
 def process_ssdp_response(response, discovered_services, pattern):
     response.begin()
-    uuid = uuid_from_usn(response.getheader('USN'), pattern)
+    usn = response.getheader('USN')
+    if not usn:
+        return
+    uuid = uuid_from_usn(usn, pattern)
     if uuid:
         discovered_services[uuid] = response.headers
 
@@ -251,7 +625,7 @@ uuid_pattern = re.compile(r'^uuid:([a-f0-9\-]+).*$')
 
 def discover_ssdp(port=1900, ttl=2, response_time=3, iface=None,
                   protocol='ipv4', pattern=uuid_pattern,
-                  search_target=SSDP_REDFISH):
+                  search_target=SSDP_REDFISH, recv_bufsize=4096):
     """Discovers Redfish services via SSDP
 
     :param port: the port to use for the SSDP request
@@ -268,6 +642,8 @@ def discover_ssdp(port=1900, ttl=2, response_time=3, iface=None,
     :type pattern: SRE_Pattern
     :param search_target: the search target to discover (default: Redfish ST)
     :type search_target: string
+    :param recv_bufsize: the maximum size of a single SSDP response datagram
+    :type recv_bufsize: int
 
     :returns: a set of discovery data
     """
@@ -295,33 +671,162 @@ def discover_ssdp(port=1900, ttl=2, response_time=3, iface=None,
         "ST: {}\r\n"
         "MX: {}\r\n\r\n"
     ).format(mcast_ip, port, search_target, response_time)
-    socket.setdefaulttimeout(response_time + 2)
 
-    # Set up the socket and send the request
-    sock = socket.socket(af_type, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
-    if iface:
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE,
-                        str(iface+'\0').encode('utf-8'))
-    sock.sendto(bytearray(msearch_str, 'utf-8'), mcast_connection)
-
-    # On the same socket, wait for responses
+    # Set up the socket and send the request; the socket is non-blocking and
+    # the wait for responses is bounded by a deadline local to this call
     discovered_services = {}
-    while True:
-        try:
-            process_ssdp_response(
-                http.client.HTTPResponse(FakeSocket(sock.recv(1024))),
-                discovered_services, pattern
-            )
-        except socket.timeout:
-            # We hit the timeout; done waiting for responses
-            break
+    sock = socket.socket(af_type, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        if iface:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE,
+                            str(iface+'\0').encode('utf-8'))
+        sock.setblocking(False)
+        sock.sendto(bytearray(msearch_str, 'utf-8'), mcast_connection)
+
+        # On the same socket, wait for responses until the deadline
+        deadline = time.monotonic() + response_time + 2
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                # We hit the deadline; done waiting for responses
+                break
+            try:
+                data = sock.recv(recv_bufsize)
+            except (BlockingIOError, InterruptedError):
+                continue
+            try:
+                process_ssdp_response(
+                    http.client.HTTPResponse(FakeSocket(data)),
+                    discovered_services, pattern
+                )
+            except (http.client.HTTPException, ValueError) as e:
+                logging.debug('Ignoring malformed SSDP response: %s' % e)
+    finally:
+        sock.close()
 
-    sock.close()
     return discovered_services
 
 
+class SSDPCache(object):
+    """Shared on-disk index of SSDP discovery results
+
+    A single M-SEARCH collects every SSDP response on the subnet keyed by
+    UUID, so one discovery can serve many validator processes targeting
+    different hosts. The first process to find the cache missing or stale
+    takes a lock file and performs the discovery; other processes wait for
+    the lock to be released and then read the index written by that process.
+    """
+    def __init__(self, path, max_age=1800, lock_timeout=60):
+        """Create the cache
+
+        :param path: the path of the cache file
+        :type path: str
+        :param max_age: the number of seconds after which entries are stale
+        :type max_age: int
+        :param lock_timeout: the number of seconds to wait for another
+            process performing discovery before ignoring its lock
+        :type lock_timeout: int
+        """
+        self.path = str(path)
+        self.lock_path = self.path + '.lock'
+        self.max_age = max_age
+        self.lock_timeout = lock_timeout
+
+    @staticmethod
+    def _to_headers(items):
+        headers = http.client.HTTPMessage()
+        for name, value in items:
+            headers[name] = value
+        return headers
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return data
+
+    def _fresh_entry(self, data, search_target):
+        entry = data.get(search_target)
+        if (isinstance(entry, dict) and
+                time.time() - entry.get('timestamp', 0) < self.max_age):
+            return entry
+        return None
+
+    def _acquire_lock(self):
+        deadline = time.time() + self.lock_timeout
+        while True:
+            try:
+                fd = os.open(self.lock_path,
+                             os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return True
+            except FileExistsError:
+                if time.time() >= deadline:
+                    logging.warning('Timed out waiting for SSDP cache lock '
+                                    '%s; discovering without the cache' %
+                                    self.lock_path)
+                    return False
+                time.sleep(0.5)
+
+    def _release_lock(self):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+    def _store(self, search_target, services):
+        data = self._load()
+        data[search_target] = {
+            'timestamp': time.time(),
+            'services': {uuid: list(headers.items())
+                         for uuid, headers in services.items()}
+        }
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def get_services(self, search_target=SSDP_REDFISH, **kwargs):
+        """Get the services discovered for the search target
+
+        Returns the cached index if it is fresh; otherwise performs the
+        discovery (keyed by UUID regardless of USN format) and updates the
+        cache.
+
+        :param search_target: the search target to discover
+        :type search_target: str
+        :param kwargs: additional keyword args passed to discover_ssdp()
+
+        :returns: dict of discovered services keyed by UUID
+        """
+        entry = self._fresh_entry(self._load(), search_target)
+        if entry is None:
+            locked = self._acquire_lock()
+            try:
+                # another process may have refreshed the cache while we waited
+                entry = self._fresh_entry(self._load(), search_target)
+                if entry is None:
+                    services = discover_ssdp(search_target=search_target,
+                                             **kwargs)
+                    if locked:
+                        self._store(search_target, services)
+                    return services
+            finally:
+                if locked:
+                    self._release_lock()
+        return {uuid: self._to_headers(items)
+                for uuid, items in entry.get('services', {}).items()}
+
+
 def hex_to_binary_str(hex_str: str):
     """Convert hex string to binary string
 
@@ -343,13 +848,7 @@ def monobit_frequency(bit_str: str):
     See section 2.1 in this NIST publication:
     https://tsapps.nist.gov/publication/get_pdf.cfm?pub_id=906762
     """
-    obs_sum = 0
-    n = len(bit_str)
-    for i in range(n):
-        obs_sum += 1 if bit_str[i] == '1' else -1
-    obs_stat = abs(obs_sum) / math.sqrt(n)
-    p = math.erfc(obs_stat / math.sqrt(2))
-    return p
+    return BitSequence.from_bit_str(bit_str).monobit()
 
 
 def runs(bit_str: str):
@@ -361,25 +860,208 @@ def runs(bit_str: str):
     See section 2.3 in this NIST publication:
     https://tsapps.nist.gov/publication/get_pdf.cfm?pub_id=906762
     """
-    n = len(bit_str)
-
-    # pre-test
-    ones = 0.0
-    for i in range(n):
-        ones += int(bit_str[i])
-    pi = ones / n
-    tau = 2.0 / math.sqrt(n)
-    if abs(pi - 0.5) >= tau or ones == n:
-        # pre-test failed; do not run this test
-        return 0.0
-
-    # Runs test
-    v_n = 1
-    for i in range(n-1):
-        v_n += 0 if bit_str[i] == bit_str[i+1] else 1
-    p = math.erfc(abs(v_n - 2 * n * pi * (1 - pi)) / (
-                2 * math.sqrt(2 * n) * pi * (1 - pi)))
-    return p
+    return BitSequence.from_bit_str(bit_str).runs()
+
+
+def _igamc(a, x):
+    """Regularized upper incomplete gamma function Q(a, x)"""
+    if x <= 0:
+        return 1.0
+    if x < a + 1:
+        # series representation of P(a, x)
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return 1.0 - total * math.exp(-x + a * math.log(x) - math.lgamma(a))
+    # continued fraction representation of Q(a, x) (modified Lentz)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(-x + a * math.log(x) - math.lgamma(a)) * h
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+class BitSequence(object):
+    """A sequence of bits packed into a Python integer (first bit is MSB)
+
+    The NIST SP 800-22 tests below operate on the whole packed sequence with
+    shifts, masks and population counts rather than per-bit loops, so a long
+    stream made by concatenating many tokens can be evaluated in one batch.
+
+    See this NIST publication:
+    https://tsapps.nist.gov/publication/get_pdf.cfm?pub_id=906762
+    """
+    def __init__(self, value, n):
+        self.value = value
+        self.n = n
+        self.mask = (1 << n) - 1
+
+    @classmethod
+    def from_bit_str(cls, bit_str: str):
+        return cls(int(bit_str, 2) if bit_str else 0, len(bit_str))
+
+    @classmethod
+    def from_hex(cls, hex_str: str):
+        """Create from a hex string; returns None if not a hex string"""
+        try:
+            return cls(int(hex_str, 16), len(hex_str) * 4)
+        except ValueError:
+            pass
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Concatenate the hex tokens into one sequence, skipping non-hex"""
+        value = 0
+        n = 0
+        for token in tokens:
+            seq = cls.from_hex(token)
+            if seq is not None:
+                value = (value << seq.n) | seq.value
+                n += seq.n
+        return cls(value, n)
+
+    def ones(self):
+        return _popcount(self.value)
+
+    def block(self, index, size):
+        """Get the bits of the index-th non-overlapping block of size bits"""
+        shift = self.n - (index + 1) * size
+        return (self.value >> shift) & ((1 << size) - 1)
+
+    def rotate(self, count):
+        """Rotate the sequence left by count bits"""
+        count %= self.n
+        if not count:
+            return self.value
+        return ((self.value << count) | (self.value >> (self.n - count))) & (
+            self.mask)
+
+    def monobit(self):
+        """Frequency (Monobit) Test (section 2.1)"""
+        obs_sum = 2 * self.ones() - self.n
+        obs_stat = abs(obs_sum) / math.sqrt(self.n)
+        return math.erfc(obs_stat / math.sqrt(2))
+
+    def runs(self):
+        """Runs Test (section 2.3)"""
+        n = self.n
+        ones = self.ones()
+        pi = ones / n
+        tau = 2.0 / math.sqrt(n)
+        if abs(pi - 0.5) >= tau or ones == n:
+            # pre-test failed; do not run this test
+            return 0.0
+        # each bit that differs from its successor ends a run
+        v_n = 1 + _popcount((self.value ^ (self.value >> 1)) &
+                            (self.mask >> 1))
+        return math.erfc(abs(v_n - 2 * n * pi * (1 - pi)) / (
+            2 * math.sqrt(2 * n) * pi * (1 - pi)))
+
+    def block_frequency(self, block_size=None):
+        """Frequency Test within a Block (section 2.2)"""
+        m = block_size
+        if m is None:
+            # at least 20 bits per block and fewer than 100 blocks
+            m = max(20, self.n // 99 + 1)
+        blocks = self.n // m
+        if blocks < 1:
+            return None
+        chi_sq = 4.0 * m * sum((_popcount(self.block(i, m)) / m - 0.5) ** 2
+                               for i in range(blocks))
+        return _igamc(blocks / 2.0, chi_sq / 2.0)
+
+    _longest_run_params = [
+        # (min n, block size, category bounds (low, high), probabilities)
+        (6272, 128, (4, 9),
+         [0.1174, 0.2430, 0.2493, 0.1752, 0.1027, 0.1124]),
+        (128, 8, (1, 4), [0.2148, 0.3672, 0.2305, 0.1875]),
+    ]
+
+    @staticmethod
+    def _longest_run_of_ones(value):
+        length = 0
+        while value:
+            value &= value << 1
+            length += 1
+        return length
+
+    def longest_run(self):
+        """Test for the Longest Run of Ones in a Block (section 2.4)
+
+        Returns None if the sequence is shorter than 128 bits.
+        """
+        for min_n, m, (low, high), probs in self._longest_run_params:
+            if self.n >= min_n:
+                break
+        else:
+            return None
+        blocks = self.n // m
+        counts = [0] * len(probs)
+        for i in range(blocks):
+            run = self._longest_run_of_ones(self.block(i, m))
+            counts[min(max(run, low), high) - low] += 1
+        chi_sq = sum((c - blocks * p) ** 2 / (blocks * p)
+                     for c, p in zip(counts, probs))
+        return _igamc((len(probs) - 1) / 2.0, chi_sq / 2.0)
+
+    def _pattern_counts(self, m):
+        """Count overlapping m and m+1 bit patterns (with wraparound)
+
+        The sequence is rotated left by 0..m bits; a position matches a
+        pattern when each rotation has the corresponding pattern bit there,
+        so each pattern count is the popcount of an AND of rotations.
+        """
+        rotations = [self.rotate(j) for j in range(m + 1)]
+        counts = {m: [], m + 1: []}
+
+        def descend(depth, matches):
+            if depth in counts:
+                counts[depth].append(_popcount(matches))
+                if depth == m + 1:
+                    return
+            rot = rotations[depth]
+            descend(depth + 1, matches & ~rot & self.mask)
+            descend(depth + 1, matches & rot)
+
+        descend(0, self.mask)
+        return counts[m], counts[m + 1]
+
+    def approximate_entropy(self, m=None):
+        """Approximate Entropy Test (section 2.12)"""
+        n = self.n
+        if m is None:
+            # block length must be less than log2(n) - 5
+            m = max(1, min(8, int(math.log2(n)) - 6)) if n >= 2 else 1
+
+        def phi(pattern_counts):
+            return sum(c / n * math.log(c / n) for c in pattern_counts if c)
+
+        counts_m, counts_m1 = self._pattern_counts(m)
+        ap_en = phi(counts_m) - phi(counts_m1)
+        chi_sq = 2.0 * n * (math.log(2) - ap_en)
+        return _igamc(2 ** (m - 1), chi_sq / 2.0)
 
 
 def random_sequence(token: str):
@@ -388,16 +1070,54 @@ def random_sequence(token: str):
     @param token: the security token to test as a hex string
     @return: None if token is not hex, True if token is random, False otherwise
     """
-    bit_str = hex_to_binary_str(token)
-    if bit_str is None:
+    seq = BitSequence.from_hex(token)
+    if seq is None:
         return None
 
-    for func in [monobit_frequency, runs]:
-        p = func(bit_str)
+    for func in [seq.monobit, seq.runs]:
+        p = func()
         logging.debug('P-value of %s test for token %s is %s' %
                       (func.__name__, token, p))
         if p < 0.01:
-            # print('P-value of %s test for token %s is %s' %
-            #       (func.__name__, token, p))
             return False
     return True
+
+
+TokenRandomness = namedtuple('TokenRandomness', [
+    'tokens', 'invalid', 'bits', 'token_failures', 'p_values'])
+
+
+def random_token_batch(tokens, alpha=0.01):
+    """Run randomness tests on a batch of security tokens
+
+    The monobit and runs tests are applied to each token individually. The
+    tokens are then concatenated into a single bit stream and evaluated with
+    the monobit, runs, block frequency, longest run and approximate entropy
+    tests.
+
+    @param tokens: the security tokens to test as hex strings
+    @param alpha: the significance level for the per-token tests
+    @return: TokenRandomness with the number of hex tokens, number of
+        non-hex tokens, total bits, number of tokens failing a per-token
+        test and a dict of test name to P-value for the concatenated stream
+        (None where the stream is too short for the test)
+    """
+    seqs = [BitSequence.from_hex(t) for t in tokens]
+    valid = [s for s in seqs if s is not None and s.n]
+    token_failures = sum(1 for s in valid
+                         if s.monobit() < alpha or s.runs() < alpha)
+    stream = BitSequence.from_tokens(tokens)
+    p_values = {}
+    if stream.n:
+        p_values = {
+            'monobit_frequency': stream.monobit(),
+            'runs': stream.runs(),
+            'block_frequency': stream.block_frequency(),
+            'longest_run': stream.longest_run(),
+            'approximate_entropy': stream.approximate_entropy()
+        }
+    for name, p in p_values.items():
+        logging.debug('P-value of %s test over %s token bits is %s' %
+                      (name, stream.n, p))
+    return TokenRandomness(len(valid), len(tokens) - len(valid), stream.n,
+                           token_failures, p_values)
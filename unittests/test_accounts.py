@@ -320,9 +320,9 @@ class Accounts(TestCase):
                                 self.account_uri1)
         self.assertEqual(self.session.patch.call_count, 1)
 
-    @mock.patch('redfish_protocol_validator.accounts.requests.get')
-    @mock.patch('redfish_protocol_validator.accounts.requests.post')
-    @mock.patch('redfish_protocol_validator.accounts.requests.patch')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.patch')
     def test_password_change_required1(self, mock_patch, mock_post, mock_get):
         user = 'bob'
         pwd = 'xyzzy'
@@ -336,9 +336,9 @@ class Accounts(TestCase):
         self.assertEqual(mock_post.call_count, 1)
         self.assertEqual(mock_patch.call_count, 1)
 
-    @mock.patch('redfish_protocol_validator.accounts.requests.get')
-    @mock.patch('redfish_protocol_validator.accounts.requests.post')
-    @mock.patch('redfish_protocol_validator.accounts.requests.patch')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.patch')
     def test_password_change_required2(self, mock_patch, mock_post, mock_get):
         user = 'bob'
         pwd = 'xyzzy'
@@ -361,9 +361,9 @@ class Accounts(TestCase):
         self.assertEqual(mock_post.call_count, 0)
         self.assertEqual(mock_patch.call_count, 0)
 
-    @mock.patch('redfish_protocol_validator.accounts.requests.get')
-    @mock.patch('redfish_protocol_validator.accounts.requests.post')
-    @mock.patch('redfish_protocol_validator.accounts.requests.patch')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.patch')
     def test_password_change_required_no_prop(self, mock_patch, mock_post,
                                               mock_get):
         user = 'bob'
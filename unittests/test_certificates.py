@@ -0,0 +1,134 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import hashlib
+import ssl
+import unittest
+from unittest import mock
+
+import requests
+
+from redfish_protocol_validator import certificates
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+from unittests.utils import add_response
+
+
+class Certificates(unittest.TestCase):
+    def setUp(self):
+        super(Certificates, self).setUp()
+        self.sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy')
+        self.coll_uri = ('/redfish/v1/Managers/BMC/NetworkProtocol/HTTPS/'
+                         'Certificates')
+
+    def metrics(self):
+        return [(m['name'], m['value'], m['uri'])
+                for m in self.sut.metrics.get(certificates.CERT_CATEGORY, [])]
+
+    def add_cert_member(self, uri, pem):
+        self.sut.add_cert(self.coll_uri, uri)
+        add_response(self.sut, uri, 'GET', requests.codes.OK,
+                     json={'CertificateString': pem})
+
+    def test_fingerprint(self):
+        self.assertEqual(hashlib.sha256(b'leaf').hexdigest(),
+                         certificates.fingerprint(b'leaf'))
+
+    def test_pem_to_der_list(self):
+        pem = (ssl.DER_cert_to_PEM_cert(b'leaf') +
+               ssl.DER_cert_to_PEM_cert(b'issuer'))
+        self.assertEqual([b'leaf', b'issuer'],
+                         certificates.pem_to_der_list(pem))
+        pem = ('-----BEGIN CERTIFICATE-----\n!!!!\n'
+               '-----END CERTIFICATE-----\n')
+        self.assertEqual([], certificates.pem_to_der_list(pem))
+        self.assertEqual([], certificates.pem_to_der_list('not a cert'))
+
+    def test_peer_chain(self):
+        # full chain available as DER bytes
+        ssock = mock.Mock()
+        ssock.get_unverified_chain.return_value = [b'leaf', b'issuer']
+        self.assertEqual([b'leaf', b'issuer'],
+                         certificates.peer_chain(ssock))
+        # full chain available from the SSL object as certificate objects
+        ssock = mock.Mock(spec=['_sslobj', 'getpeercert'])
+        cert = mock.Mock()
+        cert.public_bytes.return_value = b'leaf'
+        ssock._sslobj.get_unverified_chain.return_value = [cert]
+        self.assertEqual([b'leaf'], certificates.peer_chain(ssock))
+        cert.public_bytes.assert_called_once_with(ssl._ssl.ENCODING_DER)
+        ssock.getpeercert.return_value = b'leaf'
+        # the private APIs failing or missing fall back to the leaf
+        ssock._sslobj.get_unverified_chain.side_effect = RuntimeError
+        self.assertEqual([b'leaf'], certificates.peer_chain(ssock))
+        ssock._sslobj.get_unverified_chain.side_effect = None
+        with mock.patch('redfish_protocol_validator.certificates.ssl._ssl',
+                        spec=[]):
+            self.assertEqual([b'leaf'], certificates.peer_chain(ssock))
+        # only the leaf certificate available
+        ssock = mock.Mock(spec=['getpeercert'])
+        ssock.getpeercert.return_value = b'leaf'
+        self.assertEqual([b'leaf'], certificates.peer_chain(ssock))
+        ssock.getpeercert.return_value = None
+        self.assertEqual([], certificates.peer_chain(ssock))
+
+    @mock.patch('redfish_protocol_validator.certificates.ssl.SSLContext')
+    def test_fetch_presented_chain_once(self, mock_ssl_ctx):
+        mock_conn = mock.Mock(spec=['connect', 'close', 'getpeercert'])
+        mock_conn.getpeercert.return_value = b'leaf'
+        mock_ssl_ctx.return_value.wrap_socket.return_value = mock_conn
+        self.assertEqual([b'leaf'],
+                         certificates.fetch_presented_chain(self.sut))
+        self.assertEqual([b'leaf'],
+                         certificates.fetch_presented_chain(self.sut))
+        self.assertEqual(b'leaf', self.sut.server_cert)
+        mock_conn.connect.assert_called_once_with(('127.0.0.1', 8000))
+        mock_conn.close.assert_called_once_with()
+
+    @mock.patch('redfish_protocol_validator.certificates.decoder')
+    def test_decode_certificate_cached(self, mock_decoder):
+        mock_decoder.decode.side_effect = lambda der, asn1Spec: [
+            {'tbsCertificate': {'version': 'v3', 'der': der}}]
+        first = certificates.decode_certificate(self.sut, b'leaf')
+        again = certificates.decode_certificate(self.sut, b'leaf')
+        self.assertIs(first, again)
+        certificates.decode_certificate(self.sut, b'issuer')
+        self.assertEqual(2, mock_decoder.decode.call_count)
+        self.assertEqual('v3', certificates.certificate_version(first))
+        self.assertEqual('<not found>', certificates.certificate_version({}))
+
+    @mock.patch('redfish_protocol_validator.certificates.decoder')
+    def test_check_certificate_members(self, mock_decoder):
+        mock_decoder.decode.return_value = [
+            {'tbsCertificate': {'version': 'v3'}}]
+        self.sut.set_server_cert_chain([b'leaf', b'issuer'])
+        # the leaf was already decoded by the X.509 check
+        certificates.decode_certificate(self.sut, b'leaf')
+        self.add_cert_member(self.coll_uri + '/1',
+                             ssl.DER_cert_to_PEM_cert(b'leaf'))
+        self.add_cert_member(self.coll_uri + '/2',
+                             ssl.DER_cert_to_PEM_cert(b'other'))
+        self.add_cert_member(self.coll_uri + '/3', None)
+        certificates.check_certificate_members(self.sut)
+        metrics = self.metrics()
+        self.assertIn(('Presented chain length', 2, ''), metrics)
+        self.assertIn(('Presented by service', 'yes (chain position 0)',
+                       self.coll_uri + '/1'), metrics)
+        self.assertIn(('Presented by service', 'no', self.coll_uri + '/2'),
+                      metrics)
+        self.assertIn(('X.509 version', 'v3', self.coll_uri + '/2'),
+                      metrics)
+        self.assertIn(('Certificate resources read', 2, ''), metrics)
+        self.assertIn(('Certificate resources in presented chain', '1 of 2',
+                       ''), metrics)
+        # only the member certificate not in the chain was decoded again
+        self.assertEqual(2, mock_decoder.decode.call_count)
+
+    def test_check_certificate_members_no_certs(self):
+        certificates.check_certificate_members(self.sut)
+        self.assertEqual([], self.metrics())
+
+
+if __name__ == '__main__':
+    unittest.main()
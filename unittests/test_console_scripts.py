@@ -0,0 +1,106 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import argparse
+import unittest
+from unittest import mock, TestCase
+
+from redfish_protocol_validator import console_scripts
+from redfish_protocol_validator.constants import Assertion, Result
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+from unittests.utils import FakeClock
+
+
+class ConsoleScripts(TestCase):
+    def setUp(self):
+        super(ConsoleScripts, self).setUp()
+        self.sut = SystemUnderTest('http://127.0.0.1:8000', 'oper', 'xyzzy')
+        self.clock = FakeClock()
+        patcher = mock.patch(
+            'redfish_protocol_validator.system_under_test.time')
+        mock_time = patcher.start()
+        mock_time.monotonic.side_effect = self.clock.monotonic
+        self.addCleanup(patcher.stop)
+        self.called = []
+        sections = []
+        for prefix, _ in console_scripts.test_sections:
+            sections.append((prefix, self.section_func(prefix)))
+        patcher = mock.patch.object(console_scripts, 'test_sections',
+                                    sections)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def section_func(self, prefix):
+        def func(sut):
+            self.called.append(prefix)
+            # each section takes 10 seconds
+            self.clock.sleep(10)
+        return func
+
+    def test_non_negative_int(self):
+        self.assertEqual(console_scripts.non_negative_int('0'), 0)
+        self.assertEqual(console_scripts.non_negative_int('25'), 25)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            console_scripts.non_negative_int('-1')
+        with self.assertRaises(ValueError):
+            console_scripts.non_negative_int('many')
+
+    def test_positive_int(self):
+        self.assertEqual(console_scripts.positive_int('1'), 1)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            console_scripts.positive_int('0')
+
+    def test_perform_tests_no_budget(self):
+        console_scripts.perform_tests(self.sut)
+        self.assertEqual(self.called,
+                         ['PROTO_', 'REQ_', 'RESP_', 'SERV_', 'SEC_'])
+        self.assertEqual(self.sut.summary_count(Result.NOT_TESTED), 0)
+
+    def test_perform_tests_budget_exhausted(self):
+        self.sut.set_time_budget(25)
+        console_scripts.perform_tests(self.sut)
+        self.assertEqual(self.called, ['PROTO_', 'REQ_', 'RESP_'])
+        for assertion in Assertion:
+            if assertion.name.startswith(('SERV_', 'SEC_')):
+                entries = self.sut.results.get(assertion)
+                self.assertEqual(len(entries), 1)
+                self.assertEqual(entries[0]['result'], Result.NOT_TESTED)
+                self.assertIn('time budget of 25 seconds',
+                              entries[0]['msg'])
+            else:
+                self.assertNotIn(assertion, self.sut.results)
+
+    def test_perform_tests_keeps_existing_results(self):
+        self.sut.log(Result.PASS, 'POST', 400, '/redfish/v1/SessionService',
+                     Assertion.SEC_REQUIRE_LOGIN_SESSIONS, 'passed')
+        self.sut.set_time_budget(5)
+        console_scripts.perform_tests(self.sut)
+        entries = self.sut.results.get(Assertion.SEC_REQUIRE_LOGIN_SESSIONS)
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['result'], Result.PASS)
+
+    @mock.patch('redfish_protocol_validator.console_scripts.sessions')
+    @mock.patch('redfish_protocol_validator.console_scripts.resources')
+    def test_read_resources_budget_exhausted(self, mock_resources,
+                                             mock_sessions):
+        calls = []
+        phases = []
+        for i in range(4):
+            def phase(*args, i=i):
+                calls.append((i, args))
+                self.clock.sleep(10)
+            phase.__name__ = 'phase%s' % i
+            phases.append((phase, i % 2 == 0))
+        mock_sessions.no_auth_session.return_value = 'no_auth'
+        self.sut.set_time_budget(15)
+        with mock.patch.object(console_scripts, 'read_phases', phases):
+            console_scripts.read_resources(self.sut)
+        mock_resources.read_target_resources.assert_called_once()
+        self.assertEqual(calls, [(0, (self.sut, 'no_auth')),
+                                 (1, (self.sut,))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import json
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock, TestCase
+
+import requests
+
+from redfish_protocol_validator import csdl
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+from unittests.utils import add_response
+
+metadata = '''<?xml version="1.0" encoding="UTF-8"?>
+<edmx:Edmx xmlns:edmx="http://docs.oasis-open.org/odata/ns/edmx"
+    Version="4.0">
+  <edmx:Reference
+      Uri="http://redfish.dmtf.org/schemas/v1/ServiceRoot_v1.xml">
+    <edmx:Include Namespace="ServiceRoot"/>
+    <edmx:Include Namespace="ServiceRoot.v1_5_0"/>
+  </edmx:Reference>
+  <edmx:Reference Uri="/redfish/v1/Schemas/Contoso_v1.xml">
+    <edmx:Include Namespace="Contoso"/>
+    <edmx:Include Namespace="Contoso.v1_0_0"/>
+  </edmx:Reference>
+  <edmx:DataServices>
+    <Schema xmlns="http://docs.oasis-open.org/odata/ns/edm"
+        Namespace="Service">
+      <EntityContainer Name="Service"
+          Extends="ServiceRoot.v1_5_0.ServiceContainer"/>
+    </Schema>
+  </edmx:DataServices>
+</edmx:Edmx>
+'''
+
+contoso = '''<?xml version="1.0" encoding="UTF-8"?>
+<edmx:Edmx xmlns:edmx="http://docs.oasis-open.org/odata/ns/edmx"
+    Version="4.0">
+  <edmx:DataServices>
+    <Schema xmlns="http://docs.oasis-open.org/odata/ns/edm"
+        Namespace="Contoso"/>
+  </edmx:DataServices>
+</edmx:Edmx>
+'''
+
+
+class Csdl(TestCase):
+    def setUp(self):
+        super(Csdl, self).setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy')
+        self.mock_session = mock.MagicMock(spec=requests.Session)
+        self.sut._set_session(self.mock_session)
+
+    def make_stream(self, text, etag=None, status_code=requests.codes.OK):
+        response = mock.MagicMock(spec=requests.Response)
+        response.status_code = status_code
+        response.ok = status_code == requests.codes.OK
+        response.headers = {'ETag': etag} if etag else {}
+        data = text.encode('utf-8')
+        response.iter_content.return_value = [data[i:i + 100] for i in
+                                              range(0, len(data), 100)]
+        return response
+
+    def test_parse(self):
+        doc = csdl.parse([metadata[:150], metadata[150:]])
+        self.assertEqual(doc.references, [
+            ['http://redfish.dmtf.org/schemas/v1/ServiceRoot_v1.xml',
+             ['ServiceRoot', 'ServiceRoot.v1_5_0']],
+            ['/redfish/v1/Schemas/Contoso_v1.xml',
+             ['Contoso', 'Contoso.v1_0_0']]])
+        self.assertEqual(doc.namespaces, ['Service'])
+        self.assertEqual(doc.entity_container, 'Service')
+
+    def test_parse_stop_at_container(self):
+        # content after the container is not read
+        text = metadata.replace('</edmx:DataServices>', '<bad')
+        with self.assertRaises(ET.ParseError):
+            csdl.parse([text])
+        doc = csdl.parse([text], stop_at_container=True)
+        self.assertEqual(doc.entity_container, 'Service')
+
+    def test_parse_no_container(self):
+        text = ('<Edmx><DataServices><Schema Namespace="A"/>'
+                '<Schema Namespace="B"><EntityContainer/></Schema>'
+                '</DataServices></Edmx>')
+        doc = csdl.parse([text])
+        self.assertIsNone(doc.entity_container)
+        self.assertEqual(doc.namespaces, ['A', 'B'])
+        doc = csdl.parse([text], stop_at_container=True)
+        self.assertIsNone(doc.entity_container)
+        self.assertEqual(doc.namespaces, ['A'])
+
+    def test_schema_cache(self):
+        cache = csdl.SchemaCache(self.tmp_dir.name)
+        uri = '/redfish/v1/$metadata'
+        doc = csdl.CsdlDocument([['/a.xml', ['A']]], ['Service'], 'Service')
+        self.assertIsNone(cache.get(uri, '"1"'))
+        cache.put(uri, '"1"', doc)
+        self.assertEqual(cache.get(uri, '"1"'), doc)
+        self.assertIsNone(cache.get(uri, '"2"'))
+        self.assertEqual(cache.parsed, 1)
+        self.assertEqual(cache.hits, 1)
+        # entries from another cache format are ignored
+        path = cache._path(uri, '"1"')
+        with open(path) as f:
+            data = json.load(f)
+        data['format'] = csdl.CACHE_FORMAT + 1
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        self.assertIsNone(cache.get(uri, '"1"'))
+
+    def test_read_metadata_cached(self):
+        cache = csdl.SchemaCache(os.path.join(self.tmp_dir.name, 'csdl'))
+        self.sut.set_csdl_cache(cache)
+        response = add_response(self.sut, '/redfish/v1/$metadata',
+                                text=metadata)
+        doc = csdl.read_metadata(self.sut, response)
+        self.assertEqual(doc.entity_container, 'Service')
+        self.assertEqual(cache.parsed, 1)
+        with mock.patch('redfish_protocol_validator.csdl.parse') as parse:
+            self.assertEqual(csdl.read_metadata(self.sut, response), doc)
+            parse.assert_not_called()
+        self.assertEqual(cache.hits, 1)
+
+    def test_read_metadata_streamed(self):
+        response = self.make_stream(metadata + '<bad' * 100)
+        doc = csdl.read_metadata(self.sut, response)
+        self.assertEqual(doc.entity_container, 'Service')
+        response.iter_content.assert_called_once_with(chunk_size=65536)
+
+    def test_local_reference(self):
+        self.assertEqual(csdl.local_reference(
+            self.sut, '/redfish/v1/Schemas/A_v1.xml#A'),
+            '/redfish/v1/Schemas/A_v1.xml')
+        self.assertEqual(csdl.local_reference(
+            self.sut, self.sut.rhost + '/redfish/v1/Schemas/A_v1.xml'),
+            '/redfish/v1/Schemas/A_v1.xml')
+        self.assertIsNone(csdl.local_reference(
+            self.sut, 'http://redfish.dmtf.org/schemas/v1/A_v1.xml'))
+        self.assertIsNone(csdl.local_reference(self.sut, None))
+
+    def test_read_document_cached(self):
+        uri = '/redfish/v1/Schemas/Contoso_v1.xml'
+        cache = csdl.SchemaCache(self.tmp_dir.name)
+        self.sut.set_csdl_cache(cache)
+        first = self.make_stream(contoso, etag='"5c1f9e27a8"')
+        second = self.make_stream(contoso, etag='"5c1f9e27a8"')
+        self.mock_session.get.side_effect = [first, second]
+        doc, error = csdl.read_document(self.sut, uri)
+        self.assertIsNone(error)
+        self.assertEqual(doc.namespaces, ['Contoso'])
+        self.mock_session.get.assert_called_with(
+            self.sut.rhost + uri, stream=True,
+            headers={'accept': 'application/xml'},
+            timeout=self.sut.transport.timeouts())
+        self.assertEqual(csdl.read_document(self.sut, uri), (doc, None))
+        # the body of the cached document was not read
+        second.iter_content.assert_not_called()
+        second.close.assert_called_once_with()
+
+    def test_read_document_weak_etag(self):
+        uri = '/redfish/v1/Schemas/Contoso_v1.xml'
+        cache = csdl.SchemaCache(self.tmp_dir.name)
+        self.sut.set_csdl_cache(cache)
+        first = self.make_stream(contoso, etag='W/"5c1f9e27a8"')
+        # a short ETag may repeat for different content
+        second = self.make_stream(contoso, etag='"1"')
+        self.mock_session.get.side_effect = [first, second]
+        doc, error = csdl.read_document(self.sut, uri)
+        self.assertEqual(doc.namespaces, ['Contoso'])
+        with mock.patch('redfish_protocol_validator.csdl.parse') as parse:
+            self.assertEqual(csdl.read_document(self.sut, uri), (doc, None))
+            parse.assert_not_called()
+        # the body was read to look the document up by its digest
+        second.iter_content.assert_called_once_with(chunk_size=65536)
+        self.assertEqual(cache.hits, 1)
+
+    def test_etag_key(self):
+        etag = '"5c1f9e27a8"'
+        self.assertIsNone(csdl.etag_key(self.sut, None))
+        self.assertIsNone(csdl.etag_key(self.sut, 'W/' + etag))
+        self.assertIsNone(csdl.etag_key(self.sut, '"17"'))
+        key = csdl.etag_key(self.sut, etag)
+        self.assertIn(self.sut.rhost, key)
+        # the same ETag from another service is a different key
+        self.sut.set_service_uuid('92384634-2938-2342-8820-489239905423')
+        self.assertNotEqual(csdl.etag_key(self.sut, etag), key)
+        self.assertIn('92384634-2938-2342-8820-489239905423',
+                      csdl.etag_key(self.sut, etag))
+
+    def test_read_document_errors(self):
+        uri = '/redfish/v1/Schemas/Contoso_v1.xml'
+        self.mock_session.get.return_value = self.make_stream(
+            '', status_code=requests.codes.NOT_FOUND)
+        self.assertEqual(csdl.read_document(self.sut, uri),
+                         (None, 'GET %s returned status 404' % uri))
+        self.mock_session.get.return_value = self.make_stream('<bad')
+        doc, error = csdl.read_document(self.sut, uri)
+        self.assertIsNone(doc)
+        self.assertIn('Unable to parse %s' % uri, error)
+
+    def test_check_references(self):
+        uri = '/redfish/v1/Schemas/Contoso_v1.xml'
+        self.sut.set_csdl_cache(csdl.SchemaCache(self.tmp_dir.name))
+        self.mock_session.get.return_value = self.make_stream(contoso)
+        doc = csdl.parse([metadata])
+        csdl.check_references(self.sut, doc)
+        # only the document hosted by the service is read
+        self.mock_session.get.assert_called_once_with(
+            self.sut.rhost + uri, stream=True,
+            headers={'accept': 'application/xml'},
+            timeout=self.sut.transport.timeouts())
+        metrics = {m['name']: m for m in
+                   self.sut.metrics[csdl.CSDL_CATEGORY]}
+        self.assertEqual(metrics['Unresolved includes']['value'],
+                         'Contoso.v1_0_0')
+        self.assertEqual(metrics['Unresolved includes']['uri'], uri)
+        self.assertEqual(metrics['Service-hosted documents read']['value'],
+                         '1 of 1')
+
+    def test_check_references_no_cache(self):
+        doc = csdl.parse([metadata])
+        csdl.check_references(self.sut, doc)
+        # without the cache the documents would be read on every run
+        self.mock_session.get.assert_not_called()
+        self.assertNotIn(csdl.CSDL_CATEGORY, self.sut.metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
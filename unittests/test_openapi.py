@@ -0,0 +1,176 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import tempfile
+import unittest
+from unittest import mock, TestCase
+
+import requests
+
+from redfish_protocol_validator import openapi
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+document = '''openapi: 3.0.1
+info:
+  title: Redfish
+  version: '1.0'
+# the paths
+paths:
+  /redfish/v1:
+    get:
+      responses:
+        '200':
+          description: ok
+  /redfish/v1/Systems:
+    get:
+      parameters:
+        - $ref: '#/components/parameters/Top'
+    post:
+      responses: {}
+  '/redfish/v1/Systems/{ComputerSystemId}':
+    parameters:
+      - name: ComputerSystemId
+        in: path
+    get:
+      description: 'get: a system'
+    patch:
+      description: update
+  /redfish/v1/Systems/{ComputerSystemId}/Actions/ComputerSystem.Reset:
+    post:
+      description: reset
+components:
+  parameters:
+    get:
+      description: not an operation
+'''
+
+
+class OpenApi(TestCase):
+    def setUp(self):
+        super(OpenApi, self).setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy')
+        self.mock_session = mock.MagicMock(spec=requests.Session)
+        self.sut._set_session(self.mock_session)
+
+    def make_response(self, etag='"5c1f9e27a8"',
+                      status_code=requests.codes.OK):
+        response = mock.MagicMock(spec=requests.Response)
+        response.status_code = status_code
+        response.ok = status_code == requests.codes.OK
+        response.headers = {'Content-Length': str(len(document))}
+        if etag:
+            response.headers['ETag'] = etag
+        response.iter_lines.return_value = [
+            line.encode('utf-8') for line in document.splitlines()]
+        return response
+
+    def test_index_paths(self):
+        paths = openapi.index_paths(document.splitlines(keepends=True))
+        self.assertEqual(paths, {
+            '/redfish/v1': ['GET'],
+            '/redfish/v1/Systems': ['GET', 'POST'],
+            '/redfish/v1/Systems/{ComputerSystemId}': ['GET', 'PATCH'],
+            '/redfish/v1/Systems/{ComputerSystemId}/Actions/'
+            'ComputerSystem.Reset': ['POST']
+        })
+
+    def test_index_match(self):
+        index = openapi.OpenApiIndex(openapi.index_paths(
+            document.splitlines()))
+        self.assertEqual(index.match('/redfish/v1/Systems/'),
+                         '/redfish/v1/Systems')
+        self.assertEqual(index.match('/redfish/v1/Systems/1?$select=Id'),
+                         '/redfish/v1/Systems/{ComputerSystemId}')
+        self.assertEqual(
+            index.allowed_methods(
+                '/redfish/v1/Systems/1/Actions/ComputerSystem.Reset'),
+            {'POST'})
+        self.assertEqual(index.allowed_methods('/redfish/v1/Systems/1'),
+                         {'GET', 'PATCH'})
+        self.assertIsNone(index.match('/redfish/v1/Systems/1/Bios'))
+        self.assertIsNone(index.allowed_methods('/redfish/v1/Chassis'))
+        self.assertEqual(index.seed_uris(),
+                         ['/redfish/v1', '/redfish/v1/Systems'])
+        self.assertEqual(index.operations, 6)
+
+    def test_fetch_openapi(self):
+        response = self.make_response()
+        self.mock_session.get.return_value = response
+        r = openapi.fetch_openapi(self.sut)
+        self.assertIs(r, response)
+        self.mock_session.get.assert_called_once_with(
+            self.sut.rhost + openapi.OPENAPI_URI, stream=True,
+            headers={'accept': 'application/yaml'},
+            timeout=self.sut.transport.timeouts())
+        response.close.assert_called_once_with()
+        self.assertEqual(self.sut.openapi.allowed_methods('/redfish/v1'),
+                         {'GET'})
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[openapi.OPENAPI_CATEGORY]}
+        self.assertEqual(metrics['Index source'], 'download')
+        self.assertEqual(metrics['Paths indexed'], 4)
+
+    def test_fetch_openapi_cached(self):
+        self.sut.set_openapi_cache(openapi.OpenApiCache(self.tmp_dir.name))
+        self.mock_session.get.return_value = self.make_response()
+        openapi.fetch_openapi(self.sut)
+        paths = self.sut.openapi.paths
+        # the cached index is used without reading the body
+        response = self.make_response()
+        self.mock_session.get.return_value = response
+        openapi.fetch_openapi(self.sut)
+        response.iter_lines.assert_not_called()
+        self.assertEqual(self.sut.openapi.paths, paths)
+        # a different ETag or length is read and indexed again
+        response = self.make_response(etag='"6d20af38b9"')
+        self.mock_session.get.return_value = response
+        openapi.fetch_openapi(self.sut)
+        response.iter_lines.assert_called_once_with()
+        response = self.make_response()
+        response.headers['Content-Length'] = '1'
+        self.mock_session.get.return_value = response
+        openapi.fetch_openapi(self.sut)
+        response.iter_lines.assert_called_once_with()
+        # missing, weak and short ETags are not trusted
+        for etag in [None, 'W/"5c1f9e27a8"', '"1"']:
+            for i in range(2):
+                response = self.make_response(etag=etag)
+                self.mock_session.get.return_value = response
+                openapi.fetch_openapi(self.sut)
+                response.iter_lines.assert_called_once_with()
+
+    def test_fetch_openapi_cache_scoped(self):
+        cache = openapi.OpenApiCache(self.tmp_dir.name)
+        self.sut.set_openapi_cache(cache)
+        self.mock_session.get.return_value = self.make_response()
+        openapi.fetch_openapi(self.sut)
+        # the same ETag from another service is not a cache hit
+        sut = SystemUnderTest('https://127.0.0.2:8000', 'oper', 'xyzzy')
+        sut._set_session(self.mock_session)
+        sut.set_openapi_cache(cache)
+        response = self.make_response()
+        self.mock_session.get.return_value = response
+        openapi.fetch_openapi(sut)
+        response.iter_lines.assert_called_once_with()
+
+    def test_fetch_openapi_request_error(self):
+        self.mock_session.get.side_effect = requests.exceptions.Timeout
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(openapi.fetch_openapi(self.sut))
+        self.assertIsNone(self.sut.openapi)
+
+    def test_fetch_openapi_not_found(self):
+        response = self.make_response(status_code=requests.codes.NOT_FOUND)
+        self.mock_session.get.return_value = response
+        self.assertIs(openapi.fetch_openapi(self.sut), response)
+        self.assertIsNone(self.sut.openapi)
+        response.iter_lines.assert_not_called()
+        response.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
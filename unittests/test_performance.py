@@ -0,0 +1,288 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import queue
+import unittest
+from unittest import mock, TestCase
+
+import requests
+
+from redfish_protocol_validator import performance
+from redfish_protocol_validator.constants import Assertion, Result
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+from unittests.utils import add_response, get_result
+
+
+class FakeEventStream(object):
+    """Streaming response that delivers an event for each test event POST"""
+    def __init__(self):
+        self.ok = True
+        self.status_code = requests.codes.OK
+        self._queue = queue.Queue()
+
+    def __iter__(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def submit(self, uri, json=None, **kwargs):
+        self._queue.put(('id:%s\ndata:{"EventId": "%s"}\n\n' % (
+            json['EventId'], json['EventId'])).encode('utf-8'))
+        response = mock.Mock(spec=requests.Response)
+        response.ok = True
+        response.status_code = requests.codes.NO_CONTENT
+        return response
+
+    def close(self):
+        self._queue.put(None)
+
+
+def get_metric(sut, name, category=performance.SSE_CATEGORY, uri=None):
+    for m in sut.metrics.get(category, []):
+        if m['name'] == name and (uri is None or m['uri'] == uri):
+            return m
+    return None
+
+
+def fake_service(sut, pages):
+    """Return a session get() side effect serving the given JSON payloads"""
+    def get(url, **kwargs):
+        response = mock.MagicMock(spec=requests.Response)
+        data = pages.get(url[len(sut.rhost):])
+        response.status_code = (requests.codes.OK if data is not None
+                                else requests.codes.NOT_FOUND)
+        response.ok = data is not None
+        response.json.return_value = data
+        return response
+    return get
+
+
+def collection_pages(uri, count, size, actual=None):
+    """Build the $skip pages of a collection with the given member count"""
+    actual = count if actual is None else actual
+    pages = {}
+    for skip in range(0, actual, size):
+        page = {'Members': [{'@odata.id': '%s/%s' % (uri, i)}
+                            for i in range(skip, min(skip + size, actual))]}
+        if skip == 0:
+            page['Members@odata.count'] = count
+        if skip + size < actual:
+            page['Members@odata.nextLink'] = '%s?$skip=%s' % (uri, skip + size)
+        pages[uri if skip == 0 else '%s?$skip=%s' % (uri, skip)] = page
+    # pages the count accounts for beyond the actual members are empty
+    for skip in range(-(-actual // size) * size, count, size):
+        pages['%s?$skip=%s' % (uri, skip)] = {'Members': []}
+    return pages
+
+
+class Performance(TestCase):
+    def setUp(self):
+        super(Performance, self).setUp()
+        self.sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy')
+        self.mock_session = mock.MagicMock(spec=requests.Session)
+        self.sut._set_session(self.mock_session)
+        self.sse_uri = '/redfish/v1/EventService/SSE'
+        self.event_service_uri = '/redfish/v1/EventService'
+        self.sut.set_server_sent_event_uri(self.sse_uri)
+        self.sut.set_nav_prop_uri('EventService', self.event_service_uri)
+
+    def test_sse_benchmark_no_sse_uri(self):
+        self.sut.set_server_sent_event_uri(None)
+        performance.sse_benchmark(self.sut)
+        self.assertEqual({}, self.sut.metrics)
+        self.mock_session.get.assert_not_called()
+
+    def test_sse_benchmark_open_failed(self):
+        self.mock_session.get.return_value.ok = False
+        performance.sse_benchmark(self.sut)
+        self.assertEqual({}, self.sut.metrics)
+
+    def test_sse_benchmark_no_submit_test_event(self):
+        add_response(self.sut, self.event_service_uri, json={})
+        self.mock_session.get.return_value = FakeEventStream()
+        performance.sse_benchmark(self.sut, max_streams=3)
+        self.assertIsNotNone(get_metric(self.sut, 'Stream open time'))
+        self.assertIsNotNone(get_metric(self.sut, 'Reconnect time'))
+        self.assertIsNone(
+            get_metric(self.sut, 'Event delivery latency (median)'))
+        self.mock_session.post.assert_not_called()
+        metric = get_metric(self.sut, 'Concurrent streams accepted')
+        self.assertEqual(3, metric['value'])
+
+    def test_sse_benchmark(self):
+        target = (self.event_service_uri +
+                  '/Actions/EventService.SubmitTestEvent')
+        add_response(self.sut, self.event_service_uri, json={
+            'Actions': {
+                '#EventService.SubmitTestEvent': {'target': target}
+            }
+        })
+        stream = FakeEventStream()
+        refused = mock.Mock(spec=requests.Response)
+        refused.ok = False
+        refused.status_code = requests.codes.SERVICE_UNAVAILABLE
+        self.mock_session.get.side_effect = [
+            stream, FakeEventStream(), FakeEventStream(), FakeEventStream(),
+            refused]
+        self.mock_session.post.side_effect = stream.submit
+        performance.sse_benchmark(self.sut, samples=3, burst=5, timeout=2)
+        self.assertEqual(8, self.mock_session.post.call_count)
+        self.assertIsNotNone(
+            get_metric(self.sut, 'Event delivery latency (median)'))
+        self.assertIsNotNone(get_metric(self.sut, 'Sustained event rate'))
+        metric = get_metric(self.sut, 'Latency samples delivered')
+        self.assertEqual('3 of 3', metric['value'])
+        metric = get_metric(self.sut, 'Burst events delivered')
+        self.assertEqual('5 of 5', metric['value'])
+        metric = get_metric(self.sut, 'Concurrent streams accepted')
+        self.assertEqual(2, metric['value'])
+        metric = get_metric(self.sut, 'Additional stream refused with')
+        self.assertEqual('status 503', metric['value'])
+
+    def test_skip_links(self):
+        uri = '/redfish/v1/Systems/1/LogServices/Log/Entries'
+        self.assertEqual(
+            performance.skip_links(uri + '?$skip=50', 160),
+            [uri + '?$skip=50', uri + '?$skip=100', uri + '?$skip=150'])
+        self.assertEqual(
+            performance.skip_links(uri + '?$top=50&$skip=50', 100),
+            [uri + '?$top=50&$skip=50'])
+        self.assertIsNone(performance.skip_links(uri + '?token=abc', 160))
+        self.assertIsNone(performance.skip_links(uri + '?$skip=0', 160))
+        self.assertIsNone(performance.skip_links(uri + '?$skip=50', None))
+
+    def test_find_large_collections(self):
+        accounts = '/redfish/v1/AccountService/Accounts'
+        add_response(self.sut, accounts, json={
+            'Members@odata.count': 3, 'Members': [{}, {}, {}]})
+        add_response(self.sut, '/redfish/v1/Chassis/1', json={
+            'Sensors': {'@odata.id': '/redfish/v1/Chassis/1/Sensors'}})
+        add_response(self.sut, '/redfish/v1/Systems/1', json={
+            'LogServices': {'@odata.id': '/redfish/v1/Systems/1/LogServices'}})
+        add_response(self.sut, '/redfish/v1/SessionService/Sessions', json={
+            'Members@odata.count': 0, 'Members': []})
+        pages = {
+            '/redfish/v1/Chassis/1/Sensors': {
+                'Members@odata.count': 40, 'Members': []},
+            '/redfish/v1/Systems/1/LogServices': {
+                'Members@odata.count': 1, 'Members': [
+                    {'@odata.id': '/redfish/v1/Systems/1/LogServices/Log'}]},
+            '/redfish/v1/Systems/1/LogServices/Log': {
+                'Entries': {'@odata.id':
+                            '/redfish/v1/Systems/1/LogServices/Log/Entries'}},
+            '/redfish/v1/Systems/1/LogServices/Log/Entries': {
+                'Members@odata.count': 500, 'Members': []}
+        }
+        self.mock_session.get.side_effect = fake_service(self.sut, pages)
+        self.assertEqual(performance.find_large_collections(self.sut), [
+            ('/redfish/v1/Systems/1/LogServices/Log/Entries', 500),
+            ('/redfish/v1/Chassis/1/Sensors', 40),
+            (accounts, 3)])
+        self.assertEqual(self.mock_session.get.call_count, 4)
+        self.mock_session.get.reset_mock()
+        self.assertEqual(
+            performance.find_large_collections(self.sut, max_requests=1),
+            [('/redfish/v1/Chassis/1/Sensors', 40), (accounts, 3)])
+        self.assertEqual(self.mock_session.get.call_count, 1)
+
+    def test_read_all_pages_concurrent(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        self.mock_session.get.side_effect = fake_service(
+            self.sut, collection_pages(uri, 10, 3))
+        read = performance.read_all_pages(self.sut, uri)
+        self.assertEqual(read.mode, 'concurrent ($skip)')
+        self.assertEqual(read.status, requests.codes.OK)
+        self.assertEqual(read.count, 10)
+        self.assertEqual(read.pages, 4)
+        self.assertEqual(read.members, 10)
+        self.assertEqual(len(read.page_times), 4)
+        self.assertIsNone(read.error)
+        self.assertEqual(self.mock_session.get.call_count, 4)
+
+    def test_read_all_pages_beyond_count(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        self.mock_session.get.side_effect = fake_service(
+            self.sut, collection_pages(uri, 5, 3, actual=11))
+        read = performance.read_all_pages(self.sut, uri)
+        self.assertEqual(read.pages, 4)
+        self.assertEqual(read.members, 11)
+        self.assertIsNone(read.error)
+
+    def test_read_all_pages_sequential(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        pages = {
+            uri: {'Members@odata.count': 3, 'Members': [{}, {}],
+                  'Members@odata.nextLink': uri + '?token=abc'},
+            uri + '?token=abc': {'Members': [{}]}
+        }
+        self.mock_session.get.side_effect = fake_service(self.sut, pages)
+        read = performance.read_all_pages(self.sut, uri)
+        self.assertEqual(read.mode, 'sequential')
+        self.assertEqual(read.pages, 2)
+        self.assertEqual(read.members, 3)
+        self.assertIsNone(read.error)
+
+    def test_read_all_pages_error(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        pages = collection_pages(uri, 10, 3)
+        del pages[uri + '?$skip=6']
+        self.mock_session.get.side_effect = fake_service(self.sut, pages)
+        read = performance.read_all_pages(self.sut, uri)
+        self.assertEqual(read.pages, 2)
+        self.assertIn('returned status 404', read.error)
+
+    def test_collection_benchmark(self):
+        sensors = '/redfish/v1/Chassis/1/Sensors'
+        entries = '/redfish/v1/Managers/1/LogServices/Log/Entries'
+        add_response(self.sut, '/redfish/v1/Chassis/1', json={
+            'Sensors': {'@odata.id': sensors}})
+        add_response(self.sut, '/redfish/v1/Managers/1/LogServices/Log',
+                     json={'Entries': {'@odata.id': entries}})
+        pages = collection_pages(sensors, 7, 2)
+        pages.update(collection_pages(entries, 9, 4, actual=8))
+        self.mock_session.get.side_effect = fake_service(self.sut, pages)
+        performance.collection_benchmark(self.sut)
+        result = get_result(
+            self.sut, Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL, 'GET',
+            sensors)
+        self.assertEqual(Result.PASS, result['result'])
+        result = get_result(
+            self.sut, Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL, 'GET',
+            entries)
+        self.assertEqual(Result.FAIL, result['result'])
+        self.assertIn('The count property (9) of collection resource %s was '
+                      'not equal to the number of members (8) found in its 3 '
+                      'pages' % entries, result['msg'])
+        category = performance.COLLECTION_CATEGORY
+        metric = get_metric(self.sut, 'Pages read', category, sensors)
+        self.assertEqual(4, metric['value'])
+        metric = get_metric(self.sut, 'Members found', category, entries)
+        self.assertEqual('8 (count 9)', metric['value'])
+        self.assertIsNotNone(get_metric(
+            self.sut, 'Page fetch latency (median)', category, sensors))
+        self.assertIsNotNone(get_metric(
+            self.sut, 'Member throughput', category, sensors))
+
+    def test_collection_benchmark_none_found(self):
+        performance.collection_benchmark(self.sut)
+        self.assertEqual({}, self.sut.metrics)
+
+    @mock.patch('redfish_protocol_validator.performance.collection_benchmark')
+    @mock.patch('redfish_protocol_validator.performance.sse_benchmark')
+    def test_run_benchmarks(self, mock_sse_benchmark,
+                            mock_collection_benchmark):
+        performance.run_benchmarks(self.sut, None)
+        mock_sse_benchmark.assert_not_called()
+        performance.run_benchmarks(self.sut, ['sse'])
+        mock_sse_benchmark.assert_called_once_with(self.sut)
+        mock_collection_benchmark.assert_not_called()
+        performance.run_benchmarks(self.sut, ['collections'])
+        mock_collection_benchmark.assert_called_once_with(self.sut)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,8 @@ from unittest import mock, TestCase
 import requests
 
 from redfish_protocol_validator import protocol_details as proto
+from redfish_protocol_validator import templates
+from redfish_protocol_validator import utils
 from redfish_protocol_validator.constants import Assertion, RequestType, ResourceType, Result
 from redfish_protocol_validator.system_under_test import SystemUnderTest
 from unittests.utils import add_response, get_result
@@ -314,6 +316,23 @@ class ProtocolDetails(TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(Result.PASS, result['result'])
 
+    def test_test_valid_etag_expanded(self):
+        uri = '/redfish/v1/AccountService/Roles/Admin'
+        coll = add_response(self.sut, '/redfish/v1/AccountService/Roles',
+                            json={'Members': []})
+        response = utils.expanded_member_response(
+            coll, self.sut.rhost + uri, {'@odata.id': uri})
+        proto.test_valid_etag(self.sut, uri, response)
+        proto.test_media_types(self.sut, uri, response)
+        for assertion in [Assertion.PROTO_ETAG_RFC7232,
+                          Assertion.PROTO_JSON_ALL_RESOURCES,
+                          Assertion.PROTO_JSON_RFC]:
+            result = get_result(self.sut, assertion, 'GET', uri)
+            self.assertIsNotNone(result)
+            self.assertEqual(Result.NOT_TESTED, result['result'])
+            self.assertIn('synthesized from an expanded collection',
+                          result['msg'])
+
     def test_test_http_supported_methods_pass(self):
         proto.test_http_supported_methods(self.sut)
         result = get_result(self.sut, Assertion.PROTO_HTTP_SUPPORTED_METHODS,
@@ -359,9 +378,75 @@ class ProtocolDetails(TestCase):
         self.assertEqual(Result.FAIL, result['result'])
         self.assertIn('DELETE method returned status', result['msg'])
 
+    def test_test_http_unsupported_methods_probes(self):
+        uri = '/redfish/v1/Chassis/1'
+        add_response(self.sut, uri, 'HEAD', requests.codes.OK,
+                     request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, uri, 'POST', requests.codes.METHOD_NOT_ALLOWED,
+                     request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, uri, 'PATCH', requests.codes.OK,
+                     request_type=RequestType.METHOD_PROBE)
+        proto.test_http_unsupported_methods(self.sut)
+        self.assertIsNone(get_result(
+            self.sut, Assertion.PROTO_HTTP_UNSUPPORTED_METHODS, 'HEAD', uri))
+        result = get_result(self.sut, Assertion.PROTO_HTTP_UNSUPPORTED_METHODS,
+                            'POST', uri)
+        self.assertEqual(Result.PASS, result['result'])
+        result = get_result(self.sut, Assertion.PROTO_HTTP_UNSUPPORTED_METHODS,
+                            'PATCH', uri)
+        self.assertEqual(Result.FAIL, result['result'])
+        self.assertIn('PATCH method omitted from the Allow header returned '
+                      'status 200; expected status 405 or 501', result['msg'])
+
     def test_test_protocol_details_cover(self):
         proto.test_protocol_details(self.sut)
 
+    def test_test_protocol_details_snapshot_replay(self):
+        snapshot = mock.Mock()
+        snapshot.replay.side_effect = lambda sut, uri, r: uri == '/redfish'
+        self.sut.set_snapshot(snapshot)
+        proto.test_protocol_details(self.sut)
+        # the replayed resource is not analyzed again
+        self.assertIsNone(get_result(self.sut, Assertion.PROTO_STD_URI_VERSION,
+                                     'GET', '/redfish'))
+        self.assertIsNotNone(get_result(
+            self.sut, Assertion.PROTO_STD_URI_SERVICE_ROOT, 'GET',
+            '/redfish/v1/'))
+
+    @mock.patch('redfish_protocol_validator.system_under_test.'
+                'SystemUnderTest.deadline_passed',
+                new_callable=mock.PropertyMock)
+    def test_test_protocol_details_deadline(self, mock_deadline):
+        mock_deadline.return_value = True
+        with self.assertLogs(level='WARNING'):
+            proto.test_protocol_details(self.sut)
+        self.assertIsNone(get_result(self.sut, Assertion.PROTO_URI_SAFE_CHARS,
+                                     'GET', '/redfish/v1/'))
+
+    def test_test_protocol_details_sampled(self):
+        for i in range(3):
+            add_response(self.sut, '/redfish/v1/Chassis/%s' % i, 'GET',
+                         json={'@odata.type': '#Chassis.v1_0_0.Chassis'})
+        templates.build_index(self.sut)
+        self.sut.set_sample_mode(templates.SAMPLE_TEMPLATE)
+        proto.test_protocol_details(self.sut)
+        self.assertIsNotNone(get_result(
+            self.sut, Assertion.PROTO_URI_SAFE_CHARS, 'GET',
+            '/redfish/v1/Chassis/0'))
+        for uri in ['/redfish/v1/Chassis/1', '/redfish/v1/Chassis/2']:
+            self.assertIsNone(get_result(
+                self.sut, Assertion.PROTO_URI_SAFE_CHARS, 'GET', uri))
+            self.assertIsNone(get_result(
+                self.sut, Assertion.PROTO_JSON_ALL_RESOURCES, 'GET', uri))
+        # resources without a type are all checked
+        self.assertIsNotNone(get_result(
+            self.sut, Assertion.PROTO_URI_SAFE_CHARS, 'GET', '/redfish/v1/'))
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[templates.TEMPLATE_CATEGORY]}
+        self.assertEqual(
+            metrics['Resources checked for URI, media type and ETag'],
+            '7 of 9')
+
 
 if __name__ == '__main__':
     unittest.main()
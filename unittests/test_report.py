@@ -29,6 +29,8 @@ class Report(TestCase):
         self.sut.log(Result.WARN, 'GET', 204, '/redfish/v1/baz',
                      Assertion.PROTO_STD_URIS_SUPPORTED,
                      'some warning message')
+        self.sut.add_metric('SSE Benchmark', 'Stream open time', 12.5, 'ms',
+                            '/redfish/v1/EventService/SSE')
 
     @mock.patch("builtins.open", new_callable=mock.mock_open)
     def test_tsv_report(self, mock_file):
@@ -43,6 +45,18 @@ class Report(TestCase):
         html_report(self.sut, self.report_dir, self.current_time, '0.6.0')
         # HTML report is generated with one write() call
         self.assertEqual(handle.write.call_count, 1)
+        html = handle.write.call_args[0][0]
+        self.assertIn('Performance Metrics', html)
+        self.assertIn('12.500', html)
+
+    @mock.patch("builtins.open", new_callable=mock.mock_open)
+    def test_html_report_metric_escaped(self, mock_file):
+        handle = mock_file()
+        self.sut.add_metric('TLS Scan', 'Cipher', '<b>&</b>')
+        html_report(self.sut, self.report_dir, self.current_time, '0.6.0')
+        html = handle.write.call_args[0][0]
+        self.assertIn('&lt;b&gt;&amp;&lt;/b&gt;', html)
+        self.assertNotIn('<b>&</b>', html)
 
     @mock.patch("builtins.open", new_callable=mock.mock_open)
     def test_json_results(self, mock_file):
@@ -50,6 +64,9 @@ class Report(TestCase):
         json_results(self.sut, self.report_dir, self.current_time, '0.6.0')
         # json_results() calls json.dump() which calls write() 1 or more times
         self.assertGreaterEqual(handle.write.call_count, 1)
+        output = ''.join(c[0][0] for c in handle.write.call_args_list)
+        self.assertIn('"Metrics"', output)
+        self.assertIn('Stream open time', output)
 
 
 if __name__ == '__main__':
@@ -8,7 +8,9 @@ from unittest import mock, TestCase
 
 import requests
 
+from redfish_protocol_validator import openapi
 from redfish_protocol_validator import resources
+from redfish_protocol_validator import templates
 from redfish_protocol_validator.constants import RequestType
 from redfish_protocol_validator.system_under_test import SystemUnderTest
 from unittests.utils import add_response
@@ -46,6 +48,8 @@ class Resources(TestCase):
         res = mock.Mock(spec=requests.Response)
         res.status_code = requests.codes.OK
         res.json.return_value = {}
+        res.headers = {}
+        res.iter_lines.return_value = []
         res.request = req
         service_root = mock.Mock(spec=requests.Response)
         service_root.status_code = requests.codes.OK
@@ -162,7 +166,7 @@ class Resources(TestCase):
         self.session.get.side_effect = [
             res, res, res, res, res,
             service_root, coll1, res, coll1, res,
-            coll1, manager, net_proto, coll1,
+            coll1, manager, net_proto, coll1, res,
             account_service, coll1, acct, coll1, res,
             session_service, coll1, res,
             event_service, coll1, res, coll2,
@@ -170,7 +174,160 @@ class Resources(TestCase):
         ]
         resources.read_target_resources(
             self.sut, func=resources.get_default_resources)
-        self.assertEqual(self.session.get.call_count, 27)
+        self.assertEqual(self.session.get.call_count, 28)
+        self.assertEqual(self.sut.get_certs(), {
+            np_uri + '/HTTPS/Certificates': ['/redfish/v1/Foo/1']})
+
+    def test_get_default_resources_request_errors(self):
+        root = add_response(self.sut, '/redfish/v1/', json={
+            'Systems': {'@odata.id': '/redfish/v1/Systems'},
+            'Chassis': {'@odata.id': '/redfish/v1/Chassis'}})
+        chassis = add_response(self.sut, '/redfish/v1/Chassis',
+                               json={'Members': []})
+        failed = ['/redfish/v1/odata', '/redfish/v1/Systems']
+
+        def get(url, **kwargs):
+            uri = url[len(self.sut.rhost):]
+            if uri in failed:
+                raise requests.exceptions.ConnectionError('refused')
+            if uri == '/redfish/v1/':
+                return root
+            if uri == '/redfish/v1/Chassis':
+                return chassis
+            return add_response(self.sut, uri, status_code=404)
+
+        self.session.get.side_effect = get
+        self.session.head.side_effect = requests.exceptions.Timeout('slow')
+        with self.assertLogs(level='WARNING') as cm:
+            resources.read_target_resources(
+                self.sut, func=resources.get_default_resources)
+        self.assertIn('WARNING:root:GET /redfish/v1/Systems failed with '
+                      'ConnectionError; skipping the resource', cm.output)
+        self.assertIn('WARNING:root:HEAD /redfish/v1/ failed with Timeout; '
+                      'skipping the resource', cm.output)
+        # the crawl went on past the failed requests
+        self.assertIs(self.sut.get_response('GET', '/redfish/v1/Chassis'),
+                      chassis)
+        self.assertEqual(self.sut.chassis_uri, '/redfish/v1/Chassis')
+        self.assertIsNone(
+            self.sut.get_response('GET', '/redfish/v1/Systems'))
+
+    def test_read_openapi_seeds(self):
+        self.sut.set_openapi(openapi.OpenApiIndex({
+            '/redfish/v1': ['GET'],
+            '/redfish/v1/SessionService/Sessions': ['GET', 'POST'],
+            '/redfish/v1/UpdateService': ['GET', 'PATCH'],
+            '/redfish/v1/TaskService': ['GET'],
+            '/redfish/v1/EventService/SSE': ['GET'],
+            '/redfish/v1/Systems/{ComputerSystemId}': ['GET'],
+            '/redfish/v1/Systems/Actions/Reset': ['POST']}))
+        self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
+        responses = {}
+
+        def get(url, **kwargs):
+            uri = url[len(self.sut.rhost):]
+            status = (requests.codes.OK if uri.endswith('/UpdateService')
+                      else requests.codes.NOT_FOUND)
+            responses[uri] = mock.Mock(status_code=status,
+                                       ok=status == requests.codes.OK)
+            return responses[uri]
+
+        self.session.get.side_effect = get
+        seeds = list(resources.read_openapi_seeds(self.sut))
+        # read URIs, the SSE stream and templated paths are not read
+        self.assertEqual(
+            sorted(c[0][0] for c in self.session.get.call_args_list),
+            [self.sut.rhost + '/redfish/v1/TaskService',
+             self.sut.rhost + '/redfish/v1/UpdateService'])
+        self.assertEqual(seeds, [{
+            'uri': '/redfish/v1/UpdateService',
+            'response': responses['/redfish/v1/UpdateService']}])
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[openapi.OPENAPI_CATEGORY]}
+        self.assertEqual(metrics['Seed URIs read'], '1 of 2')
+
+    def test_read_collection_request_error(self):
+        uri = '/redfish/v1/Managers'
+        self.session.get.side_effect = requests.exceptions.ConnectionError
+        with self.assertLogs(level='WARNING'):
+            r, members = resources.read_collection(self.sut, uri)
+        self.assertIsNone(r)
+        self.assertEqual(list(members), [])
+
+    def test_read_collection_expanded(self):
+        self.sut.set_supported_query_params(
+            {'ExpandQuery': {'Levels': True, 'NoLinks': True}})
+        uri = '/redfish/v1/AccountService/Roles'
+        coll = add_response(self.sut, uri, json={
+            'Members': [
+                {'@odata.id': uri + '/Admin'},
+                {'@odata.id': uri + '/Operator'}
+            ]
+        }, headers={'ETag': '"coll"'})
+        expanded_coll = add_response(self.sut, uri, json={
+            'Members': [
+                {'@odata.id': uri + '/Admin', 'RoleId': 'Admin'},
+                {'@odata.id': uri + '/Operator'}
+            ]
+        }, headers={'ETag': '"coll"', 'OData-Version': '4.0'})
+        member = add_response(self.sut, uri + '/Operator',
+                              json={'RoleId': 'Operator'})
+        self.session.get.side_effect = [coll, expanded_coll, member]
+        r, members = resources.read_collection(self.sut, uri)
+        # the plain GET is the collection's response
+        self.assertIs(r, coll)
+        self.assertEqual(self.session.get.call_args_list, [
+            mock.call(self.sut.rhost + uri),
+            mock.call(self.sut.rhost + uri + '?$expand=.($levels=1)')])
+        members = list(members)
+        self.assertEqual([m[0] for m in members],
+                         [uri + '/Admin', uri + '/Operator'])
+        expanded = members[0][1]
+        self.assertTrue(expanded.expanded)
+        self.assertEqual(expanded.json(), {'@odata.id': uri + '/Admin',
+                                           'RoleId': 'Admin'})
+        self.assertEqual(expanded.request.method, 'GET')
+        self.assertEqual(expanded.headers.get('OData-Version'), '4.0')
+        self.assertIsNone(expanded.headers.get('ETag'))
+        # the unexpanded member was read with its own GET
+        self.assertIs(members[1][1], member)
+        self.assertEqual(self.session.get.call_count, 3)
+
+    def test_read_collection_expand_fails(self):
+        self.sut.set_supported_query_params(
+            {'ExpandQuery': {'Levels': True, 'NoLinks': True}})
+        uri = '/redfish/v1/Managers'
+        bad = add_response(self.sut, uri,
+                           status_code=requests.codes.BAD_REQUEST)
+        coll = add_response(self.sut, uri, json={
+            'Members': [{'@odata.id': uri + '/1'}]})
+        member = add_response(self.sut, uri + '/1', json={})
+        self.session.get.side_effect = [coll, bad, member]
+        r, members = resources.read_collection(self.sut, uri)
+        self.assertIs(r, coll)
+        self.assertEqual(list(members), [(uri + '/1', member)])
+        self.assertEqual(self.session.get.call_count, 3)
+
+    def test_read_collection_expand_not_supported(self):
+        self.sut.set_supported_query_params(
+            {'ExpandQuery': {'Levels': True, 'NoLinks': False}})
+        uri = '/redfish/v1/Managers'
+        coll = add_response(self.sut, uri, json={'Members': []})
+        self.session.get.return_value = coll
+        r, members = resources.read_collection(self.sut, uri)
+        self.assertEqual(list(members), [])
+        self.session.get.assert_called_once_with(self.sut.rhost + uri)
+
+    def test_get_resource_incremental(self):
+        snapshot = mock.Mock()
+        snapshot.incremental = False
+        self.sut.set_snapshot(snapshot)
+        resources.get_resource(self.sut, '/redfish/v1/Managers')
+        self.session.get.assert_called_once_with(
+            self.sut.rhost + '/redfish/v1/Managers')
+        snapshot.incremental = True
+        resources.get_resource(self.sut, '/redfish/v1/Managers')
+        snapshot.get.assert_called_once_with(self.sut, '/redfish/v1/Managers')
 
     def test_get_all_resources(self):
         with self.assertRaises(NotImplementedError):
@@ -376,20 +533,117 @@ class Resources(TestCase):
         self.session.request.called_once_with(
             'DELETE', self.sut.rhost + '/redfish/v1/')
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.get')
+    def test_allowed_method_requests(self):
+        chassis = '/redfish/v1/Chassis/1'
+        add_response(self.sut, chassis, 'GET', requests.codes.OK)
+        add_response(self.sut, chassis + '?$select=Id', 'GET',
+                     requests.codes.OK)
+        add_response(self.sut, '/redfish/v1/Chassis/2', 'GET',
+                     requests.codes.NOT_FOUND)
+        allow = {
+            '/redfish/v1/': 'GET, HEAD',
+            self.sut.sessions_uri: 'GET, HEAD, POST',
+            chassis: 'GET, HEAD, PATCH'
+        }
+        self.sut.set_openapi(openapi.OpenApiIndex({
+            '/redfish/v1': ['GET'],
+            '/redfish/v1/Chassis/{ChassisId}': ['GET']}))
+
+        def request(method, url, **kwargs):
+            uri = url[len(self.sut.rhost):]
+            if method in ['HEAD', 'GET']:
+                self.assertEqual(kwargs, {'allow_redirects': False})
+                return add_response(self.sut, uri, method, requests.codes.OK,
+                                    headers={'Allow': allow[uri]})
+            self.assertEqual(kwargs, {'json': {},
+                                      'allow_redirects': False})
+            return add_response(self.sut, uri, method,
+                                requests.codes.METHOD_NOT_ALLOWED)
+        self.session.request.side_effect = request
+        self.sut.set_probe_writes(True)
+        resources.allowed_method_requests(self.sut)
+        calls = {c[0][:2] for c in self.session.request.call_args_list}
+        self.assertEqual(calls, {
+            ('HEAD', self.sut.rhost + '/redfish/v1/'),
+            ('HEAD', self.sut.rhost + self.sut.sessions_uri),
+            ('HEAD', self.sut.rhost + chassis),
+            ('GET', self.sut.rhost + '/redfish/v1/'),
+            ('GET', self.sut.rhost + self.sut.sessions_uri),
+            ('GET', self.sut.rhost + chassis),
+            ('PATCH', self.sut.rhost + '/redfish/v1/'),
+            ('POST', self.sut.rhost + '/redfish/v1/'),
+            ('PATCH', self.sut.rhost + self.sut.sessions_uri),
+            ('POST', self.sut.rhost + chassis)})
+        responses = self.sut.get_responses_by_method(
+            'POST', request_type=RequestType.METHOD_PROBE)
+        self.assertEqual(set(responses), {'/redfish/v1/', chassis})
+        responses = self.sut.get_responses_by_method(
+            'GET', request_type=RequestType.METHOD_PROBE)
+        self.assertEqual(set(responses), {'/redfish/v1/',
+                                          self.sut.sessions_uri, chassis})
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[resources.PROBE_CATEGORY]}
+        self.assertEqual(metrics['Resources probed'], '3 of 3')
+        self.assertEqual(metrics['Omitted methods probed'], 4)
+        self.assertEqual(
+            metrics['Allow headers differing from OpenAPI write methods'],
+            '1 of 2')
+
+    def test_allowed_method_requests_no_writes(self):
+        self.session.request.return_value = add_response(
+            self.sut, '/redfish/v1/', 'HEAD', requests.codes.OK,
+            headers={'Allow': 'GET, HEAD'})
+        resources.allowed_method_requests(self.sut)
+        methods = {c[0][0] for c in self.session.request.call_args_list}
+        # the write probes are opt-in
+        self.assertEqual(methods, {'HEAD', 'GET'})
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[resources.PROBE_CATEGORY]}
+        self.assertEqual(metrics['Omitted methods probed'], 0)
+
+    def test_allowed_method_requests_budget(self):
+        for i in range(10):
+            add_response(self.sut, '/redfish/v1/Chassis/%s' % i, 'GET',
+                         requests.codes.OK)
+        self.sut.set_probe_budget(4)
+        self.session.request.side_effect = requests.ConnectionError
+        resources.allowed_method_requests(self.sut)
+        # a HEAD and a GET for each resource in the budget
+        self.assertEqual(self.session.request.call_count, 8)
+        self.assertEqual(self.sut.get_responses_by_method(
+            'HEAD', request_type=RequestType.METHOD_PROBE), {})
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[resources.PROBE_CATEGORY]}
+        self.assertEqual(metrics['Resources probed'], '4 of 12')
+
+    @mock.patch('redfish_protocol_validator.system_under_test.'
+                'SystemUnderTest.deadline_passed',
+                new_callable=mock.PropertyMock)
+    def test_allowed_method_requests_deadline(self, mock_deadline):
+        # the budget runs out after the first HEAD probe
+        mock_deadline.side_effect = [False] + [True] * 8
+        self.session.request.return_value = add_response(
+            self.sut, '/redfish/v1/', 'HEAD', requests.codes.OK,
+            headers={'Allow': 'GET, HEAD'})
+        with self.assertLogs(level='WARNING') as cm:
+            resources.allowed_method_requests(self.sut, max_workers=1)
+        self.assertEqual(self.session.request.call_count, 1)
+        self.assertIn('WARNING:root:Run time budget exhausted; allowed '
+                      'method probes stopped early', cm.output)
+
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
     def test_basic_auth_requests(self, mock_get):
         headers = {'OData-Version': '4.0'}
         mock_get.return_value.status_code = requests.codes.OK
         resources.basic_auth_requests(self.sut)
         mock_get.assert_any_call(self.sut.rhost + self.sut.sessions_uri,
                                  headers=headers, auth=(self.sut.username,
-                                                        self.sut.password),
-                                 verify=self.sut.verify)
+                                                        self.sut.password))
         responses = self.sut.get_responses_by_method(
             'GET', request_type=RequestType.BASIC_AUTH)
         self.assertEqual(len(responses), 2)
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
     def test_http_requests_https_scheme(self, mock_get):
         headers = {'OData-Version': '4.0'}
         if self.sut.scheme == 'https':
@@ -405,8 +659,7 @@ class Resources(TestCase):
         resources.http_requests(self.sut)
         mock_get.assert_any_call(http_rhost + self.sut.sessions_uri,
                                  headers=headers, auth=(self.sut.username,
-                                                        self.sut.password),
-                                 verify=self.sut.verify)
+                                                        self.sut.password))
         responses = self.sut.get_responses_by_method(
             'GET', request_type=RequestType.HTTP_BASIC_AUTH)
         self.assertEqual(len(responses), 1)
@@ -415,10 +668,9 @@ class Resources(TestCase):
         self.assertEqual(len(responses), 2)
 
     @mock.patch('redfish_protocol_validator.resources.logging.warning')
-    @mock.patch('redfish_protocol_validator.resources.requests.get')
-    def test_http_requests_https_scheme_exception(self, mock_get, mock_warn):
-        mock_get.side_effect = ConnectionError
+    def test_http_requests_https_scheme_exception(self, mock_warn):
         mock_sut = mock.MagicMock(spec=SystemUnderTest)
+        mock_sut.transport.get.side_effect = ConnectionError
         mock_sut.scheme = 'https'
         mock_sut.avoid_http_redirect = False
         resources.http_requests(mock_sut)
@@ -426,7 +678,7 @@ class Resources(TestCase):
         self.assertIn('Caught ConnectionError while trying to trigger',
                       args[0])
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
     def test_http_requests_http_scheme(self, mock_get):
         sut = SystemUnderTest('http://127.0.0.1:8000', 'oper', 'xyzzy')
         sut.set_sessions_uri('/redfish/v1/SessionService/Sessions')
@@ -453,7 +705,7 @@ class Resources(TestCase):
         args = mock_warning.call_args[0]
         self.assertIn('Unexpected scheme (ftp)', args[0])
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
     def test_bad_auth_requests(self, mock_get):
         request = mock.Mock(spec=requests.Request)
         request.method = 'GET'
@@ -463,6 +715,8 @@ class Resources(TestCase):
         mock_get.return_value = response
         resources.bad_auth_requests(self.sut)
         self.assertEqual(mock_get.call_count, 2)
+        for call in mock_get.call_args_list:
+            self.assertTrue(call[1]['auth_failure'])
         responses = self.sut.get_responses_by_method(
             'GET', request_type=RequestType.BAD_AUTH)
         self.assertEqual(len(responses), 2)
@@ -472,6 +726,87 @@ class Resources(TestCase):
         session.get.return_value.status_code = requests.codes.OK
         resources.read_uris_no_auth(self.sut, session)
         self.assertEqual(session.get.call_count, 2)
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[resources.NO_AUTH_CATEGORY]}
+        self.assertEqual(metrics['URIs read without authentication'],
+                         '2 of 2')
+        self.assertNotIn('Resource groups covered', metrics)
+
+    @mock.patch('redfish_protocol_validator.system_under_test.'
+                'SystemUnderTest.deadline_passed',
+                new_callable=mock.PropertyMock)
+    def test_read_uris_no_auth_deadline(self, mock_deadline):
+        mock_deadline.return_value = True
+        session = mock.Mock(spec=requests.Session)
+        with self.assertLogs(level='WARNING'):
+            resources.read_uris_no_auth(self.sut, session)
+        session.get.assert_not_called()
+
+    @mock.patch('redfish_protocol_validator.system_under_test.'
+                'SystemUnderTest.deadline_passed',
+                new_callable=mock.PropertyMock)
+    def test_read_target_resources_deadline(self, mock_deadline):
+        mock_deadline.side_effect = [False, True]
+        resources.read_target_resources(
+            self.sut, func=lambda sut, uri, uris: iter([
+                {'uri': '/redfish/v1/Chassis', 'response': mock.Mock(
+                    request=mock.Mock(method='GET'))},
+                {'uri': '/redfish/v1/Systems', 'response': mock.Mock(
+                    request=mock.Mock(method='GET'))}]))
+        self.assertIsNotNone(
+            self.sut.get_response('GET', '/redfish/v1/Chassis'))
+        self.assertIsNone(self.sut.get_response('GET', '/redfish/v1/Systems'))
+
+    def test_read_uris_no_auth_budget(self):
+        for i in range(10):
+            add_response(self.sut, '/redfish/v1/Chassis/%s' % i, 'GET',
+                         requests.codes.OK)
+        self.sut.set_no_auth_budget(3)
+        session = mock.Mock(spec=requests.Session)
+        session.get.side_effect = requests.ConnectionError
+        resources.read_uris_no_auth(self.sut, session)
+        # the public and named URIs are read besides the budget
+        urls = {c[0][0] for c in session.get.call_args_list}
+        self.assertEqual(len(urls), 5)
+        self.assertIn(self.sut.rhost + '/redfish/v1/', urls)
+        self.assertIn(self.sut.rhost + self.sut.sessions_uri, urls)
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[resources.NO_AUTH_CATEGORY]}
+        self.assertEqual(metrics['URIs read without authentication'],
+                         '5 of 12')
+
+    def test_read_uris_no_auth_sample(self):
+        for i in range(3):
+            add_response(self.sut, '/redfish/v1/Chassis/%s' % i, 'GET',
+                         requests.codes.OK,
+                         json={'@odata.type': '#Chassis.v1_0_0.Chassis'})
+            add_response(self.sut, '/redfish/v1/Systems/%s' % i, 'GET',
+                         requests.codes.OK, json={
+                             '@odata.type': '#ComputerSystem.v1_%s_0.'
+                                            'ComputerSystem' % i})
+            add_response(self.sut, '/redfish/v1/Managers/%s' % i, 'GET',
+                         requests.codes.OK, json={})
+        self.sut.set_openapi(openapi.OpenApiIndex({
+            '/redfish/v1/Systems/{ComputerSystemId}': ['GET']}))
+        templates.build_index(self.sut)
+        self.sut.set_sample_mode(templates.SAMPLE_TEMPLATE)
+        session = mock.Mock(spec=requests.Session)
+        session.get.return_value.status_code = requests.codes.UNAUTHORIZED
+        session.get.return_value.request.method = 'GET'
+        resources.read_uris_no_auth(self.sut, session)
+        responses = self.sut.get_responses_by_method(
+            'GET', request_type=RequestType.NO_AUTH)
+        # one URI per template and type; the Managers have no type
+        self.assertEqual(set(responses), {
+            '/redfish/v1/', self.sut.sessions_uri, '/redfish/v1/Chassis/0',
+            '/redfish/v1/Systems/0', '/redfish/v1/Systems/1',
+            '/redfish/v1/Systems/2', '/redfish/v1/Managers/0',
+            '/redfish/v1/Managers/1', '/redfish/v1/Managers/2'})
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[resources.NO_AUTH_CATEGORY]}
+        self.assertEqual(metrics['URIs read without authentication'],
+                         '9 of 11')
+        self.assertEqual(metrics['Resource groups covered'], '9 of 9')
 
 
 if __name__ == '__main__':
@@ -9,6 +9,7 @@ from unittest import mock, TestCase
 import requests
 from requests.exceptions import SSLError
 
+from redfish_protocol_validator import certificates
 from redfish_protocol_validator import security_details as sec
 from redfish_protocol_validator.constants import Assertion, Result, RequestType, ResourceType
 from redfish_protocol_validator.system_under_test import SystemUnderTest
@@ -24,10 +25,12 @@ class SecurityDetails(TestCase):
         self.account_uri = '/redfish/v1/AccountsService/Accounts/3'
         self.mock_session = mock.MagicMock(spec=requests.Session)
         self.sut._set_session(self.mock_session)
-        patch_post = mock.patch('redfish_protocol_validator.security_details.requests.post')
+        patch_post = mock.patch(
+            'redfish_protocol_validator.transport.Transport.post')
         self.mock_post = patch_post.start()
         self.addCleanup(patch_post.stop)
-        patch_get = mock.patch('redfish_protocol_validator.security_details.requests.get')
+        patch_get = mock.patch(
+            'redfish_protocol_validator.transport.Transport.get')
         self.mock_get = patch_get.start()
         self.addCleanup(patch_get.stop)
         patch_ssl_ctx = mock.patch(
@@ -38,7 +41,10 @@ class SecurityDetails(TestCase):
             'redfish_protocol_validator.security_details.ssl.SSLSocket')
         self.mock_ssl_sock = patch_ssl_sock.start()
         self.addCleanup(patch_ssl_sock.stop)
-        patch_decoder = mock.patch('redfish_protocol_validator.security_details.decoder')
+        (self.mock_ssl_ctx.return_value.wrap_socket.return_value
+         .getpeercert.return_value) = b'leaf'
+        patch_decoder = mock.patch(
+            'redfish_protocol_validator.certificates.decoder')
         self.mock_decoder = patch_decoder.start()
         self.addCleanup(patch_decoder.stop)
         add_response(self.sut, self.sut.sessions_uri, 'GET', requests.codes.OK)
@@ -350,6 +356,7 @@ class SecurityDetails(TestCase):
             }
         ]
         mock_conn = mock.Mock()
+        mock_conn.getpeercert.return_value = b'leaf'
         self.mock_ssl_ctx.return_value.wrap_socket.return_value = mock_conn
         sec.test_certs_conform_to_x509v3(self.sut)
         result = get_result(self.sut, Assertion.SEC_CERTS_CONFORM_X509V3,
@@ -374,6 +381,24 @@ class SecurityDetails(TestCase):
         self.assertEqual(Result.FAIL, result['result'])
         self.assertIn('the version retrieved is v2', result['msg'])
 
+    def test_test_certs_conform_to_x509v3_chain(self):
+        self.mock_decoder.decode.side_effect = [
+            [{'tbsCertificate': {'version': 'v3'}}],
+            [{'tbsCertificate': {'version': 'v1'}}]
+        ]
+        self.sut.set_server_cert_chain([b'leaf', b'root'])
+        sec.test_certs_conform_to_x509v3(self.sut)
+        result = get_result(self.sut, Assertion.SEC_CERTS_CONFORM_X509V3,
+                            '', '')
+        self.assertIsNotNone(result)
+        # only the leaf certificate is asserted on; the chain is reported
+        self.assertEqual(Result.PASS, result['result'])
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[certificates.CERT_CATEGORY]}
+        self.assertEqual(metrics['Presented chain X.509 versions'], 'v3, v1')
+        # the cached chain is used; no new handshake is made
+        self.mock_ssl_ctx.return_value.wrap_socket.assert_not_called()
+
     def test_test_certs_conform_to_x509v3_not_tested(self):
         sut = SystemUnderTest('http://127.0.0.1:8000', 'oper', 'xyzzy')
         sec.test_certs_conform_to_x509v3(sut)
@@ -647,7 +672,7 @@ class SecurityDetails(TestCase):
         self.assertIn('Unexpected scheme (ftp)',
                       result['msg'])
 
-    @mock.patch('redfish_protocol_validator.resources.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_session_create_https_only_exception(self, mock_post):
         sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy')
         sut.set_sessions_uri('/redfish/v1/SessionService/Sessions')
@@ -669,7 +694,7 @@ class SecurityDetails(TestCase):
         self.assertEqual(Result.NOT_TESTED, result['result'])
         self.assertIn('No ServerSentEventUri available', result['msg'])
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_session_termination_side_effects_not_tested2(
             self, mock_post):
         self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
@@ -689,7 +714,7 @@ class SecurityDetails(TestCase):
         self.assertIn('Failed to create session', result['msg'])
 
     @mock.patch('redfish_protocol_validator.sessions.create_session')
-    @mock.patch('redfish_protocol_validator.security_details.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_test_session_termination_side_effects_not_tested3(
             self, mock_session, mock_create_session):
         self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
@@ -711,7 +736,7 @@ class SecurityDetails(TestCase):
                       self.sut.server_sent_event_uri, result['msg'])
 
     @mock.patch('redfish_protocol_validator.sessions.create_session')
-    @mock.patch('redfish_protocol_validator.security_details.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_test_session_termination_side_effects_not_tested4(
             self, mock_session, mock_create_session):
         self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
@@ -736,7 +761,7 @@ class SecurityDetails(TestCase):
         self.assertIn('Deleting session %s failed' % sess_uri, result['msg'])
 
     @mock.patch('redfish_protocol_validator.sessions.create_session')
-    @mock.patch('redfish_protocol_validator.security_details.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_test_session_termination_side_effects_exception(
             self, mock_session, mock_create_session):
         self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
@@ -754,7 +779,7 @@ class SecurityDetails(TestCase):
                       result['msg'])
 
     @mock.patch('redfish_protocol_validator.sessions.create_session')
-    @mock.patch('redfish_protocol_validator.security_details.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_test_session_termination_side_effects_fail1(
             self, mock_session, mock_create_session):
         self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
@@ -782,7 +807,7 @@ class SecurityDetails(TestCase):
                       self.sut.server_sent_event_uri, result['msg'])
 
     @mock.patch('redfish_protocol_validator.sessions.create_session')
-    @mock.patch('redfish_protocol_validator.security_details.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_test_session_termination_side_effects_fail2(
             self, mock_session, mock_create_session):
         self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
@@ -809,7 +834,7 @@ class SecurityDetails(TestCase):
                       % self.sut.server_sent_event_uri, result['msg'])
 
     @mock.patch('redfish_protocol_validator.sessions.create_session')
-    @mock.patch('redfish_protocol_validator.security_details.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_test_session_termination_side_effects_pass(
             self, mock_session, mock_create_session):
         self.sut.set_server_sent_event_uri('/redfish/v1/EventService/SSE')
@@ -3,16 +3,19 @@
 # License: BSD 3-Clause License. For full text see link:
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
+import threading
+import time
 import unittest
 from unittest import mock, TestCase
 
 import requests
 
 from redfish_protocol_validator import service_details as service
+from redfish_protocol_validator import utils
 from redfish_protocol_validator.constants import Assertion, RequestType, Result, SSDP_ALL
 from redfish_protocol_validator.constants import SSDP_REDFISH
 from redfish_protocol_validator.system_under_test import SystemUnderTest
-from unittests.utils import add_response, get_result
+from unittests.utils import add_response, FakeClock, get_result
 
 
 class ServiceDetails(TestCase):
@@ -186,6 +189,39 @@ class ServiceDetails(TestCase):
         service.pre_ssdp(self.sut)
         self.assertEqual(True, self.sut.ssdp_enabled)
 
+    @mock.patch('redfish_protocol_validator.service_details.utils.'
+                'discover_ssdp')
+    def test_pre_ssdp_select(self, mock_discover_ssdp):
+        uri = '/redfish/v1/Managers/BMC/NetworkProtocol'
+        self.sut.set_mgr_net_proto_uri(uri)
+        self.sut.set_supported_query_params({'SelectQuery': True})
+        self.mock_session.get.return_value.ok = True
+        self.mock_session.get.return_value.status_code = requests.codes.OK
+        self.mock_session.get.return_value.json.return_value = {
+            'SSDP': {'ProtocolEnabled': False}
+        }
+        service.pre_ssdp(self.sut)
+        self.assertEqual(False, self.sut.ssdp_enabled)
+        self.mock_session.get.assert_called_once_with(
+            self.sut.rhost + uri + '?$select=SSDP')
+        # the narrowed response is not stored as the resource's response
+        self.assertIsNone(self.sut.get_response('GET', uri))
+
+    @mock.patch('redfish_protocol_validator.service_details.utils.'
+                'discover_ssdp')
+    def test_pre_ssdp_cache(self, mock_discover_ssdp):
+        services = {
+            self.uuid: {'USN': 'uuid:%s' % self.uuid}
+        }
+        mock_cache = mock.Mock(spec=utils.SSDPCache)
+        mock_cache.get_services.return_value = services
+        self.sut.set_ssdp_cache(mock_cache)
+        service.pre_ssdp(self.sut)
+        mock_discover_ssdp.assert_not_called()
+        self.assertEqual(mock_cache.get_services.call_count, 2)
+        self.assertEqual(services,
+                         self.sut.get_ssdp_services(SSDP_REDFISH))
+
     def test_test_ssdp_can_be_disabled_not_tested1(self):
         service.test_ssdp_can_be_disabled(self.sut)
         result = get_result(self.sut, Assertion.SERV_SSDP_CAN_BE_DISABLED,
@@ -1081,19 +1117,22 @@ class ServiceDetails(TestCase):
         self.assertIn('No ServerSentEvent events read',
                       result['msg'])
 
-    @mock.patch('redfish_protocol_validator.utils.time.time')
-    def test_test_sse_blank_lines_between_events_timeout(self, mock_time):
-        sse_response = [
-            b': stream keep-alive\n\n',
-            b': stream keep-alive\n\n',
-            b': stream keep-alive\n\n',
-            b': stream keep-alive\n\n',
-            b': stream keep-alive\n\n',
-            b'id:210\ndata:{"id": "210"}\n\n'
-        ]
-        # mock 7 seconds elapsed
-        mock_time.side_effect = [1000, 1000, 1007, 1007]
-        events = service.read_sse_events(sse_response)
+    def test_test_sse_blank_lines_between_events_timeout(self):
+        stream_closed = threading.Event()
+
+        def quiet_stream():
+            yield b': stream keep-alive\n\n'
+            # stream goes quiet past the deadline until closed by the reader
+            stream_closed.wait(5)
+            yield b'id:210\ndata:{"id": "210"}\n\n'
+
+        sse_response = mock.MagicMock(spec=requests.Response)
+        sse_response.__iter__.side_effect = quiet_stream
+        sse_response.close.side_effect = stream_closed.set
+        start = time.monotonic()
+        events = service.read_sse_events(sse_response, timeout=0.2)
+        self.assertLess(time.monotonic() - start, 2)
+        sse_response.close.assert_called_once_with()
         service.test_sse_blank_lines_between_events(self.sut, events)
         result = get_result(
             self.sut, Assertion.SERV_SSE_BLANK_LINES_BETWEEN_EVENTS,
@@ -1103,6 +1142,45 @@ class ServiceDetails(TestCase):
         self.assertIn('No ServerSentEvent events read',
                       result['msg'])
 
+    def test_sse_reader_window_starts_at_wait(self):
+        stream_closed = threading.Event()
+        released = threading.Event()
+
+        def quiet_stream():
+            yield b'id:210\ndata:{"id": "210"}\n\n'
+            released.wait(5)
+            yield b'id:211\ndata:{"id": "211"}\n\n'
+            stream_closed.wait(5)
+
+        sse_response = mock.MagicMock(spec=requests.Response)
+        sse_response.__iter__.side_effect = quiet_stream
+        sse_response.close.side_effect = stream_closed.set
+        reader = utils.SSEReader(sse_response, timeout=0.5).start()
+        # other tests run for longer than the read window
+        time.sleep(0.6)
+        threading.Timer(0.1, released.set).start()
+        events = reader.wait()
+        self.assertEqual(['210', '211'], [e.id for e in events])
+        # the reader is stopped and joined before the caller uses the stream
+        sse_response.close.assert_called_once_with()
+        self.assertFalse(reader._thread.is_alive())
+        self.assertFalse(reader.ended)
+
+    def test_sse_reader_ended(self):
+        sse_response = [b'id:210\ndata:{"id": "210"}\n\n']
+        reader = utils.SSEReader(sse_response, timeout=1)
+        self.assertEqual(['210'], [e.id for e in reader.wait()])
+        self.assertTrue(reader.ended)
+
+    def test_read_sse_events_max_events(self):
+        sse_response = [
+            b'id:210\ndata:{"id": "210"}\n\n',
+            b'id:211\ndata:{"id": "211"}\n\n',
+            b'id:212\ndata:{"id": "212"}\n\n'
+        ]
+        events = service.read_sse_events(sse_response, max_events=2)
+        self.assertEqual(['210', '211'], [e.id for e in events])
+
     def test_test_sse_blank_lines_between_events_fail(self):
         sse_response = [
             b': stream keep-alive\n\n',
@@ -1160,6 +1238,18 @@ class ServiceDetails(TestCase):
         self.assertIn('SSE stream, connection appears to still be open',
                       result['msg'])
 
+    def test_test_sse_connection_open_until_closed_ended(self):
+        sse_response = mock.MagicMock(spec=requests.Response)
+        service.test_sse_connection_open_until_closed(self.sut, sse_response,
+                                                      ended=True)
+        result = get_result(
+            self.sut, Assertion.SERV_SSE_CONNECTION_OPEN_UNTIL_CLOSED,
+            '', '')
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.FAIL, result['result'])
+        self.assertIn('closed the SSE stream before the client',
+                      result['msg'])
+
     def test_test_sse_connection_open_until_closed_pass(self):
         sse_response = mock.MagicMock(spec=requests.Response)
         sse_response.__iter__.return_value = []
@@ -1191,9 +1281,10 @@ class ServiceDetails(TestCase):
         self.assertIn('No EventDestination URI found',
                       result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_details.time.sleep')
+    @mock.patch('redfish_protocol_validator.utils.time',
+                new_callable=FakeClock)
     def test_test_sse_event_dest_deleted_on_close_not_tested3(
-            self, mock_sleep):
+            self, mock_time):
         response = mock.Mock()
         uri = self.subscriptions_uri + '/1'
         self.sut.set_event_dest_uri(uri)
@@ -1209,9 +1300,10 @@ class ServiceDetails(TestCase):
         self.assertIn('Unexpected status on GET to EventDestination resource',
                       result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_details.time.sleep')
+    @mock.patch('redfish_protocol_validator.utils.time',
+                new_callable=FakeClock)
     def test_test_sse_event_dest_deleted_on_close_fail(
-            self, mock_sleep):
+            self, mock_time):
         response = mock.Mock()
         uri = self.subscriptions_uri + '/1'
         self.sut.set_event_dest_uri(uri)
@@ -1227,9 +1319,10 @@ class ServiceDetails(TestCase):
         self.assertIn('EventDestination resource not deleted',
                       result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_details.time.sleep')
+    @mock.patch('redfish_protocol_validator.utils.time',
+                new_callable=FakeClock)
     def test_test_sse_event_dest_deleted_on_close_pass(
-            self, mock_sleep):
+            self, mock_time):
         response = mock.Mock()
         uri = self.subscriptions_uri + '/1'
         self.sut.set_event_dest_uri(uri)
@@ -1432,20 +1525,26 @@ class ServiceDetails(TestCase):
         self.assertIn('Delete of EventDestination resource %s failed' %
                       event_dest, result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_details.time.sleep')
-    def test_test_sse_close_connection_if_event_dest_deleted_fail2(
-            self, mock_sleep):
+    def test_test_sse_close_connection_if_event_dest_deleted_fail2(self):
         event_dest = '/redfish/v1/EventService/Subscriptions/1'
         del_resp = add_response(self.sut, event_dest, 'DELETE',
                                 status_code=requests.codes.OK)
         self.mock_session.delete.return_value = del_resp
+        stream_closed = threading.Event()
+
+        def open_stream():
+            # keep-alives until the client closes the stream
+            while not stream_closed.wait(0.05):
+                yield b': stream keep-alive\n\n'
+
         sse_response = mock.MagicMock(spec=requests.Response)
-        sse_response.__iter__.return_value = [
-            b': stream keep-alive\n\n',
-            b': stream keep-alive\n\n'
-        ]
+        sse_response.__iter__.side_effect = open_stream
+        sse_response.close.side_effect = stream_closed.set
+        start = time.monotonic()
         service.test_sse_close_connection_if_event_dest_deleted(
-            self.sut, sse_response, event_dest)
+            self.sut, sse_response, event_dest, timeout=0.3)
+        self.assertLess(time.monotonic() - start, 2)
+        sse_response.close.assert_called_once_with()
         result = get_result(
             self.sut,
             Assertion.SERV_SSE_CLOSE_CONNECTION_IF_EVENT_DEST_DELETED,
@@ -1455,9 +1554,33 @@ class ServiceDetails(TestCase):
         self.assertIn('resource, the connection appears to still be open',
                       result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_details.time.sleep')
-    def test_test_sse_close_connection_if_event_dest_deleted_pass(
-            self, mock_sleep):
+    def test_test_sse_close_connection_if_event_dest_deleted_quiet(self):
+        event_dest = '/redfish/v1/EventService/Subscriptions/1'
+        del_resp = add_response(self.sut, event_dest, 'DELETE',
+                                status_code=requests.codes.OK)
+        self.mock_session.delete.return_value = del_resp
+        stream_closed = threading.Event()
+
+        def quiet_stream():
+            # no data at all until the client closes the stream
+            stream_closed.wait(5)
+            return
+            yield
+
+        sse_response = mock.MagicMock(spec=requests.Response)
+        sse_response.__iter__.side_effect = quiet_stream
+        sse_response.close.side_effect = stream_closed.set
+        start = time.monotonic()
+        service.test_sse_close_connection_if_event_dest_deleted(
+            self.sut, sse_response, event_dest, timeout=0.3)
+        self.assertLess(time.monotonic() - start, 2)
+        result = get_result(
+            self.sut,
+            Assertion.SERV_SSE_CLOSE_CONNECTION_IF_EVENT_DEST_DELETED,
+            'DELETE', event_dest)
+        self.assertEqual(Result.FAIL, result['result'])
+
+    def test_test_sse_close_connection_if_event_dest_deleted_pass(self):
         event_dest = '/redfish/v1/EventService/Subscriptions/1'
         del_resp = add_response(self.sut, event_dest, 'DELETE',
                                 status_code=requests.codes.OK)
@@ -4,6 +4,7 @@
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
 import unittest
+from datetime import timedelta
 from unittest import mock, TestCase
 
 import requests
@@ -538,13 +539,69 @@ class ServiceRequests(TestCase):
                      status_code=requests.codes.OK,
                      json={'Members@odata.count': 4, 'Members': [{}, {}, {}],
                            'Members@odata.nextLink': '/foo/bar'})
+        # a session was deleted since the crawl
+        page1 = add_response(self.sut, uri, method='GET',
+                             status_code=requests.codes.OK,
+                             json={'Members@odata.count': 3,
+                                   'Members': [{}, {}],
+                                   'Members@odata.nextLink': '/foo/bar'})
+        page2 = add_response(self.sut, '/foo/bar', method='GET',
+                             status_code=requests.codes.OK,
+                             json={'Members': [{}]})
+        self.mock_session.get.side_effect = [page1, page2]
         req.test_get_collection_count_prop_total(self.sut)
+        self.assertEqual(self.mock_session.get.call_args_list, [
+            mock.call(self.sut.rhost + uri),
+            mock.call(self.sut.rhost + '/foo/bar')])
         result = get_result(
             self.sut, Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL,
             'GET', uri)
         self.assertIsNotNone(result)
         self.assertEqual(Result.PASS, result['result'])
 
+    def test_test_get_collection_count_prop_total_fail5(self):
+        uri = self.sut.sessions_uri
+        page1 = add_response(self.sut, uri, method='GET',
+                             status_code=requests.codes.OK,
+                             json={'Members@odata.count': 6,
+                                   'Members': [{}, {}],
+                                   'Members@odata.nextLink': uri + '?$skip=2'})
+        page2 = add_response(self.sut, uri + '?$skip=2', method='GET',
+                             status_code=requests.codes.OK,
+                             json={'Members': [{}, {}],
+                                   'Members@odata.nextLink': uri + '?$skip=4'})
+        page3 = add_response(self.sut, uri + '?$skip=4', method='GET',
+                             status_code=requests.codes.OK,
+                             json={'Members': [{}]})
+        self.mock_session.get.side_effect = [page1, page2, page3]
+        req.test_get_collection_count_prop_total(self.sut)
+        result = get_result(
+            self.sut, Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL,
+            'GET', uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.FAIL, result['result'])
+        self.assertIn('The count property (6) of collection resource %s was '
+                      'not equal to the number of members (5) found in its 3 '
+                      'pages' % uri, result['msg'])
+
+    def test_test_get_collection_count_prop_total_page_error(self):
+        uri = self.sut.sessions_uri
+        page1 = add_response(self.sut, uri, method='GET',
+                             status_code=requests.codes.OK,
+                             json={'Members@odata.count': 4,
+                                   'Members': [{}, {}],
+                                   'Members@odata.nextLink': '/foo/bar'})
+        page2 = add_response(self.sut, '/foo/bar', method='GET',
+                             status_code=requests.codes.INTERNAL_SERVER_ERROR)
+        self.mock_session.get.side_effect = [page1, page2]
+        req.test_get_collection_count_prop_total(self.sut)
+        result = get_result(
+            self.sut, Assertion.REQ_GET_COLLECTION_COUNT_PROP_TOTAL,
+            'GET', uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.NOT_TESTED, result['result'])
+        self.assertIn('returned status 500', result['msg'])
+
     def test_test_get_service_root_url_not_tested(self):
         uri = '/redfish/v1/'
         req.test_get_service_root_url(self.sut)
@@ -934,6 +991,91 @@ class ServiceRequests(TestCase):
                       (uri, requests.codes.BAD_REQUEST),
                       result['msg'])
 
+    def test_test_head_consistent_with_get_pass(self):
+        uri = '/redfish/v1/Systems/1'
+        get = add_response(self.sut, uri, json={'Id': '1'},
+                           headers={'ETag': '"1"'},
+                           request_type=RequestType.METHOD_PROBE)
+        get.elapsed = timedelta(milliseconds=40)
+        head = add_response(self.sut, uri, method='HEAD',
+                            request_type=RequestType.METHOD_PROBE,
+                            headers=dict(get.headers))
+        head.elapsed = timedelta(milliseconds=10)
+        req.test_head_consistent_with_get(self.sut)
+        result = get_result(
+            self.sut, Assertion.REQ_HEAD_DIFFERS_FROM_GET, 'HEAD', uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.PASS, result['result'])
+        metrics = {m['name']: m for m in
+                   self.sut.metrics[req.HEAD_CATEGORY]}
+        self.assertEqual(metrics['HEAD vs GET latency']['value'],
+                         '10.0 / 40.0')
+        self.assertEqual(metrics['HEAD vs GET latency']['uri'], uri)
+        self.assertEqual(metrics['Resources where HEAD was slower']['value'],
+                         '0 of 1')
+
+    def test_test_head_consistent_with_get_warn(self):
+        uri = '/redfish/v1/Systems/1'
+        add_response(self.sut, uri, json={'Id': '1'},
+                     headers={'ETag': '"1"'},
+                     request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, uri, method='HEAD',
+                     request_type=RequestType.METHOD_PROBE,
+                     headers={'Content-Type': 'application/json',
+                              'Content-Length': 99})
+        req.test_head_consistent_with_get(self.sut)
+        result = get_result(
+            self.sut, Assertion.REQ_HEAD_DIFFERS_FROM_GET, 'HEAD', uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.WARN, result['result'])
+        self.assertIn('ETag <missing> (GET: "1"); Content-Length 99 (GET: '
+                      '11)', result['msg'])
+        # latency is not known for these responses
+        self.assertNotIn(req.HEAD_CATEGORY, self.sut.metrics)
+
+    def test_test_head_consistent_with_get_fail(self):
+        uri = '/redfish/v1/Systems/1'
+        add_response(self.sut, uri, json={'Id': '1'},
+                     request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, uri, method='HEAD',
+                     status_code=requests.codes.NOT_FOUND,
+                     request_type=RequestType.METHOD_PROBE)
+        req.test_head_consistent_with_get(self.sut)
+        result = get_result(
+            self.sut, Assertion.REQ_HEAD_DIFFERS_FROM_GET, 'HEAD', uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.FAIL, result['result'])
+        self.assertIn('returned status 404; the GET request returned status '
+                      '200', result['msg'])
+
+    def test_test_head_consistent_with_get_not_allowed(self):
+        uri = '/redfish/v1/Systems/1'
+        add_response(self.sut, uri, json={'Id': '1'},
+                     request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, uri, method='HEAD',
+                     status_code=requests.codes.METHOD_NOT_ALLOWED,
+                     request_type=RequestType.METHOD_PROBE)
+        req.test_head_consistent_with_get(self.sut)
+        result = get_result(
+            self.sut, Assertion.REQ_HEAD_DIFFERS_FROM_GET, 'HEAD', uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.WARN, result['result'])
+        self.assertIn('returned status 405; the GET request succeeded',
+                      result['msg'])
+
+    def test_test_head_consistent_with_get_skipped(self):
+        # the service root and resources without a GET probe are skipped
+        add_response(self.sut, '/redfish/v1/Systems/1', json={'Id': '1'})
+        add_response(self.sut, '/redfish/v1/Systems/1', method='HEAD',
+                     request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, '/redfish/v1/', json={},
+                     request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, '/redfish/v1/', method='HEAD',
+                     request_type=RequestType.METHOD_PROBE)
+        req.test_head_consistent_with_get(self.sut)
+        self.assertNotIn(Assertion.REQ_HEAD_DIFFERS_FROM_GET,
+                         self.sut.results)
+
     def test_test_data_mod_errors_not_tested(self):
         uri = self.sut.sessions_uri
         r = add_response(self.sut, uri, method='POST',
@@ -1600,7 +1742,7 @@ class ServiceRequests(TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(Result.PASS, result['result'])
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_post_create_to_members_prop_fail(self, mock_post):
         uri = self.sut.sessions_uri + '/Members'
         response = add_response(self.sut, uri, 'POST',
@@ -1615,7 +1757,7 @@ class ServiceRequests(TestCase):
         self.assertIn('POST to Members property URI %s failed with status %s'
                       % (uri, requests.codes.NOT_FOUND), result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_post_create_to_members_prop_pass(self, mock_post):
         uri = self.sut.sessions_uri + '/Members'
         session_uri = '/redfish/v1/SessionService/Sessions/123'
@@ -1677,7 +1819,7 @@ class ServiceRequests(TestCase):
         self.assertEqual(Result.PASS, result['result'])
         self.assertIn('Test passed', result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_post_create_not_idempotent_not_tested1(self, mock_post):
         uri = self.sut.sessions_uri
         response = add_response(
@@ -1692,7 +1834,7 @@ class ServiceRequests(TestCase):
         self.assertIn('POST request to %s failed with status code %s' %
                       (uri, requests.codes.BAD_REQUEST), result['msg'])
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_post_create_not_idempotent_warn(self, mock_post):
         uri = self.sut.sessions_uri
         session_uri = '/redfish/v1/Sessions/123'
@@ -1714,7 +1856,7 @@ class ServiceRequests(TestCase):
             self.sut.rhost + session_uri)
         self.assertEqual(self.mock_session.delete.call_count, 1)
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_post_create_not_idempotent_not_tested2(self, mock_post):
         uri = self.sut.sessions_uri
         session_uri = '/redfish/v1/Sessions/123'
@@ -1737,7 +1879,7 @@ class ServiceRequests(TestCase):
             self.sut.rhost + session_uri)
         self.assertEqual(self.mock_session.delete.call_count, 1)
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_post_create_not_idempotent_fail(self, mock_post):
         uri = self.sut.sessions_uri
         session_uri = '/redfish/v1/Sessions/123'
@@ -1760,7 +1902,7 @@ class ServiceRequests(TestCase):
             self.sut.rhost + session_uri)
         self.assertEqual(self.mock_session.delete.call_count, 1)
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_post_create_not_idempotent_pass(self, mock_post):
         uri = self.sut.sessions_uri
         session_uri1 = '/redfish/v1/Sessions/123'
@@ -1858,7 +2000,7 @@ class ServiceRequests(TestCase):
         self.assertEqual(uri2, result['uri'])
         self.assertEqual(requests.codes.METHOD_NOT_ALLOWED, result['status'])
 
-    @mock.patch('redfish_protocol_validator.service_requests.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_test_service_requests_cover(self, mock_post):
         req.test_service_requests(self.sut)
 
@@ -9,6 +9,8 @@ from unittest import mock, TestCase
 import requests
 
 from redfish_protocol_validator import service_responses as resp
+from redfish_protocol_validator import sessions
+from redfish_protocol_validator import utils
 from redfish_protocol_validator.system_under_test import SystemUnderTest
 from redfish_protocol_validator.constants import Assertion, RequestType, ResourceType, Result
 from unittests.utils import add_response, get_result
@@ -96,6 +98,33 @@ class ServiceResponses(TestCase):
         self.assertIn('Test passed for header %s: %s'
                       % ('Allow', 'GET, HEAD, PATCH'), result['msg'])
 
+    def test_test_allow_header_get_or_head_probes(self):
+        uri = '/redfish/v1/Chassis/1'
+        add_response(self.sut, uri, 'HEAD', status_code=requests.codes.OK,
+                     headers={}, request_type=RequestType.METHOD_PROBE)
+        add_response(self.sut, '/redfish/v1/Chassis/2', 'HEAD',
+                     status_code=requests.codes.NOT_FOUND, headers={},
+                     request_type=RequestType.METHOD_PROBE)
+        resp.test_allow_header_get_or_head(self.sut)
+        result = get_result(self.sut, Assertion.RESP_HEADERS_ALLOW_GET_OR_HEAD,
+                            'HEAD', uri)
+        self.assertEqual(Result.FAIL, result['result'])
+        self.assertIsNone(get_result(
+            self.sut, Assertion.RESP_HEADERS_ALLOW_GET_OR_HEAD, 'HEAD',
+            '/redfish/v1/Chassis/2'))
+
+    def test_test_allow_header_method_not_allowed_probe(self):
+        uri = '/redfish/v1/Chassis/1'
+        add_response(self.sut, uri, 'POST',
+                     status_code=requests.codes.METHOD_NOT_ALLOWED,
+                     headers={'Allow': 'GET, HEAD'},
+                     request_type=RequestType.METHOD_PROBE)
+        resp.test_allow_header_method_not_allowed(self.sut)
+        result = get_result(
+            self.sut, Assertion.RESP_HEADERS_ALLOW_METHOD_NOT_ALLOWED,
+            'POST', uri)
+        self.assertEqual(Result.PASS, result['result'])
+
     def test_test_cache_control_header_not_tested1(self):
         uri = '/redfish/v1/'
         method = 'GET'
@@ -337,6 +366,36 @@ class ServiceResponses(TestCase):
                       ('Link', '<%s>; rel=describedby' % uri_ref),
                       result['msg'])
 
+    def test_test_link_header_expanded(self):
+        uri = '/redfish/v1/Systems'
+        method = 'GET'
+        uri_ref = '/redfish/v1/SchemaStore/en/ComputerSystemCollection.json'
+        coll = add_response(self.sut, '/redfish/v1/', method,
+                            json={'Members': []})
+        genuine = add_response(
+            self.sut, uri, method, status_code=requests.codes.OK,
+            headers={'Link': '<%s>; rel=describedby' % uri_ref})
+        genuine.links = {
+            'describedby': {
+                'url': uri_ref,
+                'rel': 'describedby'
+            }
+        }
+        # the stored response was synthesized from an expanded collection
+        self.sut.add_response(uri, utils.expanded_member_response(
+            coll, self.sut.rhost + uri, {'@odata.id': uri}))
+        self.mock_session.get.return_value = genuine
+        with mock.patch.object(resp, 'test_link_header_schema_ver_match'):
+            resp.test_link_header(self.sut)
+        # the resource was read again for its own headers
+        self.mock_session.get.assert_called_once_with(self.sut.rhost + uri)
+        self.assertIs(self.sut.get_response(method, uri), genuine)
+        result = get_result(
+            self.sut, Assertion.RESP_HEADERS_LINK_REL_DESCRIBED_BY,
+            method, uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.PASS, result['result'])
+
     def test_test_link_header_schema_ver_match_fail1(self):
         uri = '/redfish/v1/'
         method = 'GET'
@@ -602,6 +661,57 @@ class ServiceResponses(TestCase):
         self.assertIn('Test passed for header %s' % 'X-Auth-Token',
                       result['msg'])
 
+    def test_test_x_auth_token_sample_not_requested(self):
+        resp.test_x_auth_token_sample(self.sut)
+        self.assertNotIn(Assertion.RESP_HEADERS_X_AUTH_TOKEN,
+                         self.sut.results)
+
+    @mock.patch('redfish_protocol_validator.service_responses.sessions.'
+                'sample_session_tokens')
+    def test_test_x_auth_token_sample_not_tested(self, mock_sample):
+        self.sut.set_token_samples(4)
+        mock_sample.return_value = sessions.TokenSample(
+            ['c3VyZS4=', 'b3VyZS4='], 4, 2, 1.5, [0.1, 0.2])
+        resp.test_x_auth_token_sample(self.sut)
+        result = get_result(self.sut, Assertion.RESP_HEADERS_X_AUTH_TOKEN,
+                            'POST', self.sut.sessions_uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.NOT_TESTED, result['result'])
+        self.assertIn('No hexadecimal security tokens were sampled',
+                      result['msg'])
+
+    @mock.patch('redfish_protocol_validator.service_responses.sessions.'
+                'sample_session_tokens')
+    def test_test_x_auth_token_sample_warn(self, mock_sample):
+        self.sut.set_token_samples(8)
+        mock_sample.return_value = sessions.TokenSample(
+            ['%032x' % i for i in range(8)], 8, 0, 1.5, [0.1] * 8)
+        resp.test_x_auth_token_sample(self.sut)
+        result = get_result(self.sut, Assertion.RESP_HEADERS_X_AUTH_TOKEN,
+                            'POST', self.sut.sessions_uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.WARN, result['result'])
+        self.assertIn('may not be sufficiently random', result['msg'])
+        self.assertIn('8 of 8 sessions created', result['msg'])
+
+    @mock.patch('redfish_protocol_validator.service_responses.sessions.'
+                'sample_session_tokens')
+    def test_test_x_auth_token_sample_pass(self, mock_sample):
+        self.sut.set_token_samples(4)
+        tokens = ['C90FDAA22168C234C4C6628B80DC1CD1',
+                  '29024E088A67CC74020BBEA63B139B22',
+                  '514A08798E3404DDEF9519B3CD3A431B',
+                  '302B0A6DF25F14374FE1356D6D51C245']
+        mock_sample.return_value = sessions.TokenSample(
+            tokens, 4, 0, 1.5, [0.1, 0.2, 0.3, 0.4])
+        resp.test_x_auth_token_sample(self.sut)
+        result = get_result(self.sut, Assertion.RESP_HEADERS_X_AUTH_TOKEN,
+                            'POST', self.sut.sessions_uri)
+        self.assertIsNotNone(result)
+        self.assertEqual(Result.PASS, result['result'])
+        self.assertIn('4 hex tokens (512 bits)', result['msg'])
+        self.assertIn('Session Token Sampling', self.sut.metrics)
+
     def test_test_status_bad_request_not_tested(self):
         resp.test_status_bad_request(self.sut)
         result = get_result(self.sut, Assertion.RESP_STATUS_BAD_REQUEST,
@@ -10,6 +10,7 @@ import requests
 
 from redfish_protocol_validator import sessions
 from redfish_protocol_validator.system_under_test import SystemUnderTest
+from redfish_protocol_validator.transport import TransportSession
 
 
 class Sessions(TestCase):
@@ -21,7 +22,7 @@ class Sessions(TestCase):
             'OData-Version': '4.0'
         }
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_bad_login(self, mock_post):
         post_resp = mock.Mock(spec=requests.Response)
         post_resp.status_code = requests.codes.BAD_REQUEST
@@ -31,8 +32,9 @@ class Sessions(TestCase):
         mock_post.return_value = post_resp
         sessions.bad_login(self.sut)
         self.assertEqual(mock_post.call_count, 1)
+        self.assertTrue(mock_post.call_args[1]['auth_failure'])
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_create_session(self, mock_post):
         token = '87a5cd20'
         url = 'http://127.0.0.1:8000/redfish/v1/sessions/1234'
@@ -45,7 +47,7 @@ class Sessions(TestCase):
         new_uri, _ = sessions.create_session(self.sut)
         self.assertEqual(uri, new_uri)
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     @mock.patch('redfish_protocol_validator.sessions.logging.warning')
     def test_create_session_post_fail(self, mock_warning, mock_post):
         mock_post.return_value.status_code = requests.codes.BAD_REQUEST
@@ -62,13 +64,94 @@ class Sessions(TestCase):
         sessions.delete_session(self.sut, session, uri)
         session.delete.assert_called_once_with(self.sut.rhost + uri)
 
-    @mock.patch('redfish_protocol_validator.sessions.requests.Session')
-    def test_no_auth_session(self, mock_session):
-        session = mock.Mock(spec=requests.Session)
-        mock_session.return_value = session
-        sessions.no_auth_session(self.sut)
-        self.assertEqual(mock_session.call_count, 1)
+    def test_no_auth_session(self):
+        session = sessions.no_auth_session(self.sut)
+        self.assertIsInstance(session, TransportSession)
+        self.assertIs(self.sut.transport, session.transport)
         self.assertEqual(self.sut.verify, session.verify)
+        self.assertIsNone(session.auth)
+        self.assertNotIn('X-Auth-Token', session.headers)
+
+    @mock.patch('redfish_protocol_validator.sessions.time.sleep')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
+    def test_sample_session_tokens(self, mock_session_cls, mock_sleep):
+        mock_session = mock_session_cls.return_value
+        tokens = iter(['%032x' % i for i in range(1, 100)])
+
+        def post(url, **kwargs):
+            response = mock.Mock(spec=requests.Response)
+            response.ok = True
+            response.status_code = requests.codes.CREATED
+            response.headers = {
+                'X-Auth-Token': next(tokens),
+                'Location': '/redfish/v1/SessionService/Sessions/1'
+            }
+            return response
+
+        mock_session.post.side_effect = post
+        sample = sessions.sample_session_tokens(self.sut, 10, batch_size=4,
+                                                rate=1000)
+        self.assertEqual(10, len(sample.tokens))
+        self.assertEqual(10, len(set(sample.tokens)))
+        self.assertEqual(10, sample.requested)
+        self.assertEqual(0, sample.errors)
+        self.assertEqual(10, len(sample.create_times))
+        self.assertEqual(10, mock_session.post.call_count)
+        self.assertEqual(10, mock_session.delete.call_count)
+        _, kwargs = mock_session.delete.call_args
+        self.assertIn('X-Auth-Token', kwargs['headers'])
+        mock_session.close.assert_called_once_with()
+
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
+    def test_sample_session_tokens_no_location(self, mock_session_cls):
+        mock_session = mock_session_cls.return_value
+        response = mock.Mock(spec=requests.Response)
+        response.ok = True
+        response.status_code = requests.codes.CREATED
+        response.headers = {'X-Auth-Token': '%032x' % 1}
+        response.json.return_value = {
+            '@odata.id': '/redfish/v1/SessionService/Sessions/7'}
+        mock_session.post.return_value = response
+        sessions.sample_session_tokens(self.sut, 1, batch_size=1, rate=None)
+        # the session is deleted using the URI from the body
+        mock_session.delete.assert_called_once_with(
+            self.sut.rhost + '/redfish/v1/SessionService/Sessions/7',
+            headers={'X-Auth-Token': '%032x' % 1})
+
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
+    def test_sample_session_tokens_errors(self, mock_session_cls):
+        mock_session = mock_session_cls.return_value
+        failure = mock.Mock(spec=requests.Response)
+        failure.ok = False
+        failure.status_code = requests.codes.SERVICE_UNAVAILABLE
+        mock_session.post.side_effect = [
+            failure, requests.exceptions.ConnectionError()]
+        sample = sessions.sample_session_tokens(self.sut, 2, batch_size=2,
+                                                rate=None)
+        self.assertEqual([], sample.tokens)
+        self.assertEqual(2, sample.errors)
+        mock_session.delete.assert_not_called()
+
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
+    def test_sample_session_tokens_delete_failed(self, mock_session_cls):
+        mock_session = mock_session_cls.return_value
+        response = mock.Mock(spec=requests.Response)
+        response.ok = True
+        response.status_code = requests.codes.CREATED
+        response.headers = {
+            'X-Auth-Token': '%032x' % 1,
+            'Location': '/redfish/v1/SessionService/Sessions/7'
+        }
+        mock_session.post.return_value = response
+        mock_session.delete.return_value.ok = False
+        mock_session.delete.return_value.status_code = (
+            requests.codes.FORBIDDEN)
+        with self.assertLogs(level='WARNING') as cm:
+            sessions.sample_session_tokens(self.sut, 1, batch_size=1,
+                                           rate=None)
+        self.assertIn('WARNING:root:DELETE of sampled session '
+                      '/redfish/v1/SessionService/Sessions/7 returned status '
+                      '403', cm.output)
 
 
 if __name__ == '__main__':
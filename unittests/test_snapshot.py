@@ -0,0 +1,142 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock, TestCase
+
+import requests
+
+from redfish_protocol_validator import protocol_details
+from redfish_protocol_validator import utils
+from redfish_protocol_validator.constants import Assertion, Result
+from redfish_protocol_validator.snapshot import Snapshot
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        super(SnapshotTest, self).setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.rhost = 'https://127.0.0.1:8000'
+        self.uuid = '92384634-2938-2342-8820-489239905423'
+        self.uri = '/redfish/v1/Managers/BMC'
+        self.body = {'@odata.id': self.uri, 'Id': 'BMC'}
+
+    def make_sut(self, incremental):
+        sut = SystemUnderTest(self.rhost, 'oper', 'xyzzy')
+        sut._set_session(mock.Mock(spec=requests.Session))
+        snapshot = Snapshot(self.tmp_dir.name, self.rhost, '1.1.2',
+                            incremental=incremental)
+        sut.set_snapshot(snapshot)
+        snapshot.bind(self.uuid)
+        return sut, snapshot
+
+    def make_response(self, status_code=requests.codes.OK, etag='"1"'):
+        headers = {'Content-Type': 'application/json'}
+        if etag:
+            headers['ETag'] = etag
+        return utils.build_response(
+            self.rhost + self.uri, status_code, headers,
+            json.dumps(self.body).encode('utf-8'))
+
+    def save_first_run(self):
+        sut, snapshot = self.make_sut(False)
+        sut.add_response(self.uri, self.make_response())
+        sut.add_response('/redfish/v1/NoETag', self.make_response(etag=None))
+        sut.log(Result.PASS, 'GET', 200, self.uri,
+                Assertion.PROTO_URI_SAFE_CHARS, 'Test passed')
+        sut.log(Result.FAIL, 'GET', 200, self.uri,
+                Assertion.PROTO_ETAG_RFC7232, 'bad ETag')
+        sut.log(Result.PASS, 'GET', 200, self.uri,
+                Assertion.SEC_PRIV_ONE_ROLE_PRE_USER, 'Test passed')
+        snapshot.save(sut, protocol_details.resource_assertions)
+        return snapshot.path
+
+    def test_save(self):
+        path = self.save_first_run()
+        self.assertEqual(path, os.path.join(
+            self.tmp_dir.name, '127.0.0.1_8000', self.uuid + '.json'))
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(list(data['resources']), [self.uri])
+        entry = data['resources'][self.uri]
+        self.assertEqual(entry['etag'], '"1"')
+        self.assertEqual(
+            [r['assertion'] for r in entry['results']],
+            ['PROTO_URI_SAFE_CHARS', 'PROTO_ETAG_RFC7232'])
+
+    def test_not_modified(self):
+        self.save_first_run()
+        sut, snapshot = self.make_sut(True)
+        not_modified = self.make_response(requests.codes.NOT_MODIFIED)
+        current = self.make_response()
+        current.headers['Link'] = '</schema>; rel=describedby'
+        sut.session.get.side_effect = [not_modified, current]
+        r = snapshot.get(sut, self.uri)
+        # the current response is read for the other tests
+        self.assertEqual(sut.session.get.call_args_list, [
+            mock.call(self.rhost + self.uri,
+                      headers={'If-None-Match': '"1"'}),
+            mock.call(self.rhost + self.uri)])
+        self.assertIs(r, current)
+        self.assertTrue(r.unchanged)
+        self.assertTrue(snapshot.replay(sut, self.uri, r))
+        entries = sut.results[Assertion.PROTO_ETAG_RFC7232]
+        self.assertEqual(entries[0]['result'], Result.FAIL)
+        self.assertEqual(entries[0]['msg'], 'bad ETag')
+        self.assertNotIn(Assertion.SEC_PRIV_ONE_ROLE_PRE_USER, sut.results)
+        snapshot.add_metrics(sut)
+        metrics = {m['name']: m['value'] for m in sut.metrics[
+            'Incremental Validation']}
+        self.assertEqual(metrics['Resources not modified (304)'], 1)
+        self.assertEqual(metrics['Resources unchanged'], 1)
+        self.assertEqual(metrics['Results reused'], 2)
+
+    def test_same_etag(self):
+        self.save_first_run()
+        sut, snapshot = self.make_sut(True)
+        response = self.make_response()
+        sut.session.get.return_value = response
+        r = snapshot.get(sut, self.uri)
+        self.assertIs(r, response)
+        self.assertTrue(r.unchanged)
+
+    def test_changed(self):
+        self.save_first_run()
+        sut, snapshot = self.make_sut(True)
+        sut.session.get.return_value = self.make_response(etag='"2"')
+        r = snapshot.get(sut, self.uri)
+        self.assertFalse(r.unchanged)
+        self.assertFalse(snapshot.replay(sut, self.uri, r))
+        self.assertEqual(snapshot.unchanged, 0)
+        # resources not in the snapshot are read unconditionally
+        snapshot.get(sut, '/redfish/v1/NoETag')
+        sut.session.get.assert_called_with(self.rhost + '/redfish/v1/NoETag')
+
+    def test_other_tool_version_ignored(self):
+        path = self.save_first_run()
+        with open(path) as f:
+            data = json.load(f)
+        data['tool_version'] = '0.9.0'
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        sut, snapshot = self.make_sut(True)
+        snapshot.get(sut, self.uri)
+        sut.session.get.assert_called_once_with(self.rhost + self.uri)
+
+    def test_no_service_uuid(self):
+        snapshot = Snapshot(self.tmp_dir.name, self.rhost, '1.1.2')
+        snapshot.bind(None)
+        self.assertFalse(snapshot.bound)
+        snapshot.save(SystemUnderTest(self.rhost, 'oper', 'xyzzy'), [])
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
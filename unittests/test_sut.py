@@ -10,7 +10,7 @@ import requests
 
 from redfish_protocol_validator.constants import Assertion, ResourceType, Result
 from redfish_protocol_validator.system_under_test import SystemUnderTest
-from unittests.utils import add_response
+from unittests.utils import add_response, FakeClock
 
 
 class Sut(TestCase):
@@ -97,6 +97,26 @@ class Sut(TestCase):
         self.assertEqual(self.sut.version_tuple, (1, 0, 0))
         self.assertEqual(self.sut.version_string, '1.0.0')
 
+    @mock.patch('redfish_protocol_validator.system_under_test.time')
+    def test_set_time_budget(self, mock_time):
+        clock = FakeClock()
+        mock_time.monotonic.side_effect = clock.monotonic
+        self.assertIsNone(self.sut.time_budget)
+        self.assertFalse(self.sut.deadline_passed)
+        self.sut.set_time_budget(30)
+        self.assertEqual(self.sut.time_budget, 30)
+        clock.sleep(29.5)
+        self.assertFalse(self.sut.deadline_passed)
+        clock.sleep(0.5)
+        self.assertTrue(self.sut.deadline_passed)
+        self.sut.set_time_budget(None)
+        self.assertFalse(self.sut.deadline_passed)
+
+    def test_set_timeouts(self):
+        self.sut.set_timeouts(5, 20)
+        self.assertEqual(self.sut.transport.timeouts(False), (5, 20))
+        self.assertEqual(self.sut.transport.timeouts(True), (5, None))
+
     def test_version(self):
         self.assertEqual(self.sut.version_tuple, self.version_tuple)
         self.assertEqual(self.sut.version_string, self.version)
@@ -306,13 +326,13 @@ class Sut(TestCase):
         self.assertEqual(self.sut.summary_count(Result.WARN), 0)
         self.assertEqual(self.sut.summary_count(Result.NOT_TESTED), 0)
 
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
     def test_get_sessions_uri_default(self, mock_get):
         mock_get.return_value.status_code = requests.codes.OK
         uri = self.sut._get_sessions_uri(self.headers)
         self.assertEqual(uri, '/redfish/v1/SessionService/Sessions')
 
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
     def test_get_sessions_uri_via_links(self, mock_get):
         response = mock.Mock(spec=requests.Response)
         response.status_code = requests.codes.OK
@@ -327,7 +347,7 @@ class Sut(TestCase):
         uri = self.sut._get_sessions_uri(self.headers)
         self.assertEqual(uri, '/redfish/v1/Sessions')
 
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
     def test_get_sessions_uri_via_session_service(self, mock_get):
         response1 = mock.Mock(spec=requests.Response)
         response1.status_code = requests.codes.OK
@@ -347,9 +367,9 @@ class Sut(TestCase):
         uri = self.sut._get_sessions_uri(self.headers)
         self.assertEqual(uri, '/redfish/v1/Sessions')
 
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.get')
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.post')
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_login(self, mock_session, mock_post, mock_get):
         mock_get.return_value.status_code = requests.codes.OK
         post_resp = mock.Mock(spec=requests.Response)
@@ -369,8 +389,8 @@ class Sut(TestCase):
                          '/redfish/v1/sessions/1234')
         self.assertEqual(self.sut.active_session_key, token)
 
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.get')
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
     def test_login_basic_auth(self, mock_post, mock_get):
         mock_get.return_value.status_code = requests.codes.OK
         post_resp = mock.Mock(spec=requests.Response)
@@ -383,9 +403,9 @@ class Sut(TestCase):
         self.assertIsNone(self.sut.active_session_key)
         self.assertEqual(session.auth, (self.sut.username, self.sut.password))
 
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.get')
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.post')
-    @mock.patch('redfish_protocol_validator.system_under_test.requests.Session')
+    @mock.patch('redfish_protocol_validator.transport.Transport.get')
+    @mock.patch('redfish_protocol_validator.transport.Transport.post')
+    @mock.patch('redfish_protocol_validator.transport.Transport.session')
     def test_login_no_token_header(self, mock_session, mock_post, mock_get):
         mock_get.return_value.status_code = requests.codes.OK
         post_resp = mock.Mock(spec=requests.Response)
@@ -0,0 +1,134 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import unittest
+from unittest import mock, TestCase
+
+import requests
+
+from redfish_protocol_validator import openapi
+from redfish_protocol_validator import templates
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+from unittests.utils import add_response
+
+chassis_type = '#Chassis.v1_14_0.Chassis'
+sensor_type = '#Sensor.v1_2_0.Sensor'
+
+
+class Templates(TestCase):
+    def setUp(self):
+        super(Templates, self).setUp()
+        self.sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy')
+        self.sut._set_session(mock.MagicMock(spec=requests.Session))
+
+    def add_service(self):
+        add_response(self.sut, '/redfish/v1/', json={
+            '@odata.type': '#ServiceRoot.v1_5_0.ServiceRoot'})
+        add_response(self.sut, '/redfish/v1/Chassis', json={
+            '@odata.type': '#ChassisCollection.ChassisCollection',
+            'Members': [{'@odata.id': '/redfish/v1/Chassis/%s' % c}
+                        for c in ['1U', '2U']]})
+        for c in ['1U', '2U']:
+            add_response(self.sut, '/redfish/v1/Chassis/%s' % c,
+                         json={'@odata.type': chassis_type})
+            # the Sensors collections were not read
+            for s in range(4):
+                add_response(self.sut,
+                             '/redfish/v1/Chassis/%s/Sensors/T%s' % (c, s),
+                             json={'@odata.type': sensor_type})
+        add_response(self.sut, '/redfish/v1/Chassis/1U/Thermal',
+                     json={'@odata.type': '#Thermal.v1_7_0.Thermal'})
+        add_response(self.sut, '/redfish/v1/Chassis/1U/Power',
+                     json={'@odata.type': '#Power.v1_7_0.Power'})
+        add_response(self.sut, '/redfish/v1/$metadata', text='<Edmx/>')
+
+    def test_build_index(self):
+        self.add_service()
+        self.sut.set_sample_mode(templates.SAMPLE_STRATIFIED)
+        index = templates.build_index(self.sut)
+        self.assertIs(self.sut.uri_templates, index)
+        self.assertEqual(index.template('/redfish/v1/'), '/redfish/v1/')
+        self.assertEqual(index.template('/redfish/v1/Chassis'),
+                         '/redfish/v1/Chassis')
+        # a member of a collection that was read
+        self.assertEqual(index.template('/redfish/v1/Chassis/2U'),
+                         '/redfish/v1/Chassis/{id}')
+        # siblings of the same type
+        self.assertEqual(index.template('/redfish/v1/Chassis/2U/Sensors/T3'),
+                         '/redfish/v1/Chassis/{id}/Sensors/{id}')
+        # siblings of different types
+        self.assertEqual(index.template('/redfish/v1/Chassis/1U/Power'),
+                         '/redfish/v1/Chassis/{id}/Power')
+        self.assertEqual(index.template('/redfish/v1/Chassis/1U?$top=1'),
+                         '/redfish/v1/Chassis/{id}?$top=1')
+        self.assertEqual(index.group('/redfish/v1/Chassis/1U'),
+                         ('/redfish/v1/Chassis/{id}', chassis_type))
+        # a resource without a type is a group of its own
+        self.assertEqual(index.group('/redfish/v1/$metadata'),
+                         ('/redfish/v1/$metadata', None))
+        self.assertEqual(len(index.groups), 6)
+        self.assertEqual(len(index.groups[(
+            '/redfish/v1/Chassis/{id}/Sensors/{id}', sensor_type)]), 8)
+        metrics = {m['name']: m['value'] for m in
+                   self.sut.metrics[templates.TEMPLATE_CATEGORY]}
+        self.assertEqual(metrics['Resources indexed'], 14)
+        self.assertEqual(metrics['Resource groups'], 6)
+        self.assertEqual(metrics['Sample mode'], templates.SAMPLE_STRATIFIED)
+
+    def test_build_index_exhaustive(self):
+        self.add_service()
+        templates.build_index(self.sut)
+        # no sampling, so the index size is not reported
+        self.assertNotIn(templates.TEMPLATE_CATEGORY, self.sut.metrics)
+
+    def test_openapi_templates(self):
+        self.add_service()
+        self.sut.set_openapi(openapi.OpenApiIndex({
+            '/redfish/v1/Chassis/{ChassisId}': ['GET', 'PATCH']}))
+        index = templates.build_index(self.sut)
+        self.assertEqual(index.template('/redfish/v1/Chassis/1U'),
+                         '/redfish/v1/Chassis/{ChassisId}')
+        self.assertEqual(index.template('/redfish/v1/Chassis/1U/Sensors/T0'),
+                         '/redfish/v1/Chassis/{id}/Sensors/{id}')
+
+    def test_sample(self):
+        self.add_service()
+        index = templates.build_index(self.sut)
+        uris = self.sut.get_responses_by_method('GET')
+        self.assertEqual(index.sample(uris, templates.SAMPLE_EXHAUSTIVE),
+                         sorted(uris))
+        sensors = [u for u in uris if '/Sensors/' in u]
+        self.assertEqual(
+            index.sample(uris, templates.SAMPLE_TEMPLATE),
+            ['/redfish/v1/', '/redfish/v1/$metadata', '/redfish/v1/Chassis',
+             '/redfish/v1/Chassis/1U', '/redfish/v1/Chassis/1U/Power',
+             '/redfish/v1/Chassis/1U/Sensors/T0',
+             '/redfish/v1/Chassis/1U/Thermal'])
+        self.assertEqual(
+            index.sample(sensors, templates.SAMPLE_STRATIFIED, size=3),
+            ['/redfish/v1/Chassis/1U/Sensors/T0',
+             '/redfish/v1/Chassis/1U/Sensors/T2',
+             '/redfish/v1/Chassis/2U/Sensors/T1'])
+        # URIs outside the index are always selected
+        self.assertEqual(
+            index.sample(['/redfish/v1/Systems/1', '/redfish/v1/Systems/2'],
+                         templates.SAMPLE_TEMPLATE),
+            ['/redfish/v1/Systems/1', '/redfish/v1/Systems/2'])
+
+    def test_select_uris(self):
+        self.add_service()
+        uris = self.sut.get_responses_by_method('GET')
+        self.sut.set_sample_mode(templates.SAMPLE_TEMPLATE)
+        # every URI is selected until the index is built
+        self.assertEqual(templates.select_uris(self.sut, uris), sorted(uris))
+        templates.build_index(self.sut)
+        self.assertEqual(len(templates.select_uris(self.sut, uris)), 7)
+        self.sut.set_sample_mode(templates.SAMPLE_STRATIFIED)
+        self.sut.set_sample_size(2)
+        self.assertEqual(len(templates.select_uris(self.sut, uris)), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
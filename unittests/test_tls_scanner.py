@@ -0,0 +1,176 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import ssl
+import unittest
+from unittest import mock
+
+from redfish_protocol_validator import tls_scanner
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+
+
+def make_probe(protocol, cipher, accepted, chain=None):
+    if accepted:
+        return tls_scanner.TlsProbe(protocol, cipher, True, cipher or 'X',
+                                    0.01, chain, None)
+    return tls_scanner.TlsProbe(protocol, cipher, False, None, None, None,
+                                'SSLError: handshake failure')
+
+
+class TlsScanner(unittest.TestCase):
+    def setUp(self):
+        super(TlsScanner, self).setUp()
+        self.sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy')
+        self.protocols = [('TLSv1.1', 'v11'), ('TLSv1.2', 'v12'),
+                          ('TLSv1.3', 'v13')]
+
+    def test_host_and_port(self):
+        self.assertEqual(('127.0.0.1', 8000),
+                         tls_scanner.host_and_port(self.sut))
+        sut = SystemUnderTest('https://bmc.example.com', 'oper', 'xyzzy')
+        self.assertEqual(('bmc.example.com', 443),
+                         tls_scanner.host_and_port(sut))
+
+    def test_local_ciphers_tls13(self):
+        self.assertEqual([None], tls_scanner.TlsScanner.local_ciphers(
+            'TLSv1.3', 'v13'))
+
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner._context')
+    def test_local_ciphers_filtered(self, mock_context):
+        mock_context.return_value.get_ciphers.return_value = [
+            {'name': 'TLS_AES_128_GCM_SHA256', 'protocol': 'TLSv1.3'},
+            {'name': 'ECDHE-RSA-AES128-GCM-SHA256', 'protocol': 'TLSv1.2'},
+            {'name': 'AES128-SHA', 'protocol': 'SSLv3'}
+        ]
+        self.assertEqual(
+            ['ECDHE-RSA-AES128-GCM-SHA256', 'AES128-SHA'],
+            tls_scanner.TlsScanner.local_ciphers('TLSv1.2', 'v12'))
+        self.assertEqual(
+            ['AES128-SHA'],
+            tls_scanner.TlsScanner.local_ciphers('TLSv1.1', 'v11'))
+        mock_context.side_effect = ssl.SSLError('no ciphers')
+        self.assertEqual(
+            [], tls_scanner.TlsScanner.local_ciphers('TLSv1', 'v1'))
+
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner._context')
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.handshake')
+    def test_probe(self, mock_handshake, mock_context):
+        ssock = mock.Mock()
+        ssock.cipher.return_value = ('AES128-SHA', 'TLSv1.2', 128)
+        ssock.getpeercert.return_value = b'der'
+        mock_handshake.return_value = (ssock, 0.02)
+        scanner = tls_scanner.TlsScanner('127.0.0.1', 8000)
+        probe = scanner.probe('TLSv1.2', 'v12', 'AES128-SHA')
+        self.assertTrue(probe.accepted)
+        self.assertEqual('AES128-SHA', probe.negotiated_cipher)
+        self.assertEqual(0.02, probe.handshake_time)
+        self.assertEqual([b'der'], probe.chain)
+        ssock.close.assert_called_once_with()
+        mock_handshake.side_effect = ssl.SSLError('handshake failure')
+        probe = scanner.probe('TLSv1.2', 'v12', 'RC4-MD5')
+        self.assertFalse(probe.accepted)
+        self.assertIn('SSLError', probe.error)
+        mock_context.side_effect = ssl.SSLError('No cipher can be selected')
+        probe = scanner.probe('TLSv1.2', 'v12', 'BOGUS')
+        self.assertFalse(probe.accepted)
+        self.assertIn('No cipher', probe.error)
+
+    @mock.patch('redfish_protocol_validator.tls_scanner.socket.'
+                'create_connection')
+    def test_handshake_governed(self, mock_connect):
+        governor = mock.Mock()
+        context = mock.Mock()
+        context.wrap_socket.return_value = 'ssock'
+        scanner = tls_scanner.TlsScanner('127.0.0.1', 8000,
+                                         governor=governor)
+        ssock, _ = scanner.handshake(context)
+        self.assertEqual('ssock', ssock)
+        governor.acquire.assert_called_once_with()
+        governor.release.assert_called_once_with()
+        # the token is released when the connection fails
+        mock_connect.side_effect = ConnectionRefusedError
+        with self.assertRaises(ConnectionRefusedError):
+            scanner.handshake(context)
+        self.assertEqual(2, governor.acquire.call_count)
+        self.assertEqual(2, governor.release.call_count)
+
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.probe')
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.'
+                'local_ciphers')
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.'
+                'local_protocols')
+    def test_scan(self, mock_protocols, mock_ciphers, mock_probe):
+        mock_protocols.return_value = self.protocols
+        mock_ciphers.side_effect = lambda name, version: (
+            [None] if name == 'TLSv1.3' else ['A', 'B'])
+        mock_probe.side_effect = lambda name, version, cipher: make_probe(
+            name, cipher, name != 'TLSv1.1')
+        probes = tls_scanner.TlsScanner('127.0.0.1', 8000).scan()
+        self.assertEqual(5, len(probes))
+        self.assertEqual([('TLSv1.1', 'A'), ('TLSv1.1', 'B'),
+                          ('TLSv1.2', 'A'), ('TLSv1.2', 'B'),
+                          ('TLSv1.3', None)],
+                         [(p.protocol, p.cipher) for p in probes])
+        self.assertEqual(3, len([p for p in probes if p.accepted]))
+
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner._context')
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.handshake')
+    def test_resumption(self, mock_handshake, mock_context):
+        first = mock.Mock()
+        first.session = 'session'
+        second = mock.Mock()
+        second.session_reused = True
+        mock_handshake.side_effect = [(first, 0.05), (second, 0.01)]
+        scanner = tls_scanner.TlsScanner('127.0.0.1', 8000)
+        self.assertEqual((True, 0.05, 0.01),
+                         scanner.resumption('TLSv1.3', 'v13'))
+        mock_handshake.assert_called_with(mock_context.return_value,
+                                          session='session')
+        first.sendall.assert_called_once()
+        # no session to resume
+        first.session = None
+        mock_handshake.side_effect = [(first, 0.05)]
+        self.assertEqual((False, 0.05, None),
+                         scanner.resumption('TLSv1.3', 'v13'))
+
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.'
+                'resumption')
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.scan')
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.'
+                'local_protocols')
+    def test_scan_tls(self, mock_protocols, mock_scan, mock_resumption):
+        mock_protocols.return_value = self.protocols
+        mock_scan.return_value = [
+            make_probe('TLSv1.1', 'A', False),
+            make_probe('TLSv1.2', 'A', True, chain=[b'der']),
+            make_probe('TLSv1.3', None, True, chain=[b'der'])
+        ]
+        mock_resumption.return_value = (True, 0.05, 0.01)
+        tls_scanner.scan_tls(self.sut)
+        metrics = {m['name']: m['value']
+                   for m in self.sut.metrics[tls_scanner.TLS_CATEGORY]}
+        self.assertEqual('2 of 3', metrics['Configurations accepted'])
+        self.assertEqual('TLSv1.2, TLSv1.3',
+                         metrics['Protocol versions accepted'])
+        self.assertIn('Handshake time: TLSv1.2 A', metrics)
+        self.assertIn('Handshake time: TLSv1.3 (negotiated X)', metrics)
+        self.assertEqual('supported', metrics['Session resumption (TLSv1.3)'])
+        self.assertAlmostEqual(10, metrics['Resumed handshake time (TLSv1.3)'])
+        mock_resumption.assert_called_once_with('TLSv1.3', 'v13')
+        # the chain from the scan is shared with the cert checks
+        self.assertEqual([b'der'], self.sut.server_cert_chain)
+
+    @mock.patch('redfish_protocol_validator.tls_scanner.TlsScanner.scan')
+    def test_scan_tls_not_https(self, mock_scan):
+        sut = SystemUnderTest('http://127.0.0.1:8000', 'oper', 'xyzzy')
+        with self.assertLogs(level='WARNING') as cm:
+            tls_scanner.scan_tls(sut)
+        self.assertIn('skipping TLS scan', cm.output[0])
+        mock_scan.assert_not_called()
+        self.assertEqual({}, sut.metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,456 @@
+# Copyright Notice:
+# Copyright 2020-2022 DMTF. All rights reserved.
+# License: BSD 3-Clause License. For full text see link:
+# https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
+
+import ssl
+import unittest
+from unittest import mock
+
+import requests
+
+from redfish_protocol_validator import transport
+from redfish_protocol_validator.system_under_test import SystemUnderTest
+from unittests.utils import FakeClock
+
+
+class FakeSSLSocket(object):
+    def __init__(self, session=None, session_reused=False,
+                 server_hostname=None):
+        self.session = session
+        self.session_reused = session_reused
+        self.server_hostname = server_hostname
+
+
+def make_response(status_code, retry_after=None):
+    response = mock.Mock(spec=requests.Response)
+    response.status_code = status_code
+    response.headers = {}
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return response
+
+
+class Transport(unittest.TestCase):
+    def setUp(self):
+        super(Transport, self).setUp()
+        self.sut = SystemUnderTest('https://127.0.0.1:8000', 'oper', 'xyzzy',
+                                   verify=False)
+
+    @mock.patch('redfish_protocol_validator.transport.ssl.SSLContext.'
+                'wrap_socket')
+    def test_session_resumption(self, mock_wrap):
+        context = transport.ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        first = FakeSSLSocket(session=None)
+        mock_wrap.return_value = first
+        context.wrap_socket(mock.Mock(), server_hostname='bmc1')
+        self.assertIsNone(mock_wrap.call_args[1]['session'])
+        # TLS 1.3 ticket arrives after the handshake on the open socket
+        first.session = 'ticket1'
+        second = FakeSSLSocket(session='ticket1', session_reused=True)
+        mock_wrap.return_value = second
+        context.wrap_socket(mock.Mock(), server_hostname='bmc1')
+        self.assertEqual('ticket1', mock_wrap.call_args[1]['session'])
+        # sessions are kept per host
+        mock_wrap.return_value = FakeSSLSocket(session='ticket2')
+        context.wrap_socket(mock.Mock(), server_hostname='bmc2')
+        self.assertIsNone(mock_wrap.call_args[1]['session'])
+        # the session is still offered after the last socket has gone away
+        del first, second
+        mock_wrap.return_value = FakeSSLSocket(session_reused=True)
+        context.wrap_socket(mock.Mock(), server_hostname='bmc1')
+        self.assertEqual('ticket1', mock_wrap.call_args[1]['session'])
+        self.assertEqual(2, context.full_handshakes)
+        self.assertEqual(2, context.resumed_handshakes)
+
+    @mock.patch('redfish_protocol_validator.transport.ssl.SSLContext.'
+                'wrap_socket')
+    def test_session_saved_on_close(self, mock_wrap):
+        context = transport.ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.assertIs(transport.ResumableSSLSocket, context.sslsocket_class)
+        mock_wrap.return_value = FakeSSLSocket()
+        context.wrap_socket(mock.Mock(), server_hostname='bmc1')
+        # the ticket is captured from the socket as it closes
+        context.save_session(FakeSSLSocket(session='ticket1',
+                                           server_hostname='bmc1'))
+        mock_wrap.return_value = FakeSSLSocket(session_reused=True)
+        context.wrap_socket(mock.Mock(), server_hostname='bmc1')
+        self.assertEqual('ticket1', mock_wrap.call_args[1]['session'])
+
+    def test_verify_not_overridden_by_environment(self):
+        session = self.sut.transport.session()
+        with mock.patch.dict('os.environ',
+                             {'REQUESTS_CA_BUNDLE': '/path/to/ca.pem'}):
+            settings = session.merge_environment_settings(
+                'https://127.0.0.1:8000/', {}, None, None, None)
+        self.assertFalse(settings['verify'])
+
+    def test_sut_transport_shared(self):
+        t = self.sut.transport
+        self.assertIs(t, self.sut.transport)
+        self.assertFalse(t.verify)
+        s1 = t.session()
+        s2 = t.session()
+        self.assertIs(t.adapter, s1.get_adapter('https://127.0.0.1:8000/'))
+        self.assertIs(t.adapter, s2.get_adapter('http://127.0.0.1:8000/'))
+        self.assertFalse(s1.verify)
+        self.assertIs(t.ssl_context, t.adapter.poolmanager.connection_pool_kw[
+            'ssl_context'])
+
+    @mock.patch('redfish_protocol_validator.transport.HTTPAdapter.close')
+    def test_session_close_keeps_shared_adapter(self, mock_close):
+        with self.sut.transport.session():
+            pass
+        mock_close.assert_not_called()
+
+    @mock.patch('redfish_protocol_validator.transport.TLS_RESUMPTION',
+                False)
+    def test_no_tls_resumption(self):
+        t = transport.Transport(verify=False)
+        self.assertIsNone(t.ssl_context)
+        self.assertNotIn('ssl_context',
+                         t.adapter.poolmanager.connection_pool_kw)
+        self.assertEqual(0, t.full_handshakes)
+        self.assertEqual(0, t.resumed_handshakes)
+        t.add_metrics(self.sut)
+        self.assertEqual({}, self.sut.metrics)
+
+    @mock.patch('redfish_protocol_validator.transport.ResumingSSLContext.'
+                'load_verify_locations')
+    def test_ca_bundle_loaded_once(self, mock_load):
+        with mock.patch('redfish_protocol_validator.transport.os.path.'
+                        'isdir', return_value=False), \
+                mock.patch('redfish_protocol_validator.transport.os.path.'
+                           'exists', return_value=True):
+            t = transport.Transport(verify='/path/to/ca.pem')
+        mock_load.assert_called_once_with(cafile='/path/to/ca.pem')
+        conn = mock.Mock()
+        conn.ca_certs = None
+        conn.ca_cert_dir = None
+        with mock.patch('redfish_protocol_validator.transport.HTTPAdapter.'
+                        'cert_verify') as mock_verify:
+            def cert_verify(c, url, verify, cert):
+                c.ca_certs = verify
+            mock_verify.side_effect = cert_verify
+            t.adapter.cert_verify(conn, 'https://127.0.0.1:8000/',
+                                  '/path/to/ca.pem', None)
+        # urllib3 does not reload the bundle already in the shared context
+        self.assertIsNone(conn.ca_certs)
+
+    @mock.patch('redfish_protocol_validator.transport.TransportSession.'
+                'request')
+    def test_request_methods(self, mock_request):
+        t = self.sut.transport
+        t.get('https://127.0.0.1:8000/redfish/v1/', headers={'a': 'b'})
+        mock_request.assert_called_with(
+            method='GET', url='https://127.0.0.1:8000/redfish/v1/',
+            headers={'a': 'b'})
+        t.head('https://127.0.0.1:8000/redfish/v1/')
+        mock_request.assert_called_with(
+            method='HEAD', url='https://127.0.0.1:8000/redfish/v1/',
+            allow_redirects=False)
+        for method in ['post', 'patch', 'delete']:
+            getattr(t, method)('https://127.0.0.1:8000/redfish/v1/')
+            mock_request.assert_called_with(
+                method=method.upper(),
+                url='https://127.0.0.1:8000/redfish/v1/')
+
+    def test_add_metrics(self):
+        t = self.sut.transport
+        t.add_metrics(self.sut)
+        self.assertEqual({}, self.sut.metrics)
+        t.ssl_context.full_handshakes = 1
+        t.ssl_context.resumed_handshakes = 3
+        t.add_metrics(self.sut)
+        metrics = {m['name']: m['value']
+                   for m in self.sut.metrics[transport.TRANSPORT_CATEGORY]}
+        self.assertEqual(1, metrics['Full handshakes'])
+        self.assertEqual(3, metrics['Resumed handshakes'])
+        self.assertEqual(75.0, metrics['Resumption rate'])
+
+    def test_parse_retry_after(self):
+        self.assertEqual(120.0, transport.parse_retry_after('120'))
+        self.assertEqual(0.0, transport.parse_retry_after(
+            'Wed, 21 Oct 2015 07:28:00 GMT'))
+        self.assertIsNone(transport.parse_retry_after(None))
+        self.assertIsNone(transport.parse_retry_after('soon'))
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    def test_token_bucket(self, mock_time):
+        bucket = transport.TokenBucket(2, burst=2)
+        self.assertEqual(0, bucket.take())
+        self.assertEqual(0, bucket.take())
+        self.assertAlmostEqual(0.5, bucket.take())
+        self.assertAlmostEqual(0.5, bucket.take())
+        mock_time.sleep(10)
+        # tokens accumulate only up to the burst size
+        self.assertEqual(0, bucket.take())
+        self.assertEqual(0, bucket.take())
+        self.assertAlmostEqual(0.5, bucket.take())
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    def test_governor_retry_after(self, mock_time):
+        governor = transport.Governor(max_rate=8)
+        governor.acquire()
+        with self.assertLogs(level='WARNING') as cm:
+            governor.release(make_response(429, retry_after='5'))
+        self.assertIn('backing off for 5.0 seconds', cm.output[0])
+        self.assertEqual(4, governor._bucket.rate)
+        start = mock_time.now
+        governor.acquire()
+        self.assertGreaterEqual(mock_time.now - start, 5)
+        governor.release(make_response(200))
+        self.assertEqual(4.5, governor._bucket.rate)
+        self.assertEqual(1, governor.throttled)
+        self.assertEqual(1, governor.retry_after)
+        self.assertEqual(2, governor.requests)
+        self.assertGreaterEqual(governor.wait_time, 5)
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    def test_governor_exponential_backoff(self, mock_time):
+        governor = transport.Governor(max_rate=100, max_backoff=3)
+        delays = []
+        for _ in range(4):
+            governor.acquire()
+            governor.release(make_response(503))
+            delays.append(governor._resume_at - mock_time.now)
+        self.assertEqual([1, 2, 3, 3], delays)
+        # success resets the backoff
+        governor.acquire()
+        governor.release(make_response(200))
+        self.assertEqual(0, governor._backoff)
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    def test_governor_unlimited_no_pause(self, mock_time):
+        governor = transport.Governor()
+        self.assertFalse(governor.limited)
+        # a 503 without Retry-After does not pause an unlimited run
+        governor.acquire()
+        governor.release(make_response(503))
+        self.assertEqual(0, governor._resume_at)
+        self.assertEqual(1, governor.throttled)
+        self.assertEqual(0, governor.paused)
+        # Retry-After is still honored
+        governor.acquire()
+        governor.release(make_response(429, retry_after='2'))
+        start = mock_time.now
+        governor.acquire()
+        self.assertGreaterEqual(mock_time.now - start, 2)
+        self.assertEqual(1, governor.paused)
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    def test_governor_auth_failure_budget(self, mock_time):
+        governor = transport.Governor(auth_failure_rate=0.5,
+                                      auth_failure_burst=1)
+        start = mock_time.now
+        governor.acquire(auth_failure=True)
+        governor.release()
+        governor.acquire()
+        governor.release()
+        self.assertEqual(start, mock_time.now)
+        governor.acquire(auth_failure=True)
+        governor.release()
+        self.assertEqual(start + 2, mock_time.now)
+        self.assertEqual(2, governor.auth_failure_requests)
+
+    def test_governor_max_in_flight(self):
+        governor = transport.Governor(max_in_flight=2)
+        governor.acquire()
+        governor.acquire()
+        self.assertFalse(governor._slots.acquire(blocking=False))
+        governor.release()
+        self.assertTrue(governor._slots.acquire(blocking=False))
+
+    @mock.patch('redfish_protocol_validator.transport.HTTPAdapter.send')
+    def test_adapter_send_governed(self, mock_send):
+        t = transport.Transport(verify=False, max_in_flight=1)
+        response = make_response(200)
+        mock_send.return_value = response
+        self.assertIs(response, t.adapter.send(mock.Mock()))
+        # the slot was released
+        self.assertTrue(t.governor._slots.acquire(blocking=False))
+        t.governor._slots.release()
+        mock_send.side_effect = requests.ConnectionError
+        with self.assertRaises(requests.ConnectionError):
+            t.auth_failure_adapter.send(mock.Mock())
+        self.assertTrue(t.governor._slots.acquire(blocking=False))
+        self.assertEqual(2, t.governor.requests)
+        self.assertEqual(1, t.governor.auth_failure_requests)
+
+    def test_auth_failure_session(self):
+        t = self.sut.transport
+        session = t.session(auth_failure=True)
+        self.assertIs(t.auth_failure_adapter,
+                      session.get_adapter('https://127.0.0.1:8000/'))
+
+    def test_set_rate_limits(self):
+        self.sut.set_rate_limits(max_rate=5, max_in_flight=2)
+        t = self.sut.transport
+        self.assertTrue(t.governor.limited)
+        self.assertIs(t.governor, t.adapter.governor)
+        self.assertIs(t.governor, t.auth_failure_adapter.governor)
+        t.add_metrics(self.sut)
+        metrics = {m['name']: m['value']
+                   for m in self.sut.metrics[transport.THROTTLE_CATEGORY]}
+        self.assertEqual(0, metrics['Throttled responses (429/503)'])
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    @mock.patch('redfish_protocol_validator.transport.HTTPAdapter.send')
+    def test_retry_transient_get(self, mock_send, mock_time):
+        t = transport.Transport(verify=False)
+        request = mock.Mock(method='GET', url='https://127.0.0.1/redfish/v1')
+        bad_gateway = make_response(502)
+        mock_send.side_effect = [requests.ConnectionError, bad_gateway,
+                                 make_response(200)]
+        start = mock_time.now
+        response = t.adapter.send(request)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, response.attempts)
+        self.assertEqual(response.total_elapsed, mock_time.now - start)
+        self.assertGreater(response.total_elapsed, 0)
+        bad_gateway.close.assert_called_once_with()
+        self.assertEqual(1, t.retry_policy.retried_requests)
+        self.assertEqual(2, t.retry_policy.retry_attempts)
+        self.assertEqual(1, t.retry_policy.recovered)
+        t.add_metrics(self.sut)
+        metrics = {m['name']: m['value']
+                   for m in self.sut.metrics[transport.RETRY_CATEGORY]}
+        self.assertEqual(1, metrics['Requests recovered by retry'])
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    @mock.patch('redfish_protocol_validator.transport.HTTPAdapter.send')
+    def test_retry_exhausted(self, mock_send, mock_time):
+        t = transport.Transport(verify=False, max_retries=1)
+        request = mock.Mock(method='HEAD', url='https://127.0.0.1/redfish/v1')
+        mock_send.side_effect = requests.Timeout
+        with self.assertRaises(requests.Timeout):
+            t.adapter.send(request)
+        self.assertEqual(2, mock_send.call_count)
+        mock_send.reset_mock()
+        mock_send.side_effect = None
+        mock_send.return_value = make_response(504)
+        response = t.adapter.send(request)
+        self.assertEqual(504, response.status_code)
+        self.assertEqual(2, response.attempts)
+        self.assertEqual(2, t.retry_policy.retried_requests)
+        self.assertEqual(0, t.retry_policy.recovered)
+
+    @mock.patch('redfish_protocol_validator.transport.time',
+                new_callable=FakeClock)
+    @mock.patch('redfish_protocol_validator.transport.HTTPAdapter.send')
+    def test_no_retry(self, mock_send, mock_time):
+        t = transport.Transport(verify=False)
+        # non-idempotent methods are not retried
+        request = mock.Mock(method='POST', url='https://127.0.0.1/redfish/v1')
+        mock_send.side_effect = requests.ConnectionError
+        with self.assertRaises(requests.ConnectionError):
+            t.adapter.send(request)
+        self.assertEqual(1, mock_send.call_count)
+        # certificate errors are not transient
+        request.method = 'GET'
+        mock_send.reset_mock()
+        mock_send.side_effect = requests.exceptions.SSLError
+        with self.assertRaises(requests.exceptions.SSLError):
+            t.adapter.send(request)
+        self.assertEqual(1, mock_send.call_count)
+        # protocol failures are returned as is
+        mock_send.reset_mock()
+        mock_send.side_effect = None
+        mock_send.return_value = make_response(500)
+        self.assertEqual(1, t.adapter.send(request).attempts)
+        self.assertEqual(1, mock_send.call_count)
+        # nor are requests expected to fail authentication
+        mock_send.reset_mock()
+        mock_send.side_effect = requests.ConnectionError
+        with self.assertRaises(requests.ConnectionError):
+            t.auth_failure_adapter.send(request)
+        self.assertEqual(1, mock_send.call_count)
+
+    @mock.patch('redfish_protocol_validator.transport.requests.Session.'
+                'request')
+    def test_default_timeouts(self, mock_request):
+        session = self.sut.transport.session()
+        url = 'https://127.0.0.1:8000/redfish/v1/'
+        session.get(url)
+        self.assertEqual((10, 60), mock_request.call_args[1]['timeout'])
+        session.get(url, stream=True)
+        self.assertEqual((10, None), mock_request.call_args[1]['timeout'])
+        session.get(url, timeout=5)
+        self.assertEqual(5, mock_request.call_args[1]['timeout'])
+
+    @mock.patch('redfish_protocol_validator.transport.requests.Session.'
+                'request')
+    def test_conditional_get(self, mock_request):
+        session = self.sut.transport.session()
+        session.headers['X-Auth-Token'] = 'token1'
+        url = 'https://127.0.0.1:8000/redfish/v1/AccountService/Accounts/1'
+        full = make_response(requests.codes.OK)
+        full.ok = True
+        full.headers['ETag'] = '"1"'
+        not_modified = make_response(requests.codes.NOT_MODIFIED)
+        not_modified.ok = True
+        mock_request.side_effect = [full, not_modified]
+        self.assertIs(full, session.conditional_get(url))
+        self.assertEqual({}, mock_request.call_args[1]['headers'])
+        self.assertIs(full, session.conditional_get(url))
+        self.assertEqual({'If-None-Match': '"1"'},
+                         mock_request.call_args[1]['headers'])
+        # another auth context has its own entries
+        other = self.sut.transport.session()
+        other.auth = ('admin', 'secret')
+        mock_request.side_effect = [full]
+        self.assertIs(full, other.conditional_get(url))
+        self.assertEqual({}, mock_request.call_args[1]['headers'])
+        cache = self.sut.transport.cache
+        self.assertEqual(1, cache.revalidated)
+        self.assertEqual(2, cache.full_responses)
+
+    @mock.patch('redfish_protocol_validator.transport.requests.Session.'
+                'request')
+    def test_conditional_get_after_write(self, mock_request):
+        session = self.sut.transport.session()
+        url = 'https://127.0.0.1:8000/redfish/v1/AccountService/Accounts/1'
+        full = make_response(requests.codes.OK)
+        full.ok = True
+        full.headers['ETag'] = '"1"'
+        patched = make_response(requests.codes.OK)
+        patched.ok = True
+        patched.headers['ETag'] = '"2"'
+        not_modified = make_response(requests.codes.NOT_MODIFIED)
+        not_modified.ok = True
+        not_modified.headers = requests.structures.CaseInsensitiveDict()
+        mock_request.side_effect = [full, patched, not_modified, not_modified]
+        session.conditional_get(url)
+        session.patch(url, json={'Enabled': True})
+        # the PATCH response ETag is revalidated when only the ETag is needed
+        r = session.conditional_get(url, etag_only=True)
+        self.assertEqual({'If-None-Match': '"2"'},
+                         mock_request.call_args[1]['headers'])
+        self.assertIs(r, not_modified)
+        self.assertEqual('"2"', r.headers['ETag'])
+        # a DELETE drops the entry and the parent collection's entries
+        cache = self.sut.transport.cache
+        cache._entries[(None, url.rsplit('/', 1)[0])] = ('"c"', full)
+        mock_request.side_effect = [make_response(requests.codes.OK)]
+        session.delete(url)
+        self.assertEqual({}, cache._entries)
+        self.assertEqual(3, cache.invalidations)
+
+    def test_retry_delay_bounded(self):
+        policy = transport.RetryPolicy(backoff=0.5, max_backoff=2,
+                                       jitter=0)
+        self.assertEqual([0.5, 1, 2, 2], [policy.delay(a)
+                                          for a in range(1, 5)])
+        self.sut.set_max_retries(5)
+        self.assertEqual(5, self.sut.transport.retry_policy.retries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,9 @@
 # License: BSD 3-Clause License. For full text see link:
 # https://github.com/DMTF/Redfish-Protocol-Validator/blob/master/LICENSE.md
 
+import http.client
+import os
+import tempfile
 import unittest
 from unittest import mock, TestCase
 
@@ -10,13 +13,11 @@ import colorama
 import requests
 
 from redfish_protocol_validator import utils
-from redfish_protocol_validator.constants import Assertion, Result, SSDP_REDFISH
+from redfish_protocol_validator.constants import Assertion, Result, SSDP_ALL
+from redfish_protocol_validator.constants import ResourceType
+from redfish_protocol_validator.constants import SSDP_REDFISH
 from redfish_protocol_validator.system_under_test import SystemUnderTest
-
-
-class MyTimeout(OSError):
-    def __init__(self, *args, **kwargs):
-        pass
+from unittests.utils import FakeClock
 
 
 class Utils(TestCase):
@@ -43,6 +44,15 @@ class Utils(TestCase):
         headers = utils.get_etag_header(self.sut, self.session, self.uri)
         self.assertEqual(headers, {'If-Match': self.etag})
 
+    @mock.patch('redfish_protocol_validator.transport.ResponseCache.get')
+    def test_get_etag_header_transport_session(self, mock_get):
+        mock_get.return_value = self.response
+        session = self.sut.transport.session()
+        self.assertEqual(utils.get_etag_header(self.sut, session, self.uri),
+                         {'If-Match': self.etag})
+        mock_get.assert_called_once_with(session, self.sut.rhost + self.uri,
+                                         etag_only=True)
+
     def test_get_etag_header_no_header(self):
         self.response.headers.get.return_value = None
         headers = utils.get_etag_header(self.sut, self.session, self.uri)
@@ -67,6 +77,139 @@ class Utils(TestCase):
         etag = utils.get_response_etag(response)
         self.assertEqual(etag, odata_etag)
 
+    def test_genuine_response(self):
+        uri = '/redfish/v1/AccountService/Accounts/1'
+        self.response.headers = {'Content-Type': 'application/json'}
+        expanded = utils.expanded_member_response(
+            self.response, self.sut.rhost + uri, {'UserName': 'oper'})
+        self.sut.add_response(uri, expanded,
+                              resource_type=ResourceType.MANAGER_ACCOUNT)
+        self.sut._set_session(self.session)
+        self.response.request = mock.Mock(spec=requests.Request)
+        self.response.request.method = 'GET'
+        r = utils.genuine_response(self.sut, uri, expanded,
+                                   resource_type=ResourceType.MANAGER_ACCOUNT)
+        self.assertIs(r, self.response)
+        self.session.get.assert_called_once_with(self.sut.rhost + uri)
+        self.assertIs(self.sut.get_responses_by_method(
+            'GET', resource_type=ResourceType.MANAGER_ACCOUNT)[uri], r)
+        # responses that were not synthesized are returned unchanged
+        self.assertIs(utils.genuine_response(self.sut, uri, r), r)
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def _page(self, members, next_link=None, count=None,
+              status_code=requests.codes.OK):
+        r = mock.Mock(spec=requests.Response)
+        r.status_code = status_code
+        r.ok = status_code == requests.codes.OK
+        data = {'Members': [{'@odata.id': m} for m in members]}
+        if next_link:
+            data['Members@odata.nextLink'] = next_link
+        if count is not None:
+            data['Members@odata.count'] = count
+        r.json.return_value = data
+        return r
+
+    def test_collection_iterator(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        self.session.get.side_effect = [
+            self._page(['a', 'b'], next_link=uri + '?$skip=2', count=5),
+            self._page(['c', 'd'], next_link=uri + '?$skip=4'),
+            self._page(['e'])]
+        pages = utils.CollectionIterator(self.sut, uri, session=self.session)
+        members = [m['@odata.id'] for m in pages]
+        self.assertEqual(members, ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(pages.count, 5)
+        self.assertEqual(pages.pages, 3)
+        self.assertEqual(pages.members, 5)
+        self.assertEqual(len(pages.page_times), 3)
+        self.assertIsNone(pages.error)
+        self.session.get.assert_has_calls([
+            mock.call(self.sut.rhost + uri),
+            mock.call(self.sut.rhost + uri + '?$skip=2'),
+            mock.call(self.sut.rhost + uri + '?$skip=4')])
+
+    def test_collection_iterator_prefetch(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        first = self._page(['a', 'b'], next_link=uri + '?$skip=2', count=3)
+        self.session.get.return_value = self._page(['c'])
+        pages = iter(utils.CollectionIterator(
+            self.sut, uri, response=first, session=self.session))
+        self.assertEqual(next(pages)['@odata.id'], 'a')
+        # the next page is requested while the first is being consumed
+        result = utils.poll(lambda: (self.session.get.called, None),
+                            timeout=2, interval=0.01)
+        self.assertTrue(result.done)
+        self.assertEqual([m['@odata.id'] for m in pages], ['b', 'c'])
+        self.session.get.assert_called_once_with(
+            self.sut.rhost + uri + '?$skip=2')
+
+    def test_collection_iterator_max_pages(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        first = self._page(['a'], next_link=uri + '?$skip=1', count=3)
+        pages = utils.CollectionIterator(self.sut, uri, response=first,
+                                         session=self.session, max_pages=1)
+        self.assertEqual(len(list(pages)), 1)
+        self.session.get.assert_not_called()
+        self.assertIsNone(pages.error)
+
+    def test_collection_iterator_page_error(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        first = self._page(['a'], next_link=uri + '?$skip=1', count=2)
+        self.session.get.return_value = self._page(
+            [], status_code=requests.codes.SERVICE_UNAVAILABLE)
+        pages = utils.CollectionIterator(self.sut, uri, response=first,
+                                         session=self.session)
+        self.assertEqual(len(list(pages)), 1)
+        self.assertEqual(pages.pages, 1)
+        self.assertIn('returned status 503', pages.error)
+
+    def test_collection_iterator_connection_error(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        self.session.get.side_effect = requests.ConnectionError
+        pages = utils.CollectionIterator(self.sut, uri, session=self.session)
+        self.assertEqual(list(pages), [])
+        self.assertEqual(pages.pages, 0)
+        self.assertIn('Caught ConnectionError', pages.error)
+
+    def test_collection_iterator_loop(self):
+        uri = '/redfish/v1/Chassis/1/Sensors'
+        first = self._page(['a'], next_link=uri + '?$skip=1', count=10)
+        self.session.get.return_value = self._page(
+            ['b'], next_link=uri + '?$skip=1')
+        pages = utils.CollectionIterator(self.sut, uri, response=first,
+                                         session=self.session)
+        self.assertEqual(len(list(pages)), 2)
+        self.assertEqual(self.session.get.call_count, 1)
+        self.assertIn('repeats an earlier page', pages.error)
+
+    def test_get_allowed_methods(self):
+        self.response.headers = {'Allow': 'GET, head,PATCH , '}
+        self.assertEqual(utils.get_allowed_methods(self.response),
+                         {'GET', 'HEAD', 'PATCH'})
+        self.response.headers = {}
+        self.assertIsNone(utils.get_allowed_methods(self.response))
+
+    def test_sample_uris(self):
+        uris = ['/redfish/v1/Chassis/%02d' % i for i in range(10)]
+        self.assertEqual(utils.sample_uris(reversed(uris), None), uris)
+        self.assertEqual(utils.sample_uris(uris, 0), uris)
+        self.assertEqual(utils.sample_uris(uris, 20), uris)
+        self.assertEqual(utils.sample_uris(uris, 3),
+                         [uris[0], uris[3], uris[6]])
+
+    def test_select_uri(self):
+        uri = '/redfish/v1/AccountService/Accounts/1'
+        self.assertEqual(utils.select_uri(self.sut, uri, ['UserName']),
+                         (uri, False))
+        self.sut.set_supported_query_params({'SelectQuery': True})
+        self.assertEqual(
+            utils.select_uri(self.sut, uri, ['UserName', 'Enabled']),
+            (uri + '?$select=UserName,Enabled', True))
+        self.assertEqual(
+            utils.select_uri(self.sut, uri + '?only', ['UserName']),
+            (uri + '?only&$select=UserName', True))
+
     def test_get_extended_error(self):
         response = mock.Mock(spec=requests.Response)
         body = {
@@ -200,6 +343,18 @@ class Utils(TestCase):
         self.assertIn(colorama.Fore.RED, args[0])
         self.assertIn(colorama.Fore.YELLOW, args[0])
 
+    def test_skip_assertions(self):
+        count = utils.skip_assertions(self.sut, 'PROTO_', 'out of time')
+        proto = [a for a in Assertion if a.name.startswith('PROTO_')]
+        self.assertEqual(count, len(proto) - 1)
+        # assertions that already have results are left alone
+        self.assertEqual(len(self.sut.results[Assertion.PROTO_JSON_RFC]), 2)
+        entry = self.sut.results[Assertion.PROTO_ETAG_ON_GET_ACCOUNT][0]
+        self.assertEqual(entry['result'], Result.NOT_TESTED)
+        self.assertEqual(entry['msg'], 'out of time')
+        self.assertNotIn(Assertion.REQ_HEADERS_ACCEPT, self.sut.results)
+        self.assertEqual(self.sut.summary_count(Result.NOT_TESTED), count)
+
     def test_redfish_version_to_tuple(self):
         v = utils.redfish_version_to_tuple('1.0.6')
         self.assertEqual(v, (1, 0, 6))
@@ -242,50 +397,79 @@ class Utils(TestCase):
         self.assertEqual(256, utils.sanitize(256, minimum=1))
         pass
 
+    @mock.patch('redfish_protocol_validator.utils.select')
     @mock.patch('redfish_protocol_validator.utils.socket')
     @mock.patch('redfish_protocol_validator.utils.http.client')
-    def test_discover_ssdp_ipv4(self, mock_http_client, mock_socket):
+    def test_discover_ssdp_ipv4(self, mock_http_client, mock_socket,
+                                mock_select):
         mock_sock = mock.Mock()
         mock_sock.recv.return_value = b'foo'
         mock_socket.socket.return_value = mock_sock
-        mock_socket.timeout = MyTimeout
-        mock_http_client.HTTPResponse.side_effect = MyTimeout
+        mock_select.select.return_value = ([], [], [])
         services = utils.discover_ssdp()
         self.assertEqual({}, services)
+        mock_sock.setblocking.assert_called_once_with(False)
+        mock_sock.close.assert_called_once_with()
+        mock_socket.setdefaulttimeout.assert_not_called()
 
+    @mock.patch('redfish_protocol_validator.utils.select')
     @mock.patch('redfish_protocol_validator.utils.socket')
     @mock.patch('redfish_protocol_validator.utils.http.client')
-    def test_discover_ssdp_ipv6(self, mock_http_client, mock_socket):
+    def test_discover_ssdp_ipv6(self, mock_http_client, mock_socket,
+                                mock_select):
         mock_sock = mock.Mock()
         mock_sock.recv.return_value = b'foo'
         mock_socket.socket.return_value = mock_sock
-        mock_socket.timeout = MyTimeout
-        mock_http_client.HTTPResponse.side_effect = MyTimeout
+        mock_select.select.return_value = ([], [], [])
         services = utils.discover_ssdp(protocol='ipv6')
         self.assertEqual({}, services)
 
+    @mock.patch('redfish_protocol_validator.utils.select')
     @mock.patch('redfish_protocol_validator.utils.socket')
     @mock.patch('redfish_protocol_validator.utils.http.client')
-    def test_discover_ssdp_iface(self, mock_http_client, mock_socket):
+    def test_discover_ssdp_iface(self, mock_http_client, mock_socket,
+                                 mock_select):
         mock_sock = mock.Mock()
         mock_sock.recv.return_value = b'foo'
         mock_socket.socket.return_value = mock_sock
-        mock_socket.timeout = MyTimeout
-        mock_http_client.HTTPResponse.side_effect = MyTimeout
+        mock_select.select.return_value = ([], [], [])
         services = utils.discover_ssdp(iface='eth0')
         self.assertEqual({}, services)
 
+    @mock.patch('redfish_protocol_validator.utils.select')
     @mock.patch('redfish_protocol_validator.utils.socket')
     @mock.patch('redfish_protocol_validator.utils.http.client')
-    def test_discover_ssdp_bad_proto(self, mock_http_client, mock_socket):
+    def test_discover_ssdp_bad_proto(self, mock_http_client, mock_socket,
+                                     mock_select):
         mock_sock = mock.Mock()
         mock_sock.recv.return_value = b'foo'
         mock_socket.socket.return_value = mock_sock
-        mock_socket.timeout = MyTimeout
-        mock_http_client.HTTPResponse.side_effect = MyTimeout
+        mock_select.select.return_value = ([], [], [])
         with self.assertRaises(ValueError):
             utils.discover_ssdp(protocol='ipsec')
 
+    @mock.patch('redfish_protocol_validator.utils.select')
+    @mock.patch('redfish_protocol_validator.utils.socket')
+    def test_discover_ssdp_responses(self, mock_socket, mock_select):
+        uuid = '92384634-2938-2342-8820-489239905423'
+        usn = 'uuid:%s::urn:dmtf-org:service:redfish-rest:1:0' % uuid
+        response = ('HTTP/1.1 200 OK\r\n'
+                    'ST: %s\r\n'
+                    'USN: %s\r\n'
+                    'AL: http://0.0.0.0:8007/redfish/v1\r\n\r\n'
+                    % (SSDP_REDFISH, usn)).encode('utf-8')
+        mock_sock = mock.Mock()
+        mock_sock.recv.side_effect = [b'garbage', BlockingIOError(), response]
+        mock_socket.socket.return_value = mock_sock
+        mock_select.select.side_effect = [
+            ([mock_sock], [], []), ([mock_sock], [], []),
+            ([mock_sock], [], []), ([], [], [])]
+        services = utils.discover_ssdp(recv_bufsize=8192)
+        self.assertEqual([uuid], list(services.keys()))
+        self.assertEqual(usn, services[uuid].get('USN'))
+        mock_sock.recv.assert_called_with(8192)
+        mock_sock.close.assert_called_once_with()
+
     def test_process_ssdp_response(self):
         mock_response = mock.Mock()
         uuid = '92384634-2938-2342-8820-489239905423'
@@ -310,6 +494,64 @@ class Utils(TestCase):
         self.assertEqual(discovered_services.get(uuid, {}).get('AL'),
                          'http://0.0.0.0:8007/redfish/v1')
 
+    @mock.patch('redfish_protocol_validator.utils.discover_ssdp')
+    def test_ssdp_cache(self, mock_discover_ssdp):
+        uuid = '92384634-2938-2342-8820-489239905423'
+        usn = 'uuid:%s::urn:dmtf-org:service:redfish-rest:1:0' % uuid
+        headers = http.client.HTTPMessage()
+        headers['USN'] = usn
+        headers['AL'] = 'http://0.0.0.0:8007/redfish/v1'
+        mock_discover_ssdp.return_value = {uuid: headers}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'ssdp.json')
+            cache = utils.SSDPCache(path)
+            services = cache.get_services(search_target=SSDP_REDFISH)
+            self.assertEqual(mock_discover_ssdp.call_count, 1)
+            self.assertEqual(services[uuid].get('USN'), usn)
+            self.assertFalse(os.path.exists(cache.lock_path))
+            # a second cache on the same file is served from the index
+            services = utils.SSDPCache(path).get_services(
+                search_target=SSDP_REDFISH)
+            self.assertEqual(mock_discover_ssdp.call_count, 1)
+            self.assertEqual(services[uuid].get('usn'), usn)
+            self.assertEqual(services[uuid].get('AL'),
+                             'http://0.0.0.0:8007/redfish/v1')
+            # a different search target is discovered separately
+            utils.SSDPCache(path).get_services(search_target=SSDP_ALL)
+            self.assertEqual(mock_discover_ssdp.call_count, 2)
+
+    @mock.patch('redfish_protocol_validator.utils.discover_ssdp')
+    def test_ssdp_cache_stale(self, mock_discover_ssdp):
+        mock_discover_ssdp.return_value = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'ssdp.json')
+            cache = utils.SSDPCache(path, max_age=0)
+            cache.get_services(search_target=SSDP_REDFISH)
+            cache.get_services(search_target=SSDP_REDFISH)
+            self.assertEqual(mock_discover_ssdp.call_count, 2)
+
+    @mock.patch('redfish_protocol_validator.utils.time',
+                new_callable=FakeClock)
+    def test_poll_done(self, mock_time):
+        values = iter([(False, 1), (False, 2), (True, 3)])
+        result = utils.poll(lambda: next(values), timeout=5, interval=0.1,
+                            jitter=0)
+        self.assertTrue(result.done)
+        self.assertEqual(3, result.value)
+        self.assertEqual(3, result.attempts)
+        # delays of 0.1 and 0.2 seconds with no jitter
+        self.assertAlmostEqual(0.3, result.elapsed)
+
+    @mock.patch('redfish_protocol_validator.utils.time',
+                new_callable=FakeClock)
+    def test_poll_deadline(self, mock_time):
+        result = utils.poll(lambda: (False, 'x'), timeout=3, initial_delay=1,
+                            max_interval=0.5)
+        self.assertFalse(result.done)
+        self.assertEqual('x', result.value)
+        self.assertAlmostEqual(3, result.elapsed)
+        self.assertGreater(result.attempts, 4)
+
     def test_fake_socket(self):
         sock = utils.FakeSocket(b'foo')
         s = sock.makefile()
@@ -339,6 +581,57 @@ class Utils(TestCase):
             '00001000110100110001001100011001100010100010111000')
         self.assertTrue(0.50079 <= p <= 0.50080)
 
+    def test_block_frequency(self):
+        seq = utils.BitSequence.from_bit_str('0110011010')
+        self.assertAlmostEqual(0.801252, seq.block_frequency(3), places=6)
+        seq = utils.BitSequence.from_bit_str(
+            '11001001000011111101101010100010001000010110100011'
+            '00001000110100110001001100011001100010100010111000')
+        self.assertAlmostEqual(0.706438, seq.block_frequency(10), places=6)
+
+    def test_longest_run(self):
+        seq = utils.BitSequence.from_bit_str(
+            '11001100000101010110110001001100111000000000001001001101010100'
+            '01000100111101011010000000110101111100110011100110110110001011'
+            '0010')
+        self.assertAlmostEqual(0.180598, seq.longest_run(), places=6)
+        seq = utils.BitSequence.from_bit_str('1011010101')
+        self.assertIsNone(seq.longest_run())
+
+    def test_approximate_entropy(self):
+        seq = utils.BitSequence.from_bit_str('0100110101')
+        self.assertAlmostEqual(0.261961, seq.approximate_entropy(3), places=6)
+        seq = utils.BitSequence.from_bit_str(
+            '11001001000011111101101010100010001000010110100011'
+            '00001000110100110001001100011001100010100010111000')
+        self.assertAlmostEqual(0.235301, seq.approximate_entropy(2), places=6)
+
+    def test_bit_sequence_from_tokens(self):
+        seq = utils.BitSequence.from_tokens(['7c', 'not-hex', '00ab'])
+        self.assertEqual(24, seq.n)
+        self.assertEqual(0x7c00ab, seq.value)
+        self.assertEqual(0x00ab7c, seq.rotate(8))
+
+    def test_random_token_batch(self):
+        tokens = ['C90FDAA22168C234C4C6628B80DC1CD1',
+                  '29024E088A67CC74020BBEA63B139B22',
+                  '514A08798E3404DDEF9519B3CD3A431B',
+                  '302B0A6DF25F14374FE1356D6D51C245',
+                  'c3VyZS4=']
+        result = utils.random_token_batch(tokens)
+        self.assertEqual(4, result.tokens)
+        self.assertEqual(1, result.invalid)
+        self.assertEqual(512, result.bits)
+        self.assertEqual(0, result.token_failures)
+        for name, p in result.p_values.items():
+            self.assertGreaterEqual(p, 0.01, name)
+        result = utils.random_token_batch(['0000ffff' * 4] * 8)
+        self.assertEqual(8, result.token_failures)
+        self.assertLess(result.p_values['runs'], 0.01)
+        self.assertLess(result.p_values['approximate_entropy'], 0.01)
+        result = utils.random_token_batch([])
+        self.assertEqual({}, result.p_values)
+
     def test_random_sequence(self):
         self.assertFalse(utils.random_sequence('00040000'))
         self.assertFalse(utils.random_sequence('fffffffe'))
@@ -32,6 +32,8 @@ def add_response(sut: SystemUnderTest, uri, method='GET',
         response.text = str(json)
     elif text is not None:
         response.text = text
+        response.content = text.encode('utf-8')
+        response.iter_content.return_value = [response.content]
         response.headers = {
             'Content-Type': 'application/xml',
             'Content-Length': len(text)
@@ -50,6 +52,21 @@ def add_response(sut: SystemUnderTest, uri, method='GET',
     return response
 
 
+class FakeClock(object):
+    """Stand-in for the time module where sleep() just advances the clock"""
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, secs):
+        self.now += secs
+
+
 def get_result(sut: SystemUnderTest, assertion, method, uri):
     results = sut.results.get(assertion, [])
     for result in reversed(results):